@@ -0,0 +1,47 @@
+"""Bounded fan-out helpers for batch endpoints"""
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Sequence, TypeVar
+
+from app.config import settings
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RateLimiter:
+    """
+    Spaces calls evenly at no more than `rate` per second. Shared by every
+    batch on the worker so concurrent batches together stay under the limit.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        """Wait for the next free slot"""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        # Reserve the slot before sleeping so waiters queue in arrival order
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def run_bounded(items: Sequence[T], worker: Callable[[int, T], Awaitable[R]],
+                      concurrency: int) -> List[R]:
+    """Run worker(index, item) for every item with at most `concurrency` running; results keep input order"""
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(index: int, item: T) -> R:
+        async with semaphore:
+            return await worker(index, item)
+
+    return await asyncio.gather(*(run(index, item) for index, item in enumerate(items)))
+
+
+batch_rate_limiter = RateLimiter(settings.batch_rate_limit)
@@ -6,14 +6,72 @@ from typing import List
 class Settings(BaseSettings):
     """Application settings"""
     openai_api_key: str = ""
+    openai_base_url: str = ""  # OpenAI-compatible endpoint, e.g. the local fake LLM server for load tests
     gemini_api_key: str = ""
     maps_api_key: str = ""
     database_url: str = "sqlite:///./healthguide.db"
+    async_database_url: str = ""  # defaults to database_url with the async driver (e.g. sqlite+aiosqlite)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_journal_mode: str = "WAL"  # SQLite only
+    db_synchronous: str = "NORMAL"  # SQLite only; NORMAL is durable with WAL except on power loss
+    db_busy_timeout_ms: int = 5000  # SQLite only
     llm_provider: str = "openai"  # openai or gemini
+    llm_timeout: float = 30.0  # seconds per LLM call
+    llm_max_concurrency: int = 16  # in-flight LLM calls per worker
+    llm_max_connections: int = 20  # pooled HTTP connections per worker
+    llm_failover: bool = True  # also route to the other provider when its API key is set
+    llm_request_budget: float = 20.0  # seconds of LLM time per triage turn across all calls; 0 disables
+    llm_hedge_percentile: float = 95.0  # hedge to the next provider after this latency percentile; 0 disables
+    llm_hedge_min_delay: float = 0.25  # never hedge sooner than this many seconds
+    llm_hedge_max_delay: float = 2.0  # hedge no later than this; also used until enough latencies are recorded
+    llm_breaker_failures: int = 5  # errors within llm_breaker_window that open a provider's breaker
+    llm_breaker_window: float = 30.0  # seconds
+    llm_breaker_cooldown: float = 30.0  # seconds a breaker stays open before a probe call
+    openai_rpm_limit: int = 0  # outbound requests per minute; 0 disables
+    openai_tpm_limit: int = 0  # outbound tokens per minute (prompt + max completion); 0 disables
+    gemini_rpm_limit: int = 0
+    gemini_tpm_limit: int = 0
+    llm_rate_limit_path: str = ""  # file holding the limiter state so all workers share it; empty keeps it per process
+    llm_max_retries: int = 4  # retries of a rate-limited (429) call, within the request budget
+    llm_retry_base_delay: float = 0.5  # seconds; backoff doubles per retry with full jitter
+    llm_retry_max_delay: float = 8.0
+    triage_mode: str = "sequential"  # sequential, parallel or combined
+    llm_context_token_budget: int = 3000  # prompt tokens per LLM call, prompts included
+    llm_context_recent_messages: int = 8  # newest messages always sent verbatim
+    llm_context_summary_tokens: int = 400  # cap for the rolling summary of older turns
+    llm_context_block_size: int = 4  # summary boundary moves in blocks to keep the prefix stable
+    llm_cache_enabled: bool = True
+    llm_cache_size: int = 2048  # in-memory entries per worker
+    llm_cache_ttl: float = 3600.0  # seconds
+    llm_cache_path: str = ""  # optional SQLite file for the on-disk tier
+    llm_cache_max_turns: int = 4  # only cache conversations with at most this many user turns
+    rules_enabled: bool = True  # decide clear-cut turns with deterministic rules instead of the LLM
+    rules_confidence_threshold: float = 0.9  # minimum rule confidence to skip the LLM
+    rules_audit_log: str = ""  # optional JSONL file recording every rule decision
+    batch_max_items: int = 1000  # items per /api/triage/batch request
+    batch_max_concurrency: int = 8  # in-flight items per batch request
+    batch_rate_limit: float = 10.0  # LLM calls per second across all batches per worker; 0 disables
+    trust_client_history: bool = True  # False ignores client-sent history and always uses storage
+    session_cache_enabled: bool = True
+    session_cache_size: int = 1000  # sessions held in memory per worker
+    session_cache_ttl: float = 1800.0  # seconds of inactivity before a session is evicted
+    session_flush_interval: float = 1.0  # seconds between write-behind flushes
     host: str = "0.0.0.0"
     port: int = 8000
+    workers: int = 1  # >1 makes run.py pre-fork this many worker processes
     debug: bool = True
     allowed_origins: str = "http://localhost:3000,http://localhost:5173"
+    metrics_enabled: bool = True  # Prometheus text metrics at /metrics
+    profile_token: str = ""  # requests sending X-Profile: <token> are profiled; empty disables the header
+    profile_sample_rate: float = 0.0  # fraction of requests profiled at random
+    profile_engine: str = "auto"  # auto (pyinstrument if installed), pyinstrument or cprofile
+    profile_interval: float = 0.001  # pyinstrument sampling interval in seconds
+    profile_dir: str = "./profiles"
+    profile_max_files: int = 50  # oldest profiles are deleted beyond this
+    prompt_hot_reload: bool = True
+    prompt_reload_interval: float = 1.0  # seconds between prompt file mtime checks
     
     @property
     def cors_origins(self) -> List[str]:
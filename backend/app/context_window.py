@@ -0,0 +1,114 @@
+"""Token-budgeted conversation context with a rolling summary of older turns"""
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+from app.config import settings
+from app.prompt_registry import estimate_tokens
+
+
+SUMMARY_HEADER = "Summary of earlier conversation:"
+
+
+class ContextWindow(NamedTuple):
+    """History prepared for one LLM call"""
+    summary: Optional[str]
+    messages: List[Dict]
+    token_estimate: int
+    summarized: int
+
+
+def _message_tokens(msg: Dict) -> int:
+    # A few tokens of per-message overhead for the role and separators
+    return estimate_tokens(msg.get("content", "")) + 4
+
+
+def _compress(msg: Dict, max_chars: int) -> str:
+    """One summary line for a message"""
+    content = " ".join(msg.get("content", "").split())
+    if len(content) > max_chars:
+        content = content[:max_chars - 3].rstrip() + "..."
+    return f"- {msg.get('role', 'user')}: {content}"
+
+
+class ContextBuilder:
+    """
+    Fits a conversation into a token budget. The newest turns are kept
+    verbatim and older turns are folded into a summary. The summary boundary
+    moves in fixed blocks of messages, so the summary text, and with it the
+    prompt prefix, stays identical across several turns and provider-side
+    prompt caching can hit.
+    """
+
+    def __init__(self, token_budget: int = 3000, recent_messages: int = 8, summary_tokens: int = 400,
+                 block_size: int = 4, line_chars: int = 160, cache_size: int = 1024):
+        self.token_budget = token_budget
+        self.recent_messages = recent_messages
+        self.summary_tokens = summary_tokens
+        self.block_size = max(block_size, 1)
+        self.line_chars = line_chars
+        self.cache_size = cache_size
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+
+    def build(self, history: List[Dict], reserved_tokens: int = 0) -> ContextWindow:
+        """
+        Prepare history for a call. reserved_tokens covers everything sent
+        besides the history, such as the system and triage prompts.
+        """
+        budget = self.token_budget - reserved_tokens
+        sizes = [_message_tokens(msg) for msg in history]
+        total = sum(sizes)
+        if total <= budget:
+            return ContextWindow(None, list(history), total, 0)
+
+        keep_from = max(len(history) - self.recent_messages, 0)
+        boundary = keep_from - keep_from % self.block_size
+        while True:
+            summary = self.summarize(history[:boundary]) if boundary else None
+            used = (estimate_tokens(summary) + 4 if summary else 0) + sum(sizes[boundary:])
+            # Always keep the newest message verbatim, even if it alone exceeds the budget
+            if used <= budget or boundary >= len(history) - 1:
+                return ContextWindow(summary, history[boundary:], used, boundary)
+            boundary += 1
+
+    def summarize(self, messages: List[Dict]) -> str:
+        """Rolling summary of older messages, cached by their content"""
+        digest = hashlib.sha256()
+        for msg in messages:
+            digest.update(msg.get("role", "user").encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(msg.get("content", "").encode("utf-8"))
+            digest.update(b"\0")
+        key = digest.hexdigest()
+
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+            return summary
+
+        # Prefer what the user reported; assistant turns are mostly questions
+        lines = [_compress(msg, self.line_chars) for msg in messages if msg.get("role", "user") == "user"]
+        kept: List[str] = []
+        used = estimate_tokens(SUMMARY_HEADER)
+        for line in reversed(lines):
+            cost = estimate_tokens(line) + 1
+            if used + cost > self.summary_tokens:
+                break
+            kept.append(line)
+            used += cost
+        omitted = len(lines) - len(kept)
+        header = SUMMARY_HEADER if not omitted else f"{SUMMARY_HEADER} ({omitted} earlier user messages omitted)"
+        summary = "\n".join([header] + list(reversed(kept)))
+
+        self._summaries[key] = summary
+        if len(self._summaries) > self.cache_size:
+            self._summaries.popitem(last=False)
+        return summary
+
+
+context_builder = ContextBuilder(
+    token_budget=settings.llm_context_token_budget,
+    recent_messages=settings.llm_context_recent_messages,
+    summary_tokens=settings.llm_context_summary_tokens,
+    block_size=settings.llm_context_block_size
+)
@@ -1,33 +1,131 @@
 """Database setup and session management"""
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, JSON
+from sqlalchemy import create_engine, event, select, Column, String, Integer, DateTime, Text, Index, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from datetime import datetime
-from typing import Optional
-import json
+from typing import Optional, List, Dict, Union
+import os
 
 from app.config import settings
+from app.metrics import stage_timer
+from app.serialization import loads
 
 Base = declarative_base()
 
+# Times a turn is re-read and re-written after another writer took its seq numbers
+APPEND_RETRIES = 5
+
 
 class ConversationSession(Base):
-    """Database model for conversation sessions"""
+    """Database model for conversation sessions (aggregates only)"""
     __tablename__ = "conversations"
     
     session_id = Column(String, primary_key=True, index=True)
-    messages = Column(JSON, default=list)
     triage_level = Column(String, nullable=True)
     summary = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     red_flag_detected = Column(String, nullable=True)
+    message_count = Column(Integer, default=0, nullable=False)
+
+
+class ConversationMessage(Base):
+    """Database model for a single message, appended once and never rewritten"""
+    __tablename__ = "conversation_messages"
+    
+    session_id = Column(String, primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    role = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    timestamp = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_conversation_messages_session_id", "session_id"),)
+
+    def to_dict(self) -> Dict:
+        """Message as stored in the API history format"""
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": self.timestamp.isoformat() if self.timestamp else None
+        }
+
+
+def get_async_database_url() -> str:
+    """Async driver URL: settings.async_database_url, or database_url with the async driver swapped in"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    async_drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "mysql": "mysql+aiomysql"}
+    backend = url.get_backend_name()
+    if url.drivername == backend and backend in async_drivers:
+        url = url.set(drivername=async_drivers[backend])
+    return url.render_as_string(hide_password=False)
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return _is_sqlite(url) and (not database or database == ":memory:")
+
+
+def _engine_options(url: str, is_async: bool = False) -> Dict:
+    """Pool and driver options shared by the sync and async engines"""
+    options: Dict = {"pool_pre_ping": True}
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+    if not _is_memory_sqlite(url):
+        # SQLite file databases would otherwise get a NullPool under aiosqlite
+        options["poolclass"] = AsyncAdaptedQueuePool if is_async else QueuePool
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout
+        )
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers proceed while a writer commits; busy_timeout waits out lock contention"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.db_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.db_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.db_busy_timeout_ms)}")
+    cursor.close()
 
 
-# Create database engine
-engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
+# Create database engines. The sync engine serves migrations, scripts and
+# tests; request handlers use the async engine.
+engine = create_engine(settings.database_url, **_engine_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(get_async_database_url(), **_engine_options(get_async_database_url(), is_async=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if _is_sqlite(settings.database_url) and not _is_memory_sqlite(settings.database_url):
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
+
+def _discard_pools_after_fork():
+    """
+    A forked worker opens its own connections; close=False leaves the
+    parent's alone. The async engine is only used by request handlers, which
+    never run before fork, and a pool recreated outside the event loop would
+    lose its asyncio-aware locks, so it is left as is.
+    """
+    engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_discard_pools_after_fork)
+
 
 def get_db() -> Session:
     """Get database session"""
@@ -38,37 +136,201 @@ def get_db() -> Session:
         db.close()
 
 
+async def get_async_db() -> AsyncSession:
+    """Get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    migrate_db()
 
 
-def save_conversation(db: Session, session_id: str, messages: list, triage_level: Optional[str] = None, 
-                     summary: Optional[str] = None, red_flag: Optional[str] = None):
-    """Save or update conversation session"""
-    session = db.query(ConversationSession).filter(ConversationSession.session_id == session_id).first()
-    
-    if session:
-        session.messages = messages
-        session.triage_level = triage_level
-        session.summary = summary
-        session.red_flag_detected = red_flag
-        session.updated_at = datetime.now()
-    else:
-        session = ConversationSession(
-            session_id=session_id,
-            messages=messages,
-            triage_level=triage_level,
-            summary=summary,
-            red_flag_detected=red_flag
-        )
-        db.add(session)
-    
-    db.commit()
-    return session
+def migrate_db():
+    """
+    Move databases created before normalized message storage onto the
+    conversation_messages table. Copies each legacy JSON `messages` column into
+    message rows, fills `message_count`, then drops the legacy column.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("conversations")}
+    with engine.begin() as conn:
+        if "message_count" not in columns:
+            conn.execute(text("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"))
+        if "messages" not in columns:
+            return
+
+        rows = conn.execute(text("SELECT session_id, messages FROM conversations")).fetchall()
+        for session_id, raw_messages in rows:
+            messages = loads(raw_messages) if isinstance(raw_messages, str) else (raw_messages or [])
+            if messages:
+                conn.execute(
+                    ConversationMessage.__table__.insert(),
+                    [
+                        _message_row(session_id, seq, message)
+                        for seq, message in enumerate(messages)
+                    ]
+                )
+            conn.execute(
+                text("UPDATE conversations SET message_count = :count WHERE session_id = :session_id"),
+                {"count": len(messages), "session_id": session_id}
+            )
+        conn.execute(text("ALTER TABLE conversations DROP COLUMN messages"))
+
+
+def _parse_timestamp(value: Union[str, datetime, None]) -> Optional[datetime]:
+    """Accept ISO strings or datetimes for message timestamps"""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _message_row(session_id: str, seq: int, message: Dict) -> Dict:
+    """Build an insert row for a message dict"""
+    return {
+        "session_id": session_id,
+        "seq": seq,
+        "role": message.get("role", "user"),
+        "content": message.get("content", ""),
+        "timestamp": _parse_timestamp(message.get("timestamp"))
+    }
+
+
+def append_messages(db: Session, session_id: str, new_messages: List[Dict], triage_level: Optional[str] = None,
+                    summary: Optional[str] = None, red_flag: Optional[str] = None,
+                    commit: bool = True) -> ConversationSession:
+    """
+    Append new messages to a conversation and update its aggregates.
+    Only the new rows are written, so a turn costs the same regardless of
+    how long the conversation already is. If a concurrent writer took the
+    same seq numbers first, the write fails on the primary key and the turn
+    is re-read and retried. Pass commit=False to batch several sessions into
+    one transaction; such conflicts are then left to the caller.
+    """
+    attempts = APPEND_RETRIES + 1 if commit else 1
+    for attempt in range(attempts):
+        try:
+            session = db.get(ConversationSession, session_id)
+            if session is None:
+                session = ConversationSession(session_id=session_id, message_count=0)
+                db.add(session)
+
+            start = session.message_count or 0
+            if new_messages:
+                db.execute(
+                    ConversationMessage.__table__.insert(),
+                    [_message_row(session_id, start + offset, message) for offset, message in enumerate(new_messages)]
+                )
+            session.message_count = start + len(new_messages)
+            session.triage_level = triage_level
+            session.summary = summary
+            session.red_flag_detected = red_flag
+            session.updated_at = datetime.now()
+
+            if commit:
+                with stage_timer("db_commit"):
+                    db.commit()
+            else:
+                db.flush()
+            return session
+        except IntegrityError:
+            if attempt + 1 == attempts:
+                raise
+            db.rollback()
+
+
+def save_conversation(db: Session, session_id: str, history: List[Dict], new_messages: List[Dict],
+                      triage_level: Optional[str] = None, summary: Optional[str] = None,
+                      red_flag: Optional[str] = None) -> ConversationSession:
+    """
+    Save a turn for a client that sends its own conversation history.
+    The turn's new_messages are always appended. The client history is
+    stored only when the session has nothing stored yet; after that the
+    stored log already holds the turns this server answered, and a client
+    copy that is shorter or edited is not reconciled against it.
+    """
+    stored = db.query(ConversationSession.message_count).filter(
+        ConversationSession.session_id == session_id
+    ).scalar() or 0
+    messages = new_messages if stored else list(history) + list(new_messages)
+    return append_messages(db, session_id, messages, triage_level, summary, red_flag)
 
 
 def get_conversation(db: Session, session_id: str) -> Optional[ConversationSession]:
     """Get conversation session by ID"""
     return db.query(ConversationSession).filter(ConversationSession.session_id == session_id).first()
 
+
+def get_messages(db: Session, session_id: str, limit: Optional[int] = None) -> List[ConversationMessage]:
+    """Get conversation messages in order, optionally only the most recent `limit`"""
+    query = db.query(ConversationMessage).filter(ConversationMessage.session_id == session_id)
+    if limit is not None:
+        recent = query.order_by(ConversationMessage.seq.desc()).limit(limit).all()
+        return list(reversed(recent))
+    return query.order_by(ConversationMessage.seq).all()
+
+
+async def append_messages_async(db: AsyncSession, session_id: str, new_messages: List[Dict],
+                                triage_level: Optional[str] = None, summary: Optional[str] = None,
+                                red_flag: Optional[str] = None, commit: bool = True) -> ConversationSession:
+    """Async variant of append_messages"""
+    attempts = APPEND_RETRIES + 1 if commit else 1
+    for attempt in range(attempts):
+        try:
+            session = await db.get(ConversationSession, session_id)
+            if session is None:
+                session = ConversationSession(session_id=session_id, message_count=0)
+                db.add(session)
+
+            start = session.message_count or 0
+            if new_messages:
+                await db.execute(
+                    ConversationMessage.__table__.insert(),
+                    [_message_row(session_id, start + offset, message) for offset, message in enumerate(new_messages)]
+                )
+            session.message_count = start + len(new_messages)
+            session.triage_level = triage_level
+            session.summary = summary
+            session.red_flag_detected = red_flag
+            session.updated_at = datetime.now()
+
+            if commit:
+                with stage_timer("db_commit"):
+                    await db.commit()
+            else:
+                await db.flush()
+            return session
+        except IntegrityError:
+            if attempt + 1 == attempts:
+                raise
+            await db.rollback()
+
+
+async def save_conversation_async(db: AsyncSession, session_id: str, history: List[Dict], new_messages: List[Dict],
+                                  triage_level: Optional[str] = None, summary: Optional[str] = None,
+                                  red_flag: Optional[str] = None) -> ConversationSession:
+    """Async variant of save_conversation"""
+    stored = (await db.execute(
+        select(ConversationSession.message_count).where(ConversationSession.session_id == session_id)
+    )).scalar() or 0
+    messages = new_messages if stored else list(history) + list(new_messages)
+    return await append_messages_async(db, session_id, messages, triage_level, summary, red_flag)
+
+
+async def get_conversation_async(db: AsyncSession, session_id: str) -> Optional[ConversationSession]:
+    """Async variant of get_conversation"""
+    return await db.get(ConversationSession, session_id)
+
+
+async def get_messages_async(db: AsyncSession, session_id: str,
+                             limit: Optional[int] = None) -> List[ConversationMessage]:
+    """Async variant of get_messages"""
+    query = select(ConversationMessage).where(ConversationMessage.session_id == session_id)
+    if limit is not None:
+        recent = (await db.scalars(query.order_by(ConversationMessage.seq.desc()).limit(limit))).all()
+        return list(reversed(recent))
+    return list((await db.scalars(query.order_by(ConversationMessage.seq))).all())
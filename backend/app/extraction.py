@@ -0,0 +1,200 @@
+"""Single-pass extraction of temperature, age group and duration from a message"""
+import re
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional
+
+
+AGE_GROUPS = ("infant", "child", "teenager", "adult", "senior")
+
+_AGE_WORDS = {
+    "infant": "infant", "infants": "infant", "baby": "infant", "babies": "infant",
+    "newborn": "infant", "newborns": "infant",
+    "child": "child", "children": "child", "kid": "child", "kids": "child",
+    "toddler": "child", "toddlers": "child",
+    "teen": "teenager", "teens": "teenager", "teenager": "teenager", "teenagers": "teenager",
+    "adolescent": "teenager", "adolescents": "teenager",
+    "adult": "adult", "adults": "adult", "grown up": "adult", "grown-up": "adult", "grownup": "adult",
+    "senior": "senior", "seniors": "senior", "elderly": "senior", "older adult": "senior",
+    "older adults": "senior",
+}
+
+_COUNT_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "a couple of": 2, "couple of": 2, "a few": 3, "few": 3, "several": 3,
+}
+
+# Length of each period in days, keyed by its first letters
+_PERIOD_DAYS = {"mi": 1 / 1440, "h": 1 / 24, "d": 1.0, "w": 7.0, "mo": 30.0, "y": 365.0}
+
+_PERIOD = r"minutes?|mins?|hours?|hrs?|days?|weeks?|wks?|months?|mos?|years?|yrs?"
+
+_AGE_WORD_PATTERN = "|".join(sorted((re.escape(word) for word in _AGE_WORDS), key=len, reverse=True))
+_COUNT_PATTERN = "|".join(sorted((re.escape(word) for word in _COUNT_WORDS), key=len, reverse=True))
+
+# One alternation scanned left to right over the lowercased message, so each
+# message is read once whatever it mentions. Every alternative starts at a word
+# boundary with one of a few characters; the leading lookahead lets the engine
+# skip other positions cheaply. Matching lowercased text without IGNORECASE
+# keeps the literal prefixes fast.
+_PATTERN = re.compile(
+    rf"""
+    \b(?=[0-9a-z])(?:
+        age[d]?(?:\s+is)?[\s:]*(?P<age_years>\d{{1,3}})\b
+      | (?:i['’]?m|i\ am|he['’]s|she['’]s|he\ is|she\ is)\s+(?P<stated_age>\d{{1,3}}(?:\.\d+)?)
+        (?:[\s-]*(?:years?|yrs?)\b(?:[\s-]*old\b)?)?(?![\s-]*(?:{_PERIOD})\b)
+      | (?<!\.)(?P<number>\d+(?:\.\d+)?)
+        (?:
+            [\s-]*(?P<period>{_PERIOD})\b(?P<old>[\s-]*old\b)?
+          | \s*(?P<degree>degrees?\b|°|º)?\s*(?P<unit>fahrenheit\b|celsius\b|f\b|c\b)?
+        )
+      | (?P<count>{_COUNT_PATTERN})[\s-]+(?P<count_period>{_PERIOD})\b(?P<count_old>[\s-]*old\b)?
+      | (?P<yesterday>yesterday|last\ night)\b
+      | (?P<age_word>{_AGE_WORD_PATTERN})\b
+      | (?P<high>high|very\ hot|burning\ up)\b
+    )
+    """,
+    re.VERBOSE
+)
+
+# Bare numbers are only read as temperatures inside a plausible body temperature range
+_PLAUSIBLE_CELSIUS = (34.0, 43.0)
+_PLAUSIBLE_FAHRENHEIT = (93.0, 110.0)
+
+
+class Temperature(NamedTuple):
+    """A temperature as stated, with its unit ("F" or "C")"""
+    value: float
+    unit: str
+    explicit: bool
+
+    @property
+    def fahrenheit(self) -> float:
+        return self.value if self.unit == "F" else self.value * 9 / 5 + 32
+
+    @property
+    def celsius(self) -> float:
+        return self.value if self.unit == "C" else (self.value - 32) * 5 / 9
+
+
+class Extraction(NamedTuple):
+    """
+    Facts found in one message; fields are None when not mentioned.
+    ignored_numbers is set when a number was read but not used as the
+    temperature, an age or a duration, e.g. a bare reading next to a marked one.
+    """
+    temperature: Optional[Temperature]
+    age_group: Optional[str]
+    duration_days: Optional[float]
+    high_fever: bool
+    ignored_numbers: bool
+
+
+def _period_days(period: str) -> float:
+    return _PERIOD_DAYS.get(period[:2], _PERIOD_DAYS.get(period[0], 1.0))
+
+
+def _age_group_for(years: float) -> str:
+    if years < 1:
+        return "infant"
+    if years < 13:
+        return "child"
+    if years < 20:
+        return "teenager"
+    if years < 65:
+        return "adult"
+    return "senior"
+
+
+def _infer_unit(value: float) -> str:
+    """Unit of a temperature given without one: body temperatures in Celsius are below 50"""
+    return "C" if value <= 50 else "F"
+
+
+@lru_cache(maxsize=1024)
+def extract(text: str) -> Extraction:
+    """
+    Extract temperature, age group and duration from a message in one pass.
+    An explicitly marked temperature ("101 F", "38.5 degrees") wins over a
+    bare number; bare numbers count only in a plausible range. Of several
+    readings the highest is kept, so "99 yesterday, now 104.5" is 104.5. A
+    number stated as someone's age ("I'm 40", "age 40") is never a
+    temperature. When several ages are mentioned the youngest group is kept,
+    and when several durations are mentioned the longest is kept.
+    """
+    explicit: Optional[Temperature] = None
+    bare: Optional[Temperature] = None
+    age_rank: Optional[int] = None
+    duration: Optional[float] = None
+    high_fever = False
+    ignored_numbers = False
+
+    for match in _PATTERN.finditer(text.lower()):
+        group = match.lastgroup
+        years = None
+        days = None
+        if match.group("number") is not None:
+            value = float(match.group("number"))
+            period = match.group("period")
+            if period is not None:
+                if match.group("old") is not None:
+                    years = value * _period_days(period) / 365
+                else:
+                    days = value * _period_days(period)
+            elif match.group("degree") or match.group("unit"):
+                unit = match.group("unit")
+                reading = Temperature(value, unit[0].upper() if unit else _infer_unit(value), True)
+                if explicit is None or reading.fahrenheit > explicit.fahrenheit:
+                    explicit = reading
+            else:
+                reading = None
+                if _PLAUSIBLE_CELSIUS[0] <= value <= _PLAUSIBLE_CELSIUS[1]:
+                    reading = Temperature(value, "C", False)
+                elif _PLAUSIBLE_FAHRENHEIT[0] <= value <= _PLAUSIBLE_FAHRENHEIT[1]:
+                    reading = Temperature(value, "F", False)
+                if reading is None:
+                    ignored_numbers = True
+                elif bare is None or reading.fahrenheit > bare.fahrenheit:
+                    bare = reading
+        elif group == "stated_age":
+            # "I'm 40": an age, never a temperature; a decimal is neither
+            value = float(match.group("stated_age"))
+            if value.is_integer():
+                years = value
+            else:
+                ignored_numbers = True
+        elif match.group("count") is not None:
+            count = _COUNT_WORDS[match.group("count")]
+            if match.group("count_old") is not None:
+                years = count * _period_days(match.group("count_period")) / 365
+            else:
+                days = count * _period_days(match.group("count_period"))
+        elif group == "age_years":
+            years = float(match.group("age_years"))
+        elif group == "yesterday":
+            days = 1.0
+        elif group == "age_word":
+            rank = AGE_GROUPS.index(_AGE_WORDS[match.group("age_word")])
+            age_rank = rank if age_rank is None else min(age_rank, rank)
+        elif group == "high":
+            high_fever = True
+
+        if years is not None:
+            rank = AGE_GROUPS.index(_age_group_for(years))
+            age_rank = rank if age_rank is None else min(age_rank, rank)
+        if days is not None:
+            duration = days if duration is None else max(duration, days)
+
+    return Extraction(
+        explicit or bare,
+        AGE_GROUPS[age_rank] if age_rank is not None else None,
+        duration,
+        high_fever,
+        ignored_numbers or (explicit is not None and bare is not None)
+    )
+
+
+def extract_batch(texts: Iterable[str]) -> List[Extraction]:
+    """Run `extract` over a list of messages, bypassing the cache"""
+    extract_one = extract.__wrapped__
+    return [extract_one(text) for text in texts]
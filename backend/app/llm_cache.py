@@ -0,0 +1,142 @@
+"""LLM response cache keyed on the normalized conversation"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?,;:]+$")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", text.lower()).strip())
+
+
+def make_key(kind: str, provider: str, prompt_versions: Sequence[str], conversation: List[Dict]) -> str:
+    """Stable hash of the call kind, provider, prompt versions and normalized conversation"""
+    payload = json.dumps(
+        [kind, provider, list(prompt_versions),
+         [[msg.get("role", "user"), normalize_text(msg.get("content", ""))] for msg in conversation]],
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Bounded in-memory LRU with a TTL, optionally backed by a SQLite file so
+    entries survive restarts and are shared between workers on one host.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 3600.0, disk_path: str = "",
+                 disk_max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached value, checking memory first and then the disk tier"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, expires FROM llm_cache WHERE key = ? AND expires > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+                    self._store_memory(key, row[0], row[1])
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Store a value in memory and, if configured, on disk"""
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store_memory(key, value, expires)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires) VALUES (?, ?, ?)",
+                    (key, value, expires)
+                )
+                self._disk_writes += 1
+                if self._disk_writes % 1000 == 0:
+                    self._prune_disk()
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict:
+        """Cache counters"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def _store_memory(self, key: str, value: str, expires: float):
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self):
+        """Remove expired rows and keep the disk tier within its bound"""
+        self._disk.execute("DELETE FROM llm_cache WHERE expires <= ?", (time.time(),))
+        self._disk.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+
+
+llm_cache = LLMCache(
+    max_entries=settings.llm_cache_size,
+    ttl=settings.llm_cache_ttl,
+    disk_path=settings.llm_cache_path
+)
@@ -1,31 +1,27 @@
 """LLM service for HealthGuide triage"""
+import asyncio
 import json
 import os
-from typing import List, Dict, Optional
-from openai import OpenAI
-import google.generativeai as genai
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Dict, NamedTuple, Optional, Tuple, AsyncIterator
 
 from app.config import settings
 from app.models import Message, TriageResult, TriageLevel
 from app.red_flags import check_red_flags, get_red_flag_response
+from app.rules import build_red_flag_triage, evaluate as evaluate_rules, rule_engine
+from app.prompt_registry import prompt_registry, estimate_tokens
+from app.context_window import context_builder
+from app.llm_cache import llm_cache, make_key
+from app.router import create_router, remaining_budget, request_budget
+from app.rate_limit import backoff_delay, rate_limiter, throttle_delay
+from app.metrics import (
+    STAGE_SECONDS, LLM_CALLS, LLM_ERRORS, LLM_IN_FLIGHT, LLM_ROUTER_EVENTS, LLM_THROTTLED, LLM_TOKENS,
+    stage_timer, timed_stage
+)
 
 
-def load_prompt_template(file_path: str) -> str:
-    """Load prompt template from file"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        return ""
-
-
-def get_system_prompt() -> str:
-    """Get system prompt for HealthGuide"""
-    prompt_path = os.path.join(os.path.dirname(__file__), "..", "prompts", "system_prompt_healthguide.txt")
-    prompt = load_prompt_template(prompt_path)
-    if not prompt:
-        # Fallback prompt
-        prompt = """You are HealthGuide, a compassionate and cautious AI assistant for the Fever Helpline.
+SYSTEM_PROMPT_FALLBACK = """You are HealthGuide, a compassionate and cautious AI assistant for the Fever Helpline.
 
 Core Principles:
 1. Safety First - always prioritize user safety
@@ -36,16 +32,8 @@ Core Principles:
 You are NOT a doctor and cannot provide a diagnosis. You only provide triage-level guidance.
 
 Always ask one question at a time. Be empathetic and clear."""
-    return prompt
-
 
-def get_triage_prompt() -> str:
-    """Get triage prompt template"""
-    prompt_path = os.path.join(os.path.dirname(__file__), "..", "prompts", "triage_prompt.txt")
-    prompt = load_prompt_template(prompt_path)
-    if not prompt:
-        # Fallback prompt
-        prompt = """Based on the conversation history, assess the situation and provide:
+TRIAGE_PROMPT_FALLBACK = """Based on the conversation history, assess the situation and provide:
 1. Triage level (EMERGENCY, URGENT, SELF_CARE, or FOLLOW_UP)
 2. Whether to escalate to emergency care
 3. A brief summary
@@ -53,26 +41,223 @@ def get_triage_prompt() -> str:
 5. Next question to ask (if conversation not complete)
 
 Respond in JSON format."""
-    return prompt
+
+COMBINED_PROMPT_FALLBACK = """In the same JSON object, also include a "reply" field with your message to the user for this turn."""
+
+# Prompts are loaded and validated once at import, then served from memory
+prompt_registry.register("system", "system_prompt_healthguide.txt", SYSTEM_PROMPT_FALLBACK)
+prompt_registry.register("triage", "triage_prompt.txt", TRIAGE_PROMPT_FALLBACK,
+                         required=["JSON", "triage_level"])
+prompt_registry.register("combined", "combined_turn_prompt.txt", COMBINED_PROMPT_FALLBACK,
+                         required=["reply"])
+
+
+def get_system_prompt() -> str:
+    """Get system prompt for HealthGuide"""
+    return prompt_registry.text("system")
+
+
+def get_triage_prompt() -> str:
+    """Get triage prompt template"""
+    return prompt_registry.text("triage")
+
+
+def get_combined_prompt() -> str:
+    """Get the combined triage + reply instructions"""
+    return get_triage_prompt() + "\n\n" + prompt_registry.text("combined")
+
+
+# Completion tokens reserved against the TPM limit when a call sets no max_tokens
+COMPLETION_TOKEN_ESTIMATE = 500
+
+APOLOGY_MESSAGE = "I apologize, but I'm having trouble processing your request. Please try again. Error: {error}"
+
+
+def build_fallback_triage() -> TriageResult:
+    """Safe default triage result used when the LLM cannot be reached or parsed"""
+    return TriageResult(
+        triage_level=TriageLevel.FOLLOW_UP,
+        escalate=False,
+        summary="Fever symptoms reported. Please consult with a healthcare provider.",
+        recommended_next_steps=[
+            "Monitor your symptoms",
+            "Stay hydrated",
+            "Get plenty of rest",
+            "Consult a healthcare provider if symptoms persist or worsen"
+        ],
+        next_question="Is there anything else you'd like to tell me about your symptoms?",
+        red_flag_detected=False
+    )
+
+
+def parse_triage_json(result_json: Dict) -> TriageResult:
+    """Convert an LLM JSON verdict into a TriageResult"""
+    triage_level = TriageLevel(result_json.get("triage_level", "FOLLOW_UP"))
+    return TriageResult(
+        triage_level=triage_level,
+        escalate=result_json.get("escalate", False),
+        summary=result_json.get("summary", "Fever-related symptoms detected"),
+        recommended_next_steps=result_json.get("recommended_next_steps", []),
+        next_question=result_json.get("next_question"),
+        red_flag_detected=False
+    )
+
+
+def _setup_openai(service: "LLMService"):
+    import httpx
+    from openai import OpenAI, AsyncOpenAI
+
+    base_url = settings.openai_base_url or None
+    service.client = OpenAI(api_key=settings.openai_api_key, base_url=base_url, timeout=settings.llm_timeout)
+    # One pooled HTTP client shared by every async call on this worker
+    service.http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_connections
+        ),
+        timeout=settings.llm_timeout
+    )
+    # Rate-limited calls are retried by _call_with_retries, within the request budget
+    service.async_client = AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        base_url=base_url,
+        timeout=settings.llm_timeout,
+        max_retries=0,
+        http_client=service.http_client
+    )
+
+
+def _setup_gemini(service: "LLMService"):
+    import google.generativeai as genai
+
+    genai.configure(api_key=settings.gemini_api_key)
+    service.model = genai.GenerativeModel('gemini-pro')
+
+
+class ProviderBackend(NamedTuple):
+    """An LLM provider: its display name, API key setting and client setup"""
+    name: str
+    api_key_setting: str
+    setup: Callable[["LLMService"], None]
+
+
+# Provider SDKs are imported by `setup`, so only configured providers are ever loaded
+PROVIDER_BACKENDS: Dict[str, ProviderBackend] = {
+    "openai": ProviderBackend("OpenAI", "openai_api_key", _setup_openai),
+    "gemini": ProviderBackend("Gemini", "gemini_api_key", _setup_gemini),
+}
 
 
 class LLMService:
     """LLM service for HealthGuide"""
-    
+
     def __init__(self):
         self.provider = settings.llm_provider
-        if self.provider == "openai":
-            if not settings.openai_api_key:
-                raise ValueError("OpenAI API key not found")
-            self.client = OpenAI(api_key=settings.openai_api_key)
-        elif self.provider == "gemini":
-            if not settings.gemini_api_key:
-                raise ValueError("Gemini API key not found")
-            genai.configure(api_key=settings.gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
-        else:
+        backend = PROVIDER_BACKENDS.get(self.provider)
+        if backend is None:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
-    
+        if not getattr(settings, backend.api_key_setting):
+            raise ValueError(f"{backend.name} API key not found")
+
+        # The configured provider first, then the others if failover is on and their keys are set
+        self.providers = [self.provider]
+        if settings.llm_failover:
+            self.providers += [
+                provider for provider, other in PROVIDER_BACKENDS.items()
+                if provider != self.provider and getattr(settings, other.api_key_setting)
+            ]
+        for provider in self.providers:
+            PROVIDER_BACKENDS[provider].setup(self)
+        self.router = create_router(self.providers)
+        self._semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+
+    @staticmethod
+    def _prior_history(conversation_history: List[Dict], current_message: Optional[str]) -> List[Dict]:
+        """History without a trailing copy of the current user message, which is sent separately"""
+        if (current_message is not None and conversation_history
+                and conversation_history[-1].get("role", "user") == "user"
+                and conversation_history[-1].get("content", "") == current_message):
+            return conversation_history[:-1]
+        return conversation_history
+
+    @timed_stage("prompt_build")
+    def _build_openai_messages(self, messages: List[Message], conversation_history: List[Dict]) -> List[Dict]:
+        """Format the conversation for the OpenAI chat API within the context token budget"""
+        system_prompt = prompt_registry.get("system")
+        current = messages[-1] if messages else None
+        history = self._prior_history(conversation_history, current.content if current else None)
+        reserved = system_prompt.token_estimate + (estimate_tokens(current.content) if current else 0)
+        window = context_builder.build(history, reserved_tokens=reserved)
+
+        # System prompt, then the block-stable summary, then recent turns: a stable prefix
+        formatted_messages = [{"role": "system", "content": system_prompt.text}]
+        if window.summary:
+            formatted_messages.append({"role": "system", "content": window.summary})
+        for msg in window.messages:
+            formatted_messages.append({
+                "role": msg.get("role", "user"),
+                "content": msg.get("content", "")
+            })
+
+        # Add current message
+        if current:
+            formatted_messages.append({
+                "role": current.role,
+                "content": current.content
+            })
+        return formatted_messages
+
+    @timed_stage("prompt_build")
+    def _build_gemini_context(self, messages: List[Message], conversation_history: List[Dict]) -> str:
+        """Format the conversation as a single Gemini prompt within the context token budget"""
+        system_prompt = prompt_registry.get("system")
+        current = messages[-1] if messages else None
+        history = self._prior_history(conversation_history, current.content if current else None)
+        reserved = system_prompt.token_estimate + (estimate_tokens(current.content) if current else 0)
+        window = context_builder.build(history, reserved_tokens=reserved)
+
+        parts = [system_prompt.text, "\n\n"]
+        if window.summary:
+            parts += [window.summary, "\n\n"]
+        parts.append("Conversation History:\n")
+        for msg in window.messages:
+            parts.append(f"{msg.get('role', 'user')}: {msg.get('content', '')}\n")
+        if current:
+            parts.append(f"\nUser: {current.content}\n\nAssistant:")
+        return "".join(parts)
+
+    @timed_stage("prompt_build")
+    def _build_triage_request(self, conversation_history: List[Dict], current_message: str,
+                              provider: Optional[str] = None):
+        """Build provider-specific arguments for the triage JSON call"""
+        system_prompt = prompt_registry.get("system")
+        triage_prompt = prompt_registry.get("triage")
+        history = self._prior_history(conversation_history, current_message)
+        reserved = system_prompt.token_estimate + triage_prompt.token_estimate + estimate_tokens(current_message)
+        window = context_builder.build(history, reserved_tokens=reserved)
+
+        # Build context from conversation
+        parts = []
+        if window.summary:
+            parts += [window.summary, "\n\n"]
+        parts.append("Conversation History:\n")
+        for msg in window.messages:
+            parts.append(f"{msg.get('role', 'user')}: {msg.get('content', '')}\n")
+        parts += [f"\nCurrent message: {current_message}\n\n", triage_prompt.text]
+        context = "".join(parts)
+
+        if (provider or self.provider) == "openai":
+            return dict(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": system_prompt.text},
+                    {"role": "user", "content": context}
+                ],
+                temperature=0.7,
+                response_format={"type": "json_object"}
+            )
+        return dict(prompt=system_prompt.text + "\n\n" + context + "\n\nRespond in JSON format only.")
+
     def generate_response(self, messages: List[Message], conversation_history: List[Dict]) -> str:
         """Generate response using LLM"""
         if self.provider == "openai":
@@ -81,126 +266,397 @@ class LLMService:
             return self._generate_gemini_response(messages, conversation_history)
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
-    
+
     def _generate_openai_response(self, messages: List[Message], conversation_history: List[Dict]) -> str:
         """Generate response using OpenAI"""
-        system_prompt = get_system_prompt()
-        
-        # Format messages for OpenAI
-        formatted_messages = [{"role": "system", "content": system_prompt}]
-        for msg in conversation_history:
-            formatted_messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
-        
-        # Add current message
-        if messages:
-            formatted_messages.append({
-                "role": messages[-1].role,
-                "content": messages[-1].content
-            })
-        
+        formatted_messages = self._build_openai_messages(messages, conversation_history)
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=formatted_messages,
-                temperature=0.7,
-                max_tokens=500
-            )
+            with self._track_call("reply"):
+                response = self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=formatted_messages,
+                    temperature=0.7,
+                    max_tokens=500
+                )
+            self._record_usage("reply", response.usage, formatted_messages, response.choices[0].message.content)
             return response.choices[0].message.content
         except Exception as e:
-            return f"I apologize, but I'm having trouble processing your request. Please try again. Error: {str(e)}"
-    
+            return APOLOGY_MESSAGE.format(error=str(e))
+
     def _generate_gemini_response(self, messages: List[Message], conversation_history: List[Dict]) -> str:
         """Generate response using Gemini"""
-        system_prompt = get_system_prompt()
-        
-        # Build conversation context
-        context = system_prompt + "\n\nConversation History:\n"
-        for msg in conversation_history:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            context += f"{role}: {content}\n"
-        
-        if messages:
-            context += f"\nUser: {messages[-1].content}\n\nAssistant:"
-        
+        context = self._build_gemini_context(messages, conversation_history)
         try:
-            response = self.model.generate_content(context)
+            with self._track_call("reply"):
+                response = self.model.generate_content(context)
+            self._record_usage("reply", None, context, response.text)
             return response.text
         except Exception as e:
-            return f"I apologize, but I'm having trouble processing your request. Please try again. Error: {str(e)}"
-    
+            return APOLOGY_MESSAGE.format(error=str(e))
+
     def assess_triage(self, conversation_history: List[Dict], current_message: str) -> TriageResult:
         """Assess triage level and generate recommendations"""
         # Check for red flags first
         red_flag = check_red_flags(current_message)
         if red_flag:
-            return TriageResult(
-                triage_level=TriageLevel.EMERGENCY,
-                escalate=True,
-                summary=f"Red flag symptom detected: {red_flag}",
-                recommended_next_steps=[
-                    "Call emergency services immediately",
-                    "Go to the nearest emergency room",
-                    "Do not delay seeking medical attention"
-                ],
-                red_flag_detected=True,
-                red_flag_symptom=red_flag
-            )
-        
+            return build_red_flag_triage(red_flag)
+
         # Use LLM for triage assessment
         try:
-            # Build context from conversation
-            context = "Conversation History:\n"
-            for msg in conversation_history:
-                context += f"{msg.get('role', 'user')}: {msg.get('content', '')}\n"
-            context += f"\nCurrent message: {current_message}\n\n"
-            context += get_triage_prompt()
-            
+            request = self._build_triage_request(conversation_history, current_message)
             if self.provider == "openai":
-                response = self.client.chat.completions.create(
+                with self._track_call("triage"):
+                    response = self.client.chat.completions.create(**request)
+                content = response.choices[0].message.content
+                self._record_usage("triage", response.usage, request["messages"], content)
+            else:  # gemini
+                with self._track_call("triage"):
+                    response = self.model.generate_content(request["prompt"])
+                content = response.text
+                self._record_usage("triage", None, request["prompt"], content)
+            result_json = json.loads(content)
+            return parse_triage_json(result_json)
+        except Exception:
+            # Fallback to safe default
+            return build_fallback_triage()
+
+    def _cache_keys(self, kind: str, conversation_history: List[Dict],
+                    current_message: str) -> Optional[Dict[str, str]]:
+        """
+        Response cache key for a call per provider, or None when the call must
+        go to the provider. Entries are keyed on the provider that answered,
+        which after failover or hedging is not always the primary.
+        """
+        if not settings.llm_cache_enabled or check_red_flags(current_message):
+            return None
+        user_turns = sum(1 for msg in conversation_history if msg.get("role", "user") == "user")
+        if user_turns > settings.llm_cache_max_turns:
+            return None
+        prompt_versions = [prompt_registry.get(name).version for name in ("system", "triage", "combined")]
+        conversation = conversation_history + [{"role": "user", "content": current_message}]
+        return {provider: make_key(kind, provider, prompt_versions, conversation) for provider in self.providers}
+
+    def _cache_get(self, cache_keys: Optional[Dict[str, str]]) -> Optional[str]:
+        """Cached response from any provider, preferring them in routing order"""
+        for key in (cache_keys or {}).values():
+            cached = llm_cache.get(key)
+            if cached is not None:
+                return cached
+        return None
+
+    @contextmanager
+    def _track_call(self, kind: str, provider: Optional[str] = None):
+        """Count and time one provider call, recording its error type if it fails"""
+        provider = provider or self.provider
+        LLM_CALLS.inc(provider=provider, kind=kind)
+        try:
+            with LLM_IN_FLIGHT.track(provider=provider), stage_timer(f"{kind}_llm"):
+                yield
+        except Exception as e:
+            LLM_ERRORS.inc(provider=provider, kind=kind, error=type(e).__name__)
+            raise
+
+    def _record_usage(self, kind: str, usage, prompt, completion: Optional[str], provider: Optional[str] = None):
+        """Add token counts from the provider's usage report, estimating any it leaves out"""
+        provider = provider or self.provider
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or self._prompt_tokens(prompt)
+        completion_tokens = getattr(usage, "completion_tokens", 0) or estimate_tokens(completion or "")
+        LLM_TOKENS.inc(prompt_tokens, provider=provider, kind=kind, type="prompt")
+        LLM_TOKENS.inc(completion_tokens, provider=provider, kind=kind, type="completion")
+        return prompt_tokens + completion_tokens
+
+    @staticmethod
+    def _prompt_tokens(prompt) -> int:
+        if isinstance(prompt, str):
+            return estimate_tokens(prompt)
+        return sum(estimate_tokens(msg.get("content", "")) for msg in prompt)
+
+    async def _call_with_retries(self, provider: str, kind: str, tokens: int, call,
+                                 usage: Callable[[object], int] = lambda response: 0):
+        """
+        Send one call within the outbound rate limits. A rate-limited (429)
+        call is retried with jittered exponential backoff while the request
+        budget allows, so throttling shows up as delay rather than an error.
+        Each attempt's token reservation is settled with usage(response), or
+        released when the attempt fails or is cancelled (a losing hedge).
+        """
+        attempt = 0
+        while True:
+            await rate_limiter.acquire(provider, tokens)
+            # Failed and cancelled calls use no tokens
+            used = 0
+            try:
+                response = await call()
+                used = usage(response)
+                return response
+            except Exception as e:
+                retry_after = throttle_delay(e)
+                if retry_after is None:
+                    raise
+                delay = backoff_delay(attempt, retry_after)
+                remaining = remaining_budget()
+                if attempt >= settings.llm_max_retries or (remaining is not None and delay >= remaining):
+                    LLM_THROTTLED.inc(provider=provider, kind=kind, outcome="gave_up")
+                    raise
+                LLM_THROTTLED.inc(provider=provider, kind=kind, outcome="retried")
+                # Tell the other workers too when the provider says how long to wait
+                rate_limiter.block(provider, retry_after)
+            finally:
+                rate_limiter.settle(provider, tokens, used)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _acquire_slot(self):
+        """Wait for the concurrency cap, recording the wait as its own stage"""
+        start = time.perf_counter()
+        await self._semaphore.acquire()
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm_queue")
+
+    async def _openai_completion_async(self, kind: str, **kwargs) -> str:
+        """Run one OpenAI chat completion on the shared async client"""
+        prompt = kwargs.get("messages", [])
+        reserved = self._prompt_tokens(prompt) + kwargs.get("max_tokens", COMPLETION_TOKEN_ESTIMATE)
+
+        async def call():
+            await self._acquire_slot()
+            try:
+                with self._track_call(kind, "openai"):
+                    return await self.async_client.chat.completions.create(**kwargs)
+            finally:
+                self._semaphore.release()
+
+        def usage(response) -> int:
+            return self._record_usage(kind, response.usage, prompt, response.choices[0].message.content, "openai")
+
+        response = await self._call_with_retries("openai", kind, reserved, call, usage)
+        return response.choices[0].message.content
+
+    async def _gemini_completion_async(self, kind: str, prompt: str) -> str:
+        """Run one Gemini completion through the async API"""
+        reserved = self._prompt_tokens(prompt) + COMPLETION_TOKEN_ESTIMATE
+
+        async def call():
+            await self._acquire_slot()
+            try:
+                with self._track_call(kind, "gemini"):
+                    return await asyncio.wait_for(
+                        self.model.generate_content_async(prompt),
+                        timeout=settings.llm_timeout
+                    )
+            finally:
+                self._semaphore.release()
+
+        def usage(response) -> int:
+            return self._record_usage(kind, None, prompt, response.text, "gemini")
+
+        response = await self._call_with_retries("gemini", kind, reserved, call, usage)
+        return response.text
+
+    async def generate_response_async(self, messages: List[Message], conversation_history: List[Dict]) -> str:
+        """Generate response without blocking the event loop"""
+        try:
+            return await self._generate_reply_async(messages, conversation_history)
+        except Exception as e:
+            return APOLOGY_MESSAGE.format(error=str(e) or type(e).__name__)
+
+    async def _generate_reply_async(self, messages: List[Message], conversation_history: List[Dict]) -> str:
+        """Reply from the cache or a provider; raises when every provider fails"""
+        cache_keys = self._cache_keys("reply", conversation_history, messages[-1].content if messages else "")
+        cached = self._cache_get(cache_keys)
+        if cached is not None:
+            return cached
+
+        async def attempt(provider: str) -> Tuple[str, str]:
+            if provider == "openai":
+                return provider, await self._openai_completion_async(
+                    "reply",
                     model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": get_system_prompt()},
-                        {"role": "user", "content": context}
-                    ],
+                    messages=self._build_openai_messages(messages, conversation_history),
                     temperature=0.7,
-                    response_format={"type": "json_object"}
+                    max_tokens=500
                 )
-                result_json = json.loads(response.choices[0].message.content)
-            else:  # gemini
-                prompt = get_system_prompt() + "\n\n" + context + "\n\nRespond in JSON format only."
-                response = self.model.generate_content(prompt)
-                result_json = json.loads(response.text)
-            
-            # Parse JSON response
-            triage_level = TriageLevel(result_json.get("triage_level", "FOLLOW_UP"))
-            return TriageResult(
-                triage_level=triage_level,
-                escalate=result_json.get("escalate", False),
-                summary=result_json.get("summary", "Fever-related symptoms detected"),
-                recommended_next_steps=result_json.get("recommended_next_steps", []),
-                next_question=result_json.get("next_question"),
-                red_flag_detected=False
+            return provider, await self._gemini_completion_async(
+                "reply",
+                self._build_gemini_context(messages, conversation_history)
             )
+
+        provider, reply = await self.router.call(attempt)
+        if cache_keys and reply:
+            llm_cache.set(cache_keys[provider], reply)
+        return reply
+
+    async def stream_response_async(self, messages: List[Message],
+                                    conversation_history: List[Dict]) -> AsyncIterator[str]:
+        """Yield the reply text chunk by chunk as the provider streams it"""
+        cache_keys = self._cache_keys("reply", conversation_history, messages[-1].content if messages else "")
+        cached = self._cache_get(cache_keys)
+        if cached is not None:
+            yield cached
+            return
+
+        # Streams are not hedged; a provider that fails before its first chunk fails over
+        candidates = self.router.available()
+        if not candidates:
+            yield APOLOGY_MESSAGE.format(error="All LLM providers are unavailable")
+            return
+        for index, provider in enumerate(candidates):
+            chunks = []
+            start = time.perf_counter()
+            try:
+                async for chunk in self._stream_provider(provider, messages, conversation_history, chunks):
+                    yield chunk
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # The client went away mid-stream; not the provider's fault
+                    self.router.breakers[provider].release_probe()
+                    raise
+                self.router.record(provider, False)
+                if chunks or index == len(candidates) - 1:
+                    yield APOLOGY_MESSAGE.format(error=str(e) or type(e).__name__)
+                    return
+                LLM_ROUTER_EVENTS.inc(provider=candidates[index + 1], event="failover")
+                continue
+            self.router.record(provider, True, time.perf_counter() - start)
+            break
+        if cache_keys and chunks:
+            llm_cache.set(cache_keys[provider], "".join(chunks))
+
+    async def _stream_provider(self, provider: str, messages: List[Message], conversation_history: List[Dict],
+                               chunks: List[str]) -> AsyncIterator[str]:
+        """Stream one provider's reply, collecting the chunks as they are yielded"""
+        if provider == "openai":
+            prompt = self._build_openai_messages(messages, conversation_history)
+        else:
+            prompt = self._build_gemini_context(messages, conversation_history)
+        reserved = self._prompt_tokens(prompt) + COMPLETION_TOKEN_ESTIMATE
+        await rate_limiter.acquire(provider, reserved)
+        # Failed, throttled and abandoned streams are charged nothing
+        used = 0
+        self.router.breakers[provider].begin()
+        await self._acquire_slot()
+        try:
+            with self._track_call("reply", provider):
+                if provider == "openai":
+                    stream = await self.async_client.chat.completions.create(
+                        model="gpt-3.5-turbo",
+                        messages=prompt,
+                        temperature=0.7,
+                        max_tokens=500,
+                        stream=True
+                    )
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            chunks.append(chunk.choices[0].delta.content)
+                            yield chunk.choices[0].delta.content
+                else:  # gemini
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(prompt, stream=True),
+                        timeout=settings.llm_timeout
+                    )
+                    async for chunk in response:
+                        if chunk.text:
+                            chunks.append(chunk.text)
+                            yield chunk.text
+            # Streaming responses carry no usage report, so both counts are estimates
+            used = self._record_usage("reply", None, prompt, "".join(chunks), provider)
         except Exception as e:
-            # Fallback to safe default
-            return TriageResult(
-                triage_level=TriageLevel.FOLLOW_UP,
-                escalate=False,
-                summary="Fever symptoms reported. Please consult with a healthcare provider.",
-                recommended_next_steps=[
-                    "Monitor your symptoms",
-                    "Stay hydrated",
-                    "Get plenty of rest",
-                    "Consult a healthcare provider if symptoms persist or worsen"
-                ],
-                next_question="Is there anything else you'd like to tell me about your symptoms?",
-                red_flag_detected=False
+            retry_after = throttle_delay(e)
+            if retry_after is not None:
+                # Streams fail over rather than retry, but the other workers still back off
+                LLM_THROTTLED.inc(provider=provider, kind="reply", outcome="gave_up")
+                rate_limiter.block(provider, retry_after)
+            raise
+        finally:
+            self._semaphore.release()
+            rate_limiter.settle(provider, reserved, used)
+
+    async def assess_triage_async(self, conversation_history: List[Dict], current_message: str) -> TriageResult:
+        """Assess triage level without blocking the event loop"""
+        red_flag = check_red_flags(current_message)
+        if red_flag:
+            return build_red_flag_triage(red_flag)
+
+        cache_keys = self._cache_keys("triage", conversation_history, current_message)
+        cached = self._cache_get(cache_keys)
+        if cached is not None:
+            return TriageResult.model_validate_json(cached)
+
+        async def attempt(provider: str) -> Tuple[str, str]:
+            request = self._build_triage_request(conversation_history, current_message, provider)
+            if provider == "openai":
+                return provider, await self._openai_completion_async("triage", **request)
+            return provider, await self._gemini_completion_async("triage", request["prompt"])
+
+        try:
+            provider, content = await self.router.call(attempt)
+            triage_result = parse_triage_json(json.loads(content))
+        except Exception:
+            return build_fallback_triage()
+        if cache_keys:
+            llm_cache.set(cache_keys[provider], triage_result.model_dump_json())
+        return triage_result
+
+    async def assess_and_respond_async(self, messages: List[Message], conversation_history: List[Dict],
+                                       current_message: str) -> Tuple[TriageResult, Optional[str]]:
+        """
+        Produce the triage verdict and the user-facing reply in one completion.
+        The reply is None when a red flag is detected.
+        """
+        red_flag = check_red_flags(current_message)
+        if red_flag:
+            return build_red_flag_triage(red_flag), None
+
+        cache_keys = self._cache_keys("combined", conversation_history, current_message)
+        cached = self._cache_get(cache_keys)
+        if cached is not None:
+            cached_turn = json.loads(cached)
+            return TriageResult.model_validate(cached_turn["triage_result"]), cached_turn["reply"]
+
+        async def attempt(provider: str) -> Tuple[str, str]:
+            if provider == "openai":
+                formatted_messages = self._build_openai_messages(messages, conversation_history)
+                formatted_messages.append({"role": "system", "content": get_combined_prompt()})
+                return provider, await self._openai_completion_async(
+                    "combined",
+                    model="gpt-3.5-turbo",
+                    messages=formatted_messages,
+                    temperature=0.7,
+                    max_tokens=800,
+                    response_format={"type": "json_object"}
+                )
+            context = self._build_gemini_context(messages, conversation_history)
+            return provider, await self._gemini_completion_async(
+                "combined",
+                context + "\n\n" + get_combined_prompt() + "\n\nRespond in JSON format only."
             )
 
+        try:
+            provider, content = await self.router.call(attempt)
+            result_json = json.loads(content)
+            triage_result = parse_triage_json(result_json)
+        except Exception as e:
+            return build_fallback_triage(), APOLOGY_MESSAGE.format(error=str(e) or type(e).__name__)
+
+        reply = result_json.get("reply")
+        if not reply:
+            # The model skipped the reply field; fall back to a dedicated call
+            try:
+                reply = await self._generate_reply_async(messages, conversation_history)
+            except Exception as e:
+                # Only provider replies are cached, never the apology
+                return triage_result, APOLOGY_MESSAGE.format(error=str(e) or type(e).__name__)
+        if cache_keys and reply:
+            llm_cache.set(cache_keys[provider], json.dumps({
+                "triage_result": triage_result.model_dump(mode="json"),
+                "reply": reply
+            }))
+        return triage_result, reply
+
+    async def aclose(self):
+        """Release pooled connections"""
+        if "openai" in self.providers:
+            await self.http_client.aclose()
+
 
 # Initialize LLM service (lazy loading)
 _llm_service: Optional[LLMService] = None
@@ -219,44 +675,70 @@ def get_llm_service() -> LLMService:
     return _llm_service
 
 
+def _discard_llm_service_after_fork():
+    """A forked worker builds its own service; the HTTP clients belong to the parent"""
+    global _llm_service
+    _llm_service = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_discard_llm_service_after_fork)
+
+
+async def run_triage_turn(llm_service, messages: List[Message], conversation_history: List[Dict],
+                          current_message: str, session_id: Optional[str] = None
+                          ) -> Tuple[TriageResult, Optional[str]]:
+    """
+    Run one triage turn using the mode selected by `settings.triage_mode`.
+    sequential: triage call, then reply call
+    parallel: triage and reply calls issued concurrently
+    combined: a single structured completion returning both
+    Clear-cut turns are decided by the rule engine without calling the LLM.
+    The reply is None when a red flag is detected.
+    """
+    decision = rule_engine.decide(conversation_history, current_message, session_id)
+    if decision is not None:
+        return decision.triage_result, decision.reply
+
+    # One deadline shared by every LLM call this turn makes, hedges and failovers included
+    with request_budget(settings.llm_request_budget):
+        mode = settings.triage_mode
+        if mode == "combined":
+            return await llm_service.assess_and_respond_async(messages, conversation_history, current_message)
+
+        if mode == "parallel" and not check_red_flags(current_message):
+            return tuple(await asyncio.gather(
+                llm_service.assess_triage_async(conversation_history, current_message),
+                llm_service.generate_response_async(messages, conversation_history)
+            ))
+
+        triage_result = await llm_service.assess_triage_async(conversation_history, current_message)
+        if triage_result.red_flag_detected:
+            return triage_result, None
+        return triage_result, await llm_service.generate_response_async(messages, conversation_history)
+
+
+async def close_llm_service():
+    """Close the shared LLM service, if one was created"""
+    global _llm_service
+    if _llm_service is not None:
+        await _llm_service.aclose()
+        _llm_service = None
+
+
 class MockLLMService:
     """Mock LLM service for testing without API keys"""
-    
+
     def generate_response(self, messages: List[Message], conversation_history: List[Dict]) -> str:
         """Generate mock response"""
         return "I understand you're concerned about a fever. Let me help you assess your situation. Can you tell me your current body temperature?"
-    
+
     def assess_triage(self, conversation_history: List[Dict], current_message: str) -> TriageResult:
-        """Assess triage with mock logic"""
-        red_flag = check_red_flags(current_message)
-        if red_flag:
-            return TriageResult(
-                triage_level=TriageLevel.EMERGENCY,
-                escalate=True,
-                summary=f"Red flag symptom detected: {red_flag}",
-                recommended_next_steps=[
-                    "Call emergency services immediately",
-                    "Go to the nearest emergency room"
-                ],
-                red_flag_detected=True,
-                red_flag_symptom=red_flag
-            )
-        
-        # Simple rule-based triage
-        message_lower = current_message.lower()
-        if any(word in message_lower for word in ["high", "very hot", "103", "104", "105"]):
-            return TriageResult(
-                triage_level=TriageLevel.URGENT,
-                escalate=True,
-                summary="High fever detected",
-                recommended_next_steps=[
-                    "Take fever-reducing medication if not allergic",
-                    "Stay hydrated",
-                    "Consult a healthcare provider soon"
-                ],
-                next_question="How long have you been experiencing this fever?"
-            )
-        
+        """Assess triage with mock logic: the rule engine's verdict at any confidence"""
+        decision = evaluate_rules(conversation_history, current_message)
+        if decision is not None:
+            return decision.triage_result
+
         return TriageResult(
             triage_level=TriageLevel.SELF_CARE,
             escalate=False,
@@ -269,3 +751,28 @@ class MockLLMService:
             next_question="Are you experiencing any other symptoms?"
         )
 
+    async def generate_response_async(self, messages: List[Message], conversation_history: List[Dict]) -> str:
+        """Generate mock response (async interface)"""
+        return self.generate_response(messages, conversation_history)
+
+    async def assess_triage_async(self, conversation_history: List[Dict], current_message: str) -> TriageResult:
+        """Assess triage with mock logic (async interface)"""
+        return self.assess_triage(conversation_history, current_message)
+
+    async def stream_response_async(self, messages: List[Message],
+                                    conversation_history: List[Dict]) -> AsyncIterator[str]:
+        """Stream the mock response word by word"""
+        words = self.generate_response(messages, conversation_history).split(" ")
+        for index, word in enumerate(words):
+            yield word if index == 0 else " " + word
+
+    async def assess_and_respond_async(self, messages: List[Message], conversation_history: List[Dict],
+                                       current_message: str) -> Tuple[TriageResult, Optional[str]]:
+        """Mock combined turn"""
+        triage_result = self.assess_triage(conversation_history, current_message)
+        if triage_result.red_flag_detected:
+            return triage_result, None
+        return triage_result, self.generate_response(messages, conversation_history)
+
+    async def aclose(self):
+        """Nothing to release for the mock service"""
@@ -1,27 +1,42 @@
 """Main FastAPI application for HealthGuide"""
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Optional
+import asyncio
+import time
 import uuid
 from datetime import datetime
 
 from app.config import settings
 from app.models import (
     ConversationRequest, ConversationResponse, TriageResult, TriageLevel,
-    ProviderRequest, Provider, SummaryResponse, Message
+    ProviderRequest, Provider, SummaryResponse, Message,
+    BatchTriageRequest, BatchTriageItemResult, BatchTriageResponse
 )
-from app.database import get_db, init_db, save_conversation, get_conversation
-from app.llm_service import get_llm_service
-from app.red_flags import check_red_flags, get_red_flag_response
+from app.database import (
+    get_async_db, init_db, AsyncSessionLocal, save_conversation_async, append_messages_async,
+    get_conversation_async, get_messages_async
+)
+from app.llm_service import get_llm_service, close_llm_service, run_triage_turn, build_red_flag_triage
+from app.red_flags import check_red_flags, check_red_flags_batch, get_red_flag_response
 from app.providers import get_providers
+from app.session_cache import session_cache, run_flusher
+from app.llm_cache import llm_cache
+from app.batch import run_bounded, batch_rate_limiter
+from app.metrics import REGISTRY, MetricsMiddleware, stage_timer
+from app.rules import rule_engine
+from app.router import request_budget
+from app.profiling import ProfilingMiddleware, check_token, profile_store, profiling_enabled
+from app.serialization import FastJSONResponse, dumps_str
 
 # Initialize FastAPI app
 app = FastAPI(
     title="HealthGuide - Fever Helpline API",
     description="AI-powered fever triage and guidance system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -33,10 +48,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+if profiling_enabled():
+    # Added last so it wraps every other middleware and sees the whole request
+    app.add_middleware(ProfilingMiddleware)
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    if settings.session_cache_enabled:
+        app.state.session_flusher = asyncio.create_task(
+            run_flusher(session_cache, settings.session_flush_interval)
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    flusher = getattr(app.state, "session_flusher", None)
+    if flusher is not None:
+        flusher.cancel()
+        # Wait until it stops so a flush it was running has put its batch back
+        try:
+            await flusher
+        except asyncio.CancelledError:
+            pass
+    if settings.session_cache_enabled:
+        # Write-behind buffer must reach the database before the process exits
+        await session_cache.flush()
+    await close_llm_service()
 
 
 # Health check endpoint
@@ -50,11 +92,85 @@ async def health_check():
     return {"status": "healthy", "service": "HealthGuide API"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Stage latencies, LLM call/error/token counters and in-flight gauges in Prometheus text format"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def stored_history(history: List[Message]) -> List[Dict]:
+    """Convert request history into the dicts persisted with the conversation"""
+    return [
+        {
+            "role": msg.role,
+            "content": msg.content,
+            "timestamp": msg.timestamp
+        }
+        for msg in history
+    ]
+
+
+def uses_server_history(request: ConversationRequest) -> bool:
+    """Whether the turn is built from stored history rather than client-sent history"""
+    return request.conversation_history is None or not settings.trust_client_history
+
+
+async def load_history(db: AsyncSession, request: ConversationRequest) -> List[Message]:
+    """Get the prior conversation for a turn"""
+    if not uses_server_history(request):
+        return list(request.conversation_history)
+    if settings.session_cache_enabled:
+        cached = await session_cache.get(db, request.session_id)
+        # Stored messages were validated when they were received
+        return [Message.model_construct(**msg) for msg in cached.messages] if cached else []
+    return [
+        Message.model_construct(role=msg.role, content=msg.content, timestamp=msg.timestamp)
+        for msg in await get_messages_async(db, request.session_id)
+    ]
+
+
+async def persist_turn(db: AsyncSession, request: ConversationRequest, response_message: str, triage_level: str,
+                 summary: Optional[str] = None, red_flag: Optional[str] = None):
+    """Store the user message and reply for a turn"""
+    now = datetime.now()
+    new_messages = [
+        {"role": "user", "content": request.message, "timestamp": now},
+        {"role": "assistant", "content": response_message, "timestamp": now}
+    ]
+    return await persist_messages(db, request, new_messages, triage_level, summary, red_flag)
+
+
+async def persist_messages(db: AsyncSession, request: ConversationRequest, new_messages: List[Dict],
+                           triage_level: str, summary: Optional[str] = None, red_flag: Optional[str] = None):
+    """Store new messages and conversation aggregates for a request"""
+    if settings.session_cache_enabled:
+        if not uses_server_history(request):
+            # As in save_conversation: the client history is kept only for a session with nothing stored yet
+            cached = await session_cache.get(db, request.session_id)
+            if not (cached and cached.message_count):
+                new_messages = stored_history(request.conversation_history) + new_messages
+        return await session_cache.append(db, request.session_id, new_messages, triage_level, summary, red_flag)
+    if uses_server_history(request):
+        # Stored history is authoritative, so only the new turn is written
+        return await append_messages_async(db, request.session_id, new_messages, triage_level, summary, red_flag)
+    return await save_conversation_async(
+        db=db,
+        session_id=request.session_id,
+        history=stored_history(request.conversation_history),
+        new_messages=new_messages,
+        triage_level=triage_level,
+        summary=summary,
+        red_flag=red_flag
+    )
+
+
 # Triage endpoint
 @app.post("/api/triage", response_model=ConversationResponse)
 async def triage(
     request: ConversationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Main triage endpoint that processes user messages and provides guidance.
@@ -64,44 +180,30 @@ async def triage(
         llm_service = get_llm_service()
         
         # Check for red flags FIRST (before any other processing)
-        red_flag = check_red_flags(request.message)
+        with stage_timer("red_flag_scan"):
+            red_flag = check_red_flags(request.message)
         if red_flag:
             # Save conversation with red flag
-            messages = request.conversation_history + [
-                {"role": "user", "content": request.message, "timestamp": datetime.now().isoformat()},
-                {"role": "assistant", "content": get_red_flag_response(red_flag), "timestamp": datetime.now().isoformat()}
-            ]
-            save_conversation(
-                db=db,
-                session_id=request.session_id,
-                messages=messages,
-                triage_level=TriageLevel.EMERGENCY.value,
-                red_flag=red_flag
-            )
+            with stage_timer("persist"):
+                await persist_turn(
+                    db=db,
+                    request=request,
+                    response_message=get_red_flag_response(red_flag),
+                    triage_level=TriageLevel.EMERGENCY.value,
+                    red_flag=red_flag
+                )
             
-            return ConversationResponse(
+            # Built from trusted values, so it is serialized without another validation pass
+            return FastJSONResponse(ConversationResponse.model_construct(
                 session_id=request.session_id,
                 message=get_red_flag_response(red_flag),
-                triage_result=TriageResult(
-                    triage_level=TriageLevel.EMERGENCY,
-                    escalate=True,
-                    summary=f"Red flag symptom detected: {red_flag}",
-                    recommended_next_steps=[
-                        "Call emergency services immediately",
-                        "Go to the nearest emergency room",
-                        "Do not delay seeking medical attention"
-                    ],
-                    red_flag_detected=True,
-                    red_flag_symptom=red_flag
-                ),
+                triage_result=build_red_flag_triage(red_flag),
                 conversation_complete=True
-            )
+            ))
         
-        # Convert conversation history to Message objects
-        messages = [
-            Message(role=msg.get("role", "user"), content=msg.get("content", ""))
-            for msg in request.conversation_history
-        ]
+        # Prior turns come from the client or, in server-side mode, from storage
+        with stage_timer("history_load"):
+            messages = await load_history(db, request)
         messages.append(Message(role="user", content=request.message))
         
         # Assess triage level
@@ -109,49 +211,226 @@ async def triage(
             {"role": msg.role, "content": msg.content}
             for msg in messages
         ]
-        triage_result = llm_service.assess_triage(conversation_history, request.message)
+        # Triage and reply generation, sequential, parallel or combined per settings.triage_mode
+        triage_result, response_message = await run_triage_turn(
+            llm_service, messages, conversation_history, request.message, request.session_id
+        )
         
         # Generate response
         if triage_result.red_flag_detected:
             response_message = get_red_flag_response(triage_result.red_flag_symptom or "red flag symptom")
             conversation_complete = True
         else:
-            # Generate LLM response
-            response_message = llm_service.generate_response(messages, conversation_history)
             if triage_result.next_question:
                 response_message += f"\n\n{triage_result.next_question}"
             conversation_complete = triage_result.next_question is None
         
         # Save conversation to database
-        updated_messages = request.conversation_history + [
-            {"role": "user", "content": request.message, "timestamp": datetime.now().isoformat()},
-            {"role": "assistant", "content": response_message, "timestamp": datetime.now().isoformat()}
-        ]
-        save_conversation(
-            db=db,
-            session_id=request.session_id,
-            messages=updated_messages,
-            triage_level=triage_result.triage_level.value,
-            summary=triage_result.summary,
-            red_flag=triage_result.red_flag_symptom
-        )
+        with stage_timer("persist"):
+            await persist_turn(
+                db=db,
+                request=request,
+                response_message=response_message,
+                triage_level=triage_result.triage_level.value,
+                summary=triage_result.summary,
+                red_flag=triage_result.red_flag_symptom
+            )
         
-        return ConversationResponse(
+        return FastJSONResponse(ConversationResponse.model_construct(
             session_id=request.session_id,
             message=response_message,
             triage_result=triage_result,
             conversation_complete=conversation_complete
-        )
+        ))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing triage request: {str(e)}")
 
 
+async def assess_batch_item(llm_service, request: ConversationRequest, red_flag: Optional[str],
+                            persist: bool) -> TriageResult:
+    """Assess one batch item and optionally store the message and verdict"""
+    # The session is only connected if history is loaded or the result persisted
+    async with AsyncSessionLocal() as db:
+        if red_flag:
+            triage_result = build_red_flag_triage(red_flag)
+        else:
+            with stage_timer("history_load"):
+                messages = await load_history(db, request)
+            messages.append(Message(role="user", content=request.message))
+            conversation_history = [
+                {"role": msg.role, "content": msg.content}
+                for msg in messages
+            ]
+            decision = rule_engine.decide(conversation_history, request.message, request.session_id)
+            if decision is not None:
+                triage_result = decision.triage_result
+            else:
+                await batch_rate_limiter.acquire()
+                with request_budget(settings.llm_request_budget):
+                    triage_result = await llm_service.assess_triage_async(conversation_history, request.message)
+
+        if persist:
+            await persist_messages(
+                db=db,
+                request=request,
+                new_messages=[{"role": "user", "content": request.message, "timestamp": datetime.now()}],
+                triage_level=triage_result.triage_level.value,
+                summary=triage_result.summary if not red_flag else None,
+                red_flag=triage_result.red_flag_symptom
+            )
+    return triage_result
+
+
+# Batch triage endpoint
+@app.post("/api/triage/batch", response_model=BatchTriageResponse)
+async def triage_batch(request: BatchTriageRequest):
+    """
+    Assess many messages in one call, for QA and audit runs.
+    Red flags are screened for every item in a single pass; the remaining
+    items are assessed concurrently, capped by batch_max_concurrency and
+    batch_rate_limit. Results keep the order of the request items.
+    """
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} items (maximum {settings.batch_max_items})"
+        )
+
+    llm_service = get_llm_service()
+    with stage_timer("red_flag_scan"):
+        red_flags = check_red_flags_batch([item.message for item in request.items])
+    batch_start = time.perf_counter()
+
+    async def run_item(index: int, item: ConversationRequest) -> BatchTriageItemResult:
+        item_start = time.perf_counter()
+        triage_result, error = None, None
+        try:
+            triage_result = await assess_batch_item(
+                llm_service, item, red_flags[index], persist=not request.skip_persistence
+            )
+        except Exception as e:
+            error = f"Error processing triage request: {str(e)}"
+        return BatchTriageItemResult(
+            index=index,
+            session_id=item.session_id,
+            triage_result=triage_result,
+            error=error,
+            queued_ms=round((item_start - batch_start) * 1000, 3),
+            elapsed_ms=round((time.perf_counter() - item_start) * 1000, 3)
+        )
+
+    results = await run_bounded(request.items, run_item, settings.batch_max_concurrency)
+    return BatchTriageResponse(
+        results=results,
+        red_flags=sum(1 for red_flag in red_flags if red_flag),
+        errors=sum(1 for result in results if result.error),
+        elapsed_ms=round((time.perf_counter() - batch_start) * 1000, 3)
+    )
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {dumps_str(data)}\n\n"
+
+
+async def stream_triage_events(request: ConversationRequest):
+    """
+    Yield SSE events for one triage turn.
+    red_flag is sent immediately when a red flag fires. Otherwise reply
+    tokens are sent as the provider streams them while the triage call runs
+    concurrently. triage and saved are trailing events, followed by done.
+    """
+    llm_service = get_llm_service()
+    db = AsyncSessionLocal()
+    try:
+        with stage_timer("red_flag_scan"):
+            red_flag = check_red_flags(request.message)
+        if red_flag:
+            response_message = get_red_flag_response(red_flag)
+            triage_result = build_red_flag_triage(red_flag)
+            yield sse_event("red_flag", {"symptom": red_flag, "message": response_message})
+            conversation_complete = True
+        else:
+            with stage_timer("history_load"):
+                messages = await load_history(db, request)
+            messages.append(Message(role="user", content=request.message))
+            conversation_history = [
+                {"role": msg.role, "content": msg.content}
+                for msg in messages
+            ]
+            decision = rule_engine.decide(conversation_history, request.message, request.session_id)
+            if decision is not None:
+                triage_result, response_message = decision.triage_result, decision.reply
+                yield sse_event("token", {"text": response_message})
+            else:
+                # The task copies the context, so the triage call runs under the turn's budget
+                with request_budget(settings.llm_request_budget):
+                    triage_task = asyncio.create_task(
+                        llm_service.assess_triage_async(conversation_history, request.message)
+                    )
+                chunks = []
+                try:
+                    async for chunk in llm_service.stream_response_async(messages, conversation_history):
+                        chunks.append(chunk)
+                        yield sse_event("token", {"text": chunk})
+                except BaseException:
+                    triage_task.cancel()
+                    raise
+                triage_result = await triage_task
+                response_message = "".join(chunks)
+            if triage_result.next_question:
+                tail = f"\n\n{triage_result.next_question}"
+                response_message += tail
+                yield sse_event("token", {"text": tail})
+            conversation_complete = triage_result.next_question is None
+
+        yield sse_event("triage", {
+            "triage_result": triage_result.model_dump(mode="json"),
+            "conversation_complete": conversation_complete
+        })
+
+        with stage_timer("persist"):
+            conversation = await persist_turn(
+                db=db,
+                request=request,
+                response_message=response_message,
+                triage_level=triage_result.triage_level.value,
+                summary=triage_result.summary if not red_flag else None,
+                red_flag=triage_result.red_flag_symptom
+            )
+            if settings.session_cache_enabled:
+                # saved promises the turn is in the database, not only in the write-behind buffer
+                await session_cache.flush_session(request.session_id)
+        yield sse_event("saved", {"session_id": request.session_id, "message_count": conversation.message_count})
+        yield sse_event("done", {})
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Error processing triage request: {str(e)}"})
+    finally:
+        await db.close()
+
+
+# Streaming triage endpoint
+@app.post("/api/triage/stream")
+async def triage_stream(request: ConversationRequest):
+    """
+    Streaming variant of the triage endpoint using server-sent events.
+    """
+    return StreamingResponse(
+        stream_triage_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Summary endpoint
 @app.get("/api/summary/{session_id}", response_model=SummaryResponse)
-async def get_summary(session_id: str, db: Session = Depends(get_db)):
+async def get_summary(session_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get conversation summary for a session"""
-    conversation = get_conversation(db, session_id)
+    # Served from memory when cached; otherwise an async read that WAL lets run alongside writes
+    conversation = session_cache.peek(session_id) if settings.session_cache_enabled else None
+    if conversation is None:
+        conversation = await get_conversation_async(db, session_id)
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
@@ -172,10 +451,55 @@ async def get_summary(session_id: str, db: Session = Depends(get_db)):
         summary=conversation.summary or "Fever-related symptoms discussed",
         triage_level=triage_level,
         recommended_next_steps=recommended_steps,
-        conversation_count=len(conversation.messages) if conversation.messages else 0
+        conversation_count=conversation.message_count or 0
     )
 
 
+# Cache statistics
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Get session and LLM response cache hit/miss/eviction counters"""
+    return {"sessions": session_cache.stats(), "llm_responses": llm_cache.stats()}
+
+
+# Rule engine statistics
+@app.get("/api/rules/stats")
+async def get_rule_stats():
+    """How often clear-cut turns were decided by rules instead of the LLM"""
+    return rule_engine.stats()
+
+
+def require_profile_access(token: Optional[str]):
+    """
+    Profiles expose internal code paths and timings, so they are served only
+    with the configured token, including when profiling runs on sampling alone
+    """
+    if not profiling_enabled():
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not settings.profile_token:
+        raise HTTPException(status_code=403, detail="Set PROFILE_TOKEN to read profiles")
+    if not check_token(token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+# Profile listing
+@app.get("/api/profiles")
+async def list_profiles(x_profile: Optional[str] = Header(default=None)):
+    """List stored request profiles, newest first"""
+    require_profile_access(x_profile)
+    return {"directory": profile_store.directory, "profiles": profile_store.list()}
+
+
+@app.get("/api/profiles/{name}")
+async def get_profile(name: str, x_profile: Optional[str] = Header(default=None)):
+    """Download one stored profile (pyinstrument HTML or cProfile pstats)"""
+    require_profile_access(x_profile)
+    path = profile_store.path_for(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=name)
+
+
 # Providers endpoint
 @app.post("/api/providers", response_model=List[Provider])
 async def get_healthcare_providers(request: ProviderRequest):
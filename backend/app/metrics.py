@@ -0,0 +1,271 @@
+"""In-process metrics exported in the Prometheus text format"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Registry:
+    """Collection of metrics rendered together at /metrics"""
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric"):
+        if any(existing.name == metric.name for existing in self._metrics):
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Zero every metric"""
+        for metric in self._metrics:
+            metric.reset()
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._label_text(key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track(self, **labels) -> Iterator[None]:
+        """Count the block as in progress while it runs"""
+        self.inc(1.0, **labels)
+        try:
+            yield
+        finally:
+            self.dec(1.0, **labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (not cumulative), then +Inf, sum and count
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    break
+            else:
+                index = len(self.buckets)
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe how long the block takes, in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {state[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "healthguide_stage_seconds", "Time spent in each stage of a triage turn", ["stage"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "healthguide_http_request_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+HTTP_IN_FLIGHT = Gauge(
+    "healthguide_http_requests_in_flight", "HTTP requests currently being served"
+)
+LLM_CALLS = Counter(
+    "healthguide_llm_calls_total", "Calls made to the LLM provider", ["provider", "kind"]
+)
+LLM_ERRORS = Counter(
+    "healthguide_llm_errors_total", "Failed LLM provider calls by error type", ["provider", "kind", "error"]
+)
+LLM_IN_FLIGHT = Gauge(
+    "healthguide_llm_in_flight", "LLM calls waiting on the provider", ["provider"]
+)
+LLM_TOKENS = Counter(
+    "healthguide_llm_tokens_total",
+    "LLM tokens by type; estimated from text length when the provider reports no usage",
+    ["provider", "kind", "type"]
+)
+LLM_ROUTER_EVENTS = Counter(
+    "healthguide_llm_router_events_total",
+    "Provider routing events: hedge, hedge_won, failover, breaker_open, deadline, unavailable",
+    ["provider", "event"]
+)
+LLM_BREAKER_OPEN = Gauge(
+    "healthguide_llm_breaker_open", "1 while a provider's circuit breaker is open", ["provider"]
+)
+LLM_THROTTLED = Counter(
+    "healthguide_llm_throttled_total",
+    "Provider rate-limit (429) responses, by whether the call was retried or gave up",
+    ["provider", "kind", "outcome"]
+)
+RULE_DECISIONS = Counter(
+    "healthguide_rule_decisions_total",
+    "Rule engine evaluations by rule and outcome (applied, deferred to the LLM or unmatched)",
+    ["rule", "outcome"]
+)
+
+
+def stage_timer(stage: str):
+    """Time a block as one triage stage"""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def timed_stage(stage: str) -> Callable:
+    """Decorator timing every call of a synchronous function as one triage stage"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording in-flight requests and latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Route templates keep label cardinality bounded (no session ids in labels)
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status
+            )
@@ -29,13 +29,17 @@ class TriageResult(BaseModel):
     next_question: Optional[str] = None
     red_flag_detected: bool = False
     red_flag_symptom: Optional[str] = None
+    confidence: Optional[float] = None  # set when decided by the rule engine
 
 
 class ConversationRequest(BaseModel):
-    """Request model for triage endpoint"""
+    """
+    Request model for triage endpoint.
+    Omit conversation_history to have the server rebuild it from storage.
+    """
     session_id: str
     message: str
-    conversation_history: List[Message] = []
+    conversation_history: Optional[List[Message]] = None
 
 
 class ConversationResponse(BaseModel):
@@ -46,6 +50,33 @@ class ConversationResponse(BaseModel):
     conversation_complete: bool = False
 
 
+class BatchTriageRequest(BaseModel):
+    """
+    Request model for batch triage endpoint.
+    Items without conversation_history are assessed against stored history.
+    """
+    items: List[ConversationRequest] = Field(min_length=1)
+    skip_persistence: bool = False
+
+
+class BatchTriageItemResult(BaseModel):
+    """Triage outcome for one batch item"""
+    index: int
+    session_id: str
+    triage_result: Optional[TriageResult] = None
+    error: Optional[str] = None
+    queued_ms: float  # time waiting for a concurrency slot
+    elapsed_ms: float  # time spent assessing (and persisting) the item
+
+
+class BatchTriageResponse(BaseModel):
+    """Response model for batch triage endpoint"""
+    results: List[BatchTriageItemResult]
+    red_flags: int
+    errors: int
+    elapsed_ms: float
+
+
 class Provider(BaseModel):
     """Healthcare provider model"""
     id: str
@@ -64,6 +95,8 @@ class ProviderRequest(BaseModel):
     longitude: float
     radius: int = 5  # km
     provider_type: Optional[str] = None  # clinic, pharmacy, hospital
+    limit: Optional[int] = Field(default=None, ge=1)  # return only the nearest N
+    nearest: Optional[int] = Field(default=None, ge=1)  # the nearest N at any distance; radius is ignored
 
 
 class SummaryResponse(BaseModel):
@@ -0,0 +1,146 @@
+"""Pre-fork multi-worker server: the app is loaded once and forked into workers"""
+import gc
+import os
+import signal
+import socket
+import tempfile
+import time
+import traceback
+from typing import Dict
+
+from app.config import settings
+
+
+SHUTDOWN_TIMEOUT = 30  # seconds workers get to finish in-flight requests
+
+
+def preload():
+    """
+    Import the app and build the read-only state every worker uses (prompts,
+    red-flag automaton, provider index, compiled patterns) before forking, so
+    the workers share those pages copy-on-write. No network client or database
+    connection may be left open here; see the at-fork hooks in database.py and
+    llm_service.py.
+    """
+    from app import database
+    from app.main import app
+    from app.providers import get_provider_index
+
+    database.init_db()
+    database.engine.dispose()
+    get_provider_index()
+    # Objects that survive to here live as long as the workers; keeping them out of
+    # the collector stops it writing to (and so copying) their pages in every worker
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def _prepare_shared_state(workers: int) -> str:
+    """
+    Adjust settings that only make sense within one process once several
+    workers share a host. Returns the rate limit state file created for the
+    workers, if any.
+    """
+    from app import rate_limit
+
+    if workers <= 1:
+        return ""
+    if settings.session_cache_enabled:
+        # Turns of one session can land on different workers; each would buffer its own copy
+        print("Warning: the session cache is per process. Disabling it for multi-worker mode.", flush=True)
+        settings.session_cache_enabled = False
+    limiter = rate_limit.rate_limiter
+    if limiter.limits and not limiter.path and rate_limit.fcntl is not None:
+        limiter.path = os.path.join(tempfile.gettempdir(), f"healthguide-rate-limit-{os.getpid()}")
+        return limiter.path
+    return ""
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket):
+    import uvicorn
+
+    # uvicorn installs its own graceful shutdown handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level="debug" if settings.debug else "info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int):
+    """
+    Bind the listening socket, preload the app and fork `workers` processes
+    that accept on the shared socket. Workers that die are restarted;
+    SIGTERM or SIGINT shuts all of them down gracefully.
+    """
+    sock = _bind(host, port)
+    rate_limit_path = _prepare_shared_state(workers)
+    app = preload()
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(app, sock)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    def signal_workers(signum: int):
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if not stopping:
+            stopping = True
+            signal_workers(signal.SIGTERM)
+            # Workers still running after the grace period are killed
+            signal.alarm(SHUTDOWN_TIMEOUT)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGALRM, lambda signum, frame: signal_workers(signal.SIGKILL))
+    print(f"Serving on {host}:{port} with {workers} workers (supervisor pid {os.getpid()})", flush=True)
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        print(f"Warning: worker {pid} exited with code {code}. Restarting it.", flush=True)
+        # Keeps a worker that fails at startup from spinning
+        time.sleep(1.0)
+        if not stopping:
+            spawn(index)
+    sock.close()
+    if rate_limit_path:
+        try:
+            os.remove(rate_limit_path)
+        except OSError:
+            pass
@@ -0,0 +1,167 @@
+"""On-demand request profiling written to a rotating local directory"""
+import asyncio
+import cProfile
+import hmac
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # optional; cProfile is used instead
+    SamplingProfiler = None
+
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+\.(html|prof)$")
+
+
+def profiling_enabled() -> bool:
+    """Profiling is active when requests can be selected by header or by sampling"""
+    return bool(settings.profile_token) or settings.profile_sample_rate > 0
+
+
+def check_token(token: Optional[str]) -> bool:
+    """Whether a request carries the configured profiling token"""
+    return bool(settings.profile_token) and token is not None and hmac.compare_digest(
+        token.encode("utf-8"), settings.profile_token.encode("utf-8")
+    )
+
+
+def resolve_engine() -> str:
+    """pyinstrument when available (sampling, async aware), otherwise cProfile"""
+    if settings.profile_engine == "pyinstrument" and SamplingProfiler is None:
+        print("Warning: pyinstrument is not installed. Profiling with cProfile.")
+        return "cprofile"
+    if settings.profile_engine == "auto":
+        return "pyinstrument" if SamplingProfiler is not None else "cprofile"
+    return settings.profile_engine
+
+
+class ProfileStore:
+    """Directory of profile files that keeps only the newest `max_files`"""
+
+    def __init__(self, directory: str, max_files: int = 50):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def path_for(self, name: str) -> Optional[str]:
+        """Path of a stored profile, or None for unknown or unsafe names"""
+        if not _NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def new_path(self, profile_id: str, method: str, route: str, duration_ms: float, extension: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        return os.path.join(self.directory, f"{profile_id}-{method}-{slug}-{int(duration_ms)}ms.{extension}")
+
+    def list(self) -> List[Dict]:
+        """Stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = sorted(
+            (entry.stat().st_mtime, entry.name, entry.stat().st_size)
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and _NAME_PATTERN.match(entry.name)
+        )
+        return [
+            {"name": name, "size": size, "created": datetime.fromtimestamp(mtime).isoformat()}
+            for mtime, name, size in reversed(entries)
+        ]
+
+    def rotate(self):
+        """Delete the oldest profiles beyond max_files"""
+        with self._lock:
+            for profile in self.list()[self.max_files:]:
+                try:
+                    os.remove(os.path.join(self.directory, profile["name"]))
+                except OSError:
+                    pass
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests selected by the X-Profile header
+    (matching settings.profile_token) or by settings.profile_sample_rate.
+    Only one request is profiled at a time. cProfile traces everything on the
+    event loop thread, so a cProfile dump also contains whatever else ran
+    concurrently; pyinstrument's async mode attributes time to the request.
+    """
+
+    def __init__(self, app, store: Optional["ProfileStore"] = None):
+        self.app = app
+        self.store = store or profile_store
+        self.engine = resolve_engine()
+        self._active = False
+
+    def _selected(self, scope) -> bool:
+        if self._active:
+            return False
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER.encode("latin-1"):
+                return check_token(value.decode("latin-1"))
+        return settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER.encode("latin-1"), profile_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        if self.engine == "pyinstrument":
+            profiler = SamplingProfiler(interval=settings.profile_interval, async_mode="enabled")
+        else:
+            profiler = cProfile.Profile()
+        start = time.perf_counter()
+        if self.engine == "pyinstrument":
+            profiler.start()
+        else:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if self.engine == "pyinstrument":
+                profiler.stop()
+            else:
+                profiler.disable()
+            self._active = False
+            duration_ms = (time.perf_counter() - start) * 1000
+            route = getattr(scope.get("route"), "path", scope.get("path", ""))
+            try:
+                # Rendering and writing stay off the event loop
+                await asyncio.to_thread(self._write, profiler, profile_id, scope["method"], route, duration_ms)
+            except Exception as e:
+                print(f"Warning: could not write profile {profile_id}: {e}")
+
+    def _write(self, profiler, profile_id: str, method: str, route: str, duration_ms: float):
+        if self.engine == "pyinstrument":
+            path = self.store.new_path(profile_id, method, route, duration_ms, "html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        else:
+            path = self.store.new_path(profile_id, method, route, duration_ms, "prof")
+            profiler.dump_stats(path)
+        self.store.rotate()
+
+
+profile_store = ProfileStore(settings.profile_dir, settings.profile_max_files)
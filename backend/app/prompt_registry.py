@@ -0,0 +1,152 @@
+"""In-memory prompt template registry"""
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from app.config import settings
+
+
+PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "..", "prompts")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+class PromptTemplate(NamedTuple):
+    """A loaded prompt template with precomputed metadata"""
+    name: str
+    text: str
+    path: str
+    mtime: Optional[float]
+    length: int
+    token_estimate: int
+    version: str
+    is_fallback: bool
+
+
+class _Entry:
+    """Registry bookkeeping for a single prompt"""
+
+    def __init__(self, name: str, path: str, fallback: str, required: Sequence[str]):
+        self.name = name
+        self.path = path
+        self.fallback = fallback
+        self.required = tuple(required)
+        self.template: Optional[PromptTemplate] = None
+        self.checked_at = 0.0
+
+
+class PromptRegistry:
+    """
+    Loads prompt templates once and serves them from memory.
+    Files are re-read only when their mtime changes, and the mtime itself is
+    checked at most once per `check_interval` seconds.
+    """
+
+    def __init__(self, prompts_dir: str = PROMPTS_DIR, check_interval: float = 1.0,
+                 hot_reload: bool = True):
+        self.prompts_dir = prompts_dir
+        self.check_interval = check_interval
+        self.hot_reload = hot_reload
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, file_name: str, fallback: str = "",
+                 required: Sequence[str] = ()) -> PromptTemplate:
+        """Register a template file and load it immediately"""
+        entry = _Entry(name, os.path.join(self.prompts_dir, file_name), fallback, required)
+        with self._lock:
+            self._entries[name] = entry
+            self._load(entry, initial=True)
+        return entry.template
+
+    def get(self, name: str) -> PromptTemplate:
+        """Get a template, reloading it first if the file changed on disk"""
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown prompt template: {name}")
+        if self.hot_reload and time.monotonic() - entry.checked_at >= self.check_interval:
+            with self._lock:
+                if time.monotonic() - entry.checked_at >= self.check_interval:
+                    if self._file_mtime(entry.path) != entry.template.mtime:
+                        self._load(entry, initial=False)
+                    entry.checked_at = time.monotonic()
+        return entry.template
+
+    def text(self, name: str) -> str:
+        """Get template text"""
+        return self.get(name).text
+
+    def templates(self) -> List[PromptTemplate]:
+        """Get every registered template with its metadata"""
+        return [self.get(name) for name in self._entries]
+
+    def reload(self):
+        """Force a reload of every registered template"""
+        with self._lock:
+            for entry in self._entries.values():
+                self._load(entry, initial=False)
+
+    def _load(self, entry: _Entry, initial: bool):
+        """Read, validate and store a template. Caller holds the lock."""
+        mtime = self._file_mtime(entry.path)
+        text = ""
+        if mtime is not None:
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except OSError:
+                text = ""
+
+        error = self._validate(entry, text)
+        if error and not initial and entry.template is not None and not entry.template.is_fallback:
+            # Keep serving the last good version rather than breaking live traffic
+            print(f"Warning: prompt '{entry.name}' not reloaded: {error}")
+            entry.template = entry.template._replace(mtime=mtime)
+            return
+
+        is_fallback = bool(error)
+        if is_fallback:
+            if mtime is not None:
+                print(f"Warning: prompt '{entry.name}' is invalid ({error}). Using fallback prompt.")
+            text = entry.fallback
+
+        entry.template = PromptTemplate(
+            name=entry.name,
+            text=text,
+            path=entry.path,
+            mtime=mtime,
+            length=len(text),
+            token_estimate=estimate_tokens(text),
+            version=hashlib.sha256(text.encode('utf-8')).hexdigest()[:12],
+            is_fallback=is_fallback
+        )
+        entry.checked_at = time.monotonic()
+
+    @staticmethod
+    def _validate(entry: _Entry, text: str) -> Optional[str]:
+        """Return a validation error message, or None if the template is usable"""
+        if not text.strip():
+            return "template is empty or missing"
+        missing = [marker for marker in entry.required if marker not in text]
+        if missing:
+            return f"missing required text: {', '.join(missing)}"
+        return None
+
+    @staticmethod
+    def _file_mtime(path: str) -> Optional[float]:
+        """Get file modification time, or None if the file does not exist"""
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+
+prompt_registry = PromptRegistry(
+    check_interval=settings.prompt_reload_interval,
+    hot_reload=settings.prompt_hot_reload
+)
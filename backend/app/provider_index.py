@@ -0,0 +1,156 @@
+"""Spatial index over healthcare providers"""
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models import Provider
+
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lat_rad: float, lon_rad: float, lat2_rad: np.ndarray, lon2_rad: np.ndarray) -> np.ndarray:
+    """Vectorized haversine distance in kilometers from one point (radians) to many"""
+    a = (np.sin((lat2_rad - lat_rad) * 0.5) ** 2
+         + math.cos(lat_rad) * np.cos(lat2_rad) * np.sin((lon2_rad - lon_rad) * 0.5) ** 2)
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class ProviderIndex:
+    """
+    Providers stored as column arrays with a uniform lat/lon grid index.
+    Coordinates are kept in radians so queries only run the vectorized
+    haversine over providers in the grid cells that can be within range.
+    Providers without coordinates are skipped since they can never match a
+    location query.
+    """
+
+    def __init__(self, providers: Sequence[Dict], cell_size_deg: float = 0.25):
+        self.cell_size_deg = cell_size_deg
+        self.lon_cells = int(math.ceil(360.0 / cell_size_deg))
+
+        located = [p for p in providers if p.get("latitude") is not None and p.get("longitude") is not None]
+        self.size = len(located)
+        self.ids = [str(p["id"]) for p in located]
+        self.names = [p["name"] for p in located]
+        self.addresses = [p["address"] for p in located]
+        self.phones = [p["phone"] for p in located]
+
+        self.type_names: List[str] = sorted({p["type"] for p in located})
+        type_codes = {name: code for code, name in enumerate(self.type_names)}
+        self.types = np.fromiter((type_codes[p["type"]] for p in located), dtype=np.int16, count=self.size)
+
+        self.latitude = np.fromiter((p["latitude"] for p in located), dtype=np.float64, count=self.size)
+        self.longitude = np.fromiter((p["longitude"] for p in located), dtype=np.float64, count=self.size)
+        self.lat_rad = np.radians(self.latitude)
+        self.lon_rad = np.radians(self.longitude)
+
+        # Sort providers by grid cell; each cell is then a contiguous slice
+        cells = self._cell_keys(self.latitude, self.longitude)
+        self.order = np.argsort(cells, kind="stable")
+        sorted_cells = cells[self.order]
+        keys, starts, counts = np.unique(sorted_cells, return_index=True, return_counts=True)
+        self.cell_slices: Dict[int, Tuple[int, int]] = {
+            int(key): (int(start), int(start + count))
+            for key, start, count in zip(keys, starts, counts)
+        }
+
+    def _cell_keys(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        lat_cell = np.floor((latitude + 90.0) / self.cell_size_deg).astype(np.int64)
+        lon_cell = np.floor((longitude + 180.0) / self.cell_size_deg).astype(np.int64) % self.lon_cells
+        return lat_cell * self.lon_cells + lon_cell
+
+    def _candidates(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Indices of providers in every grid cell that may lie within radius_km"""
+        lat_span = radius_km / KM_PER_DEGREE
+        lat_min = max(latitude - lat_span, -90.0)
+        lat_max = min(latitude + lat_span, 90.0)
+        cos_lat = min(math.cos(math.radians(lat_min)), math.cos(math.radians(lat_max)))
+        if lat_min <= -90.0 or lat_max >= 90.0 or cos_lat <= 1e-6:
+            lon_span = 180.0
+        else:
+            lon_span = min(lat_span / cos_lat, 180.0)
+
+        lat_first = int(math.floor((lat_min + 90.0) / self.cell_size_deg))
+        lat_last = int(math.floor((lat_max + 90.0) / self.cell_size_deg))
+        if lon_span >= 180.0:
+            lon_range = range(self.lon_cells)
+        else:
+            lon_first = int(math.floor((longitude - lon_span + 180.0) / self.cell_size_deg))
+            lon_last = int(math.floor((longitude + lon_span + 180.0) / self.cell_size_deg))
+            lon_range = [cell % self.lon_cells for cell in range(lon_first, lon_last + 1)]
+            if len(lon_range) > self.lon_cells:
+                lon_range = range(self.lon_cells)
+
+        cell_count = (lat_last - lat_first + 1) * len(lon_range)
+        if cell_count >= len(self.cell_slices):
+            # Scanning the populated cells directly is cheaper than probing the grid
+            return self.order
+
+        slices = []
+        for lat_cell in range(lat_first, lat_last + 1):
+            base = lat_cell * self.lon_cells
+            for lon_cell in lon_range:
+                bounds = self.cell_slices.get(base + lon_cell)
+                if bounds is not None:
+                    slices.append(self.order[bounds[0]:bounds[1]])
+        if not slices:
+            return np.empty(0, dtype=self.order.dtype)
+        return np.concatenate(slices)
+
+    def _type_code(self, provider_type: Optional[str]) -> Optional[int]:
+        if provider_type is None:
+            return None
+        try:
+            return self.type_names.index(provider_type)
+        except ValueError:
+            return -1
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      provider_type: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """(index, distance_km) for providers within radius_km, nearest first"""
+        type_code = self._type_code(provider_type)
+        if type_code == -1 or self.size == 0:
+            return []
+        candidates = self._candidates(latitude, longitude, radius_km)
+        if type_code is not None:
+            candidates = candidates[self.types[candidates] == type_code]
+        distances = haversine_km(math.radians(latitude), math.radians(longitude),
+                                 self.lat_rad[candidates], self.lon_rad[candidates])
+        rounded = np.round(distances, 2)
+        mask = rounded <= radius_km
+        candidates = candidates[mask]
+        rounded = rounded[mask]
+
+        if limit is not None and limit < len(candidates):
+            nearest = np.argpartition(rounded, limit)[:limit]
+            candidates, rounded = candidates[nearest], rounded[nearest]
+        # Nearest first; ties keep load order, matching a stable sort over the source list
+        order = np.lexsort((candidates, rounded))
+        return list(zip(candidates[order].tolist(), rounded[order].tolist()))
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                provider_type: Optional[str] = None) -> List[Tuple[int, float]]:
+        """(index, distance_km) for the k nearest providers, expanding the search ring until k are found"""
+        radius_km = self.cell_size_deg * KM_PER_DEGREE
+        while True:
+            results = self.within_radius(latitude, longitude, radius_km, provider_type, limit=k)
+            if len(results) >= k or radius_km >= MAX_DISTANCE_KM:
+                return results
+            radius_km = min(radius_km * 4, MAX_DISTANCE_KM)
+
+    def provider(self, index: int, distance: Optional[float] = None) -> Provider:
+        """Build a Provider for one indexed row"""
+        return Provider(
+            id=self.ids[index],
+            name=self.names[index],
+            type=self.type_names[self.types[index]],
+            address=self.addresses[index],
+            phone=self.phones[index],
+            distance=distance,
+            latitude=float(self.latitude[index]),
+            longitude=float(self.longitude[index])
+        )
@@ -1,11 +1,14 @@
 """Healthcare provider service"""
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 import json
 import os
 
 from app.models import Provider, ProviderRequest
 from app.config import settings
 
+if TYPE_CHECKING:
+    from app.provider_index import ProviderIndex
+
 
 def load_mock_providers() -> List[Provider]:
     """Load mock healthcare providers"""
@@ -78,33 +81,38 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return R * c
 
 
+_provider_index: Optional["ProviderIndex"] = None
+
+
+def get_provider_index() -> "ProviderIndex":
+    """Get the provider index, building it (and importing numpy) on first use"""
+    global _provider_index
+    if _provider_index is None:
+        from app.provider_index import ProviderIndex
+        _provider_index = ProviderIndex([provider.model_dump() for provider in load_mock_providers()])
+    return _provider_index
+
+
 def get_providers(request: ProviderRequest) -> List[Provider]:
     """Get healthcare providers near the specified location"""
-    providers = load_mock_providers()
-    
-    # Filter by provider type if specified
-    if request.provider_type:
-        providers = [p for p in providers if p.type == request.provider_type]
-    
-    # Calculate distances and filter by radius
-    for provider in providers:
-        if provider.latitude and provider.longitude:
-            distance = calculate_distance(
-                request.latitude,
-                request.longitude,
-                provider.latitude,
-                provider.longitude
-            )
-            provider.distance = round(distance, 2)
-    
-    # Filter by radius and sort by distance
-    filtered_providers = [
-        p for p in providers
-        if p.distance is not None and p.distance <= request.radius
-    ]
-    filtered_providers.sort(key=lambda x: x.distance or float('inf'))
-    
-    return filtered_providers
+    if request.nearest is not None:
+        return get_nearest_providers(request.latitude, request.longitude, request.nearest, request.provider_type)
+    index = get_provider_index()
+    matches = index.within_radius(
+        request.latitude,
+        request.longitude,
+        request.radius,
+        provider_type=request.provider_type,
+        limit=request.limit
+    )
+    return [index.provider(row, distance) for row, distance in matches]
+
+
+def get_nearest_providers(latitude: float, longitude: float, k: int,
+                          provider_type: Optional[str] = None) -> List[Provider]:
+    """Get the k nearest healthcare providers regardless of distance"""
+    index = get_provider_index()
+    return [index.provider(row, distance) for row, distance in index.nearest(latitude, longitude, k, provider_type)]
 
 
 def search_providers_google_maps(request: ProviderRequest) -> List[Provider]:
@@ -0,0 +1,180 @@
+"""Outbound LLM rate limits (requests and tokens per minute) shared by the workers on a host"""
+import asyncio
+import os
+import random
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.metrics import STAGE_SECONDS
+from app.router import DeadlineExceeded, remaining_budget
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; limits are then per process
+    fcntl = None
+
+
+# Per provider: request level, token level, last refill (wall clock), blocked until (wall clock)
+_SLOT = struct.Struct("<dddd")
+PROVIDER_SLOTS = {"openai": 0, "gemini": 1}
+
+
+class SharedTokenBucket:
+    """
+    Two token buckets per provider, one for requests per minute and one for
+    tokens per minute, each holding up to a minute of budget. A call reserves
+    its request and estimated tokens up front and waits until both buckets are
+    back in credit, so callers queue in arrival order instead of failing.
+
+    With a `path` the bucket state lives in that file, updated under an
+    exclusive flock, so every worker process on the host draws from the same
+    budget. Without one the state is kept in memory for this process only.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], path: str = ""):
+        self.limits = {provider: limit for provider, limit in limits.items() if limit[0] > 0 or limit[1] > 0}
+        self.path = path if fcntl is not None else ""
+        self._lock = threading.Lock()
+        self._memory: Dict[str, List[float]] = {}
+        self._fd: Optional[int] = None
+        self._fd_pid: Optional[int] = None
+
+    def enabled(self, provider: str) -> bool:
+        return provider in self.limits
+
+    def _file(self) -> int:
+        # Opened lazily and per process, so a forked worker never shares the parent's descriptor
+        if self._fd is None or self._fd_pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._fd_pid = os.getpid()
+            if os.fstat(self._fd).st_size < _SLOT.size * len(PROVIDER_SLOTS):
+                os.ftruncate(self._fd, _SLOT.size * len(PROVIDER_SLOTS))
+        return self._fd
+
+    def _update(self, provider: str, change: Callable[[List[float], float], bool]):
+        """Refill the provider's state, apply `change` and store it if `change` returns True"""
+        rpm, tpm = self.limits[provider]
+        with self._lock:
+            fd = None
+            if self.path:
+                fd = self._file()
+                offset = PROVIDER_SLOTS[provider] * _SLOT.size
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if fd is not None:
+                    state = list(_SLOT.unpack(os.pread(fd, _SLOT.size, offset)))
+                else:
+                    state = self._memory.setdefault(provider, [0.0, 0.0, 0.0, 0.0])
+                now = time.time()
+                if state[2] <= 0:
+                    # Fresh state starts with a full minute of budget
+                    state[0], state[1], state[2] = float(rpm), float(tpm), now
+                elapsed = max(now - state[2], 0.0)
+                state[0] = min(rpm, state[0] + elapsed * rpm / 60.0)
+                state[1] = min(tpm, state[1] + elapsed * tpm / 60.0)
+                state[2] = now
+                if change(state, now) and fd is not None:
+                    os.pwrite(fd, _SLOT.pack(*state), offset)
+            finally:
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def reserve(self, provider: str, tokens: int, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve one request and `tokens` tokens. Returns how long to wait before
+        sending, or None (reserving nothing) if that would take longer than max_wait.
+        """
+        if not self.enabled(provider):
+            return 0.0
+        rpm, tpm = self.limits[provider]
+        wait: List[Optional[float]] = [0.0]
+
+        def take(state: List[float], now: float) -> bool:
+            requests = state[0] - 1 if rpm > 0 else state[0]
+            # A single call larger than the whole budget waits for a full bucket, not forever
+            token_level = state[1] - min(tokens, tpm) if tpm > 0 else state[1]
+            delay = max(
+                -requests * 60.0 / rpm if rpm > 0 else 0.0,
+                -token_level * 60.0 / tpm if tpm > 0 else 0.0,
+                state[3] - now,
+                0.0
+            )
+            if max_wait is not None and delay > max_wait:
+                wait[0] = None
+                return False
+            state[0], state[1] = requests, token_level
+            wait[0] = delay
+            return True
+
+        self._update(provider, take)
+        return wait[0]
+
+    def settle(self, provider: str, reserved: int, used: int):
+        """Return the unused part of a token reservation once the real usage is known"""
+        if not self.enabled(provider) or reserved == used:
+            return
+        tpm = self.limits[provider][1]
+
+        def adjust(state: List[float], now: float) -> bool:
+            state[1] = min(tpm, state[1] + reserved - used) if tpm > 0 else state[1]
+            return True
+
+        self._update(provider, adjust)
+
+    def block(self, provider: str, seconds: float):
+        """Hold every worker's calls to a provider that asked us to back off"""
+        if not self.enabled(provider) or seconds <= 0:
+            return
+
+        def hold(state: List[float], now: float) -> bool:
+            state[3] = max(state[3], now + seconds)
+            return True
+
+        self._update(provider, hold)
+
+    async def acquire(self, provider: str, tokens: int) -> float:
+        """
+        Wait for budget to send one call, within the request deadline. Raises
+        DeadlineExceeded without reserving anything if the wait would not fit.
+        """
+        if not self.enabled(provider):
+            return 0.0
+        remaining = remaining_budget()
+        wait = self.reserve(provider, tokens, max_wait=remaining)
+        if wait is None:
+            raise DeadlineExceeded(f"{provider} rate limit wait exceeds the request budget")
+        if wait > 0:
+            await asyncio.sleep(wait)
+        STAGE_SECONDS.observe(wait, stage="llm_throttle")
+        return wait
+
+
+def throttle_delay(error: Exception) -> Optional[float]:
+    """Retry-After seconds for a provider rate-limit (429) error, 0.0 if none given, None for other errors"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status != 429:
+        return None
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(float(headers.get("retry-after", 0.0)), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def backoff_delay(attempt: int, retry_after: float = 0.0) -> float:
+    """Full-jitter exponential backoff, never shorter than the provider's Retry-After"""
+    ceiling = min(settings.llm_retry_max_delay, settings.llm_retry_base_delay * 2 ** attempt)
+    return max(random.uniform(0, ceiling), retry_after)
+
+
+rate_limiter = SharedTokenBucket(
+    {
+        "openai": (settings.openai_rpm_limit, settings.openai_tpm_limit),
+        "gemini": (settings.gemini_rpm_limit, settings.gemini_tpm_limit)
+    },
+    path=settings.llm_rate_limit_path
+)
@@ -1,5 +1,6 @@
 """Red flag symptom detection"""
-from typing import Optional, Dict, List
+from functools import lru_cache
+from typing import Optional, Dict, List, NamedTuple, Iterable
 
 
 # Red flag symptoms that require immediate emergency care
@@ -45,21 +46,168 @@ RED_FLAG_SYMPTOMS: Dict[str, List[str]] = {
 }
 
 
+class RedFlagMatch(NamedTuple):
+    """A single keyword hit inside a user message"""
+    symptom: str
+    keyword: str
+    start: int
+    end: int
+
+
+class RedFlagMatcher:
+    """
+    Aho-Corasick automaton over every red flag keyword.
+    Built once, then scans a message in a single pass regardless of how many
+    keywords are configured. Matching is case-insensitive substring matching,
+    the same semantics as the original per-keyword `in` checks.
+    """
+
+    def __init__(self, symptoms: Dict[str, List[str]]):
+        self.symptoms: List[str] = list(symptoms)
+        self._rank: Dict[str, int] = {symptom: index for index, symptom in enumerate(self.symptoms)}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per node: (keyword, symptom index) for every keyword ending there,
+        # including those inherited through failure links
+        self._out: List[List[tuple]] = [[]]
+
+        for index, (symptom, keywords) in enumerate(symptoms.items()):
+            for keyword in keywords:
+                self._add(keyword.lower(), index)
+        self._build_failure_links()
+
+    def _add(self, keyword: str, symptom_index: int):
+        """Insert a keyword into the trie"""
+        if not keyword:
+            return
+        node = 0
+        for ch in keyword:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        if (keyword, symptom_index) not in self._out[node]:
+            self._out[node].append((keyword, symptom_index))
+
+    def _build_failure_links(self):
+        """Breadth-first construction of failure links and merged outputs"""
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, user_input: str) -> List[RedFlagMatch]:
+        """Return every keyword hit with its character offsets into user_input, in text order"""
+        lowered = user_input.lower()
+        if len(lowered) != len(user_input):
+            return self._find_all_mapped(user_input)
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        node = 0
+        for position, ch in enumerate(lowered):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                end = position + 1
+                for keyword, index in out[node]:
+                    matches.append(RedFlagMatch(self.symptoms[index], keyword, end - len(keyword), end))
+        return matches
+
+    def _find_all_mapped(self, user_input: str) -> List[RedFlagMatch]:
+        """
+        find_all for text whose lowercase form has a different length ("İ"
+        lowercases to two code points). Characters are lowercased one at a
+        time so every offset still points into the original text.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        origins: List[int] = []  # original index of each lowercased character
+        node = 0
+        for position, original in enumerate(user_input):
+            for ch in original.lower():
+                origins.append(position)
+                while node and ch not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(ch, 0)
+                for keyword, index in out[node]:
+                    start = origins[len(origins) - len(keyword)]
+                    matches.append(RedFlagMatch(self.symptoms[index], keyword, start, position + 1))
+        return matches
+
+    def categories(self, user_input: str) -> List[str]:
+        """Return every matched symptom category in configuration order"""
+        hits = {match.symptom for match in self.find_all(user_input)}
+        return sorted(hits, key=self._rank.__getitem__)
+
+    def first(self, user_input: str) -> Optional[str]:
+        """
+        Return the highest-priority matched symptom category, or None.
+        Priority follows configuration order, so the result is the same as
+        checking each category in turn.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        best = None
+        node = 0
+        for ch in user_input.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for _, index in out[node]:
+                if best is None or index < best:
+                    best = index
+                    if best == 0:
+                        return self.symptoms[0]
+        return self.symptoms[best] if best is not None else None
+
+    def first_batch(self, user_inputs: Iterable[str]) -> List[Optional[str]]:
+        """Run `first` over a list of messages"""
+        first = self.first
+        return [first(user_input) for user_input in user_inputs]
+
+    def find_all_batch(self, user_inputs: Iterable[str]) -> List[List[RedFlagMatch]]:
+        """Run `find_all` over a list of messages"""
+        find_all = self.find_all
+        return [find_all(user_input) for user_input in user_inputs]
+
+
+# Built once at import so every request shares the same automaton
+_matcher = RedFlagMatcher(RED_FLAG_SYMPTOMS)
+
+
+@lru_cache(maxsize=1024)
 def check_red_flags(user_input: str) -> Optional[str]:
     """
     Check if user input contains any red flag symptoms.
     Returns the red flag symptom if found, None otherwise.
     This check is performed FIRST before any other processing.
+    Results are cached because the same message is screened by the endpoint
+    and again by the triage service.
     """
-    user_input_lower = user_input.lower()
-    
-    # Check each red flag symptom category
-    for symptom, keywords in RED_FLAG_SYMPTOMS.items():
-        for keyword in keywords:
-            if keyword.lower() in user_input_lower:
-                return symptom
-    
-    return None
+    return _matcher.first(user_input)
+
+
+def find_red_flags(user_input: str) -> List[RedFlagMatch]:
+    """Return every red flag keyword found in user input with character offsets"""
+    return _matcher.find_all(user_input)
+
+
+def check_red_flags_batch(user_inputs: Iterable[str]) -> List[Optional[str]]:
+    """Check a list of messages for red flags, one result per message"""
+    return _matcher.first_batch(user_inputs)
 
 
 def get_red_flag_response(symptom: str) -> str:
@@ -0,0 +1,281 @@
+"""Routing LLM calls across providers with hedging, circuit breakers and deadlines"""
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Deque, Dict, Iterator, List, Optional, TypeVar
+
+from app.config import settings
+from app.metrics import LLM_BREAKER_OPEN, LLM_ROUTER_EVENTS
+
+
+T = TypeVar("T")
+
+# Absolute time.monotonic() deadline of the current request, shared by every LLM call it makes
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's LLM time budget ran out"""
+
+
+class ProvidersUnavailable(Exception):
+    """Every provider's circuit breaker is open"""
+
+
+@contextmanager
+def request_budget(seconds: float) -> Iterator[None]:
+    """
+    Give every LLM call made inside the block a shared deadline `seconds` from
+    now. A tighter deadline already in force is kept; 0 or less sets none.
+    """
+    deadline = time.monotonic() + seconds if seconds > 0 else None
+    current = _deadline.get()
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left in the current request's budget, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` errors within `window` seconds and rejects calls
+    for `cooldown` seconds. Then a single probe call is let through: success
+    closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failures: int = 5, window: float = 30.0, cooldown: float = 30.0):
+        self.failures = failures
+        self.window = window
+        self.cooldown = cooldown
+        self._errors: Deque[float] = deque()
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now; in half-open state only one probe at a time"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._probing)
+
+    def begin(self):
+        """A call is being sent; in half-open state it is the probe"""
+        if self.state == "half_open":
+            self._probing = True
+
+    def record_success(self):
+        self._errors.clear()
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count an error; returns True when this error opened the breaker"""
+        now = time.monotonic()
+        if self._opened_at is not None:
+            # A failed probe re-opens for another cooldown
+            self._opened_at = now
+            self._probing = False
+            return False
+        self._errors.append(now)
+        while self._errors and now - self._errors[0] > self.window:
+            self._errors.popleft()
+        if len(self._errors) >= self.failures:
+            self._opened_at = now
+            self._errors.clear()
+            return True
+        return False
+
+    def release_probe(self):
+        """A probe was cancelled before finishing; let the next call probe instead"""
+        self._probing = False
+
+
+class LatencyTracker:
+    """Latencies of the most recent successful calls, for percentile lookups"""
+
+    def __init__(self, size: int = 200):
+        self._recent: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._recent.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        index = min(int(p / 100.0 * len(ordered)), len(ordered) - 1)
+        return ordered[index]
+
+
+class ProviderRouter:
+    """
+    Sends each call to the first provider whose breaker allows it. If that
+    call is still running after the provider's hedge delay (a latency
+    percentile of its recent calls, clamped to [hedge_min_delay,
+    hedge_max_delay]), the same call is sent to the next
+    provider and whichever answers first wins. A failed call fails over to the
+    next provider at once. Everything is bounded by the request budget.
+    """
+
+    def __init__(self, providers: List[str], hedge_percentile: float = 95.0, hedge_min_delay: float = 0.25,
+                 hedge_max_delay: float = 2.0, hedge_min_samples: int = 20, breaker_failures: int = 5,
+                 breaker_window: float = 30.0, breaker_cooldown: float = 30.0):
+        self.providers = list(providers)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breakers: Dict[str, CircuitBreaker] = {
+            provider: CircuitBreaker(breaker_failures, breaker_window, breaker_cooldown) for provider in providers
+        }
+        self.latency: Dict[str, LatencyTracker] = {provider: LatencyTracker() for provider in providers}
+        for provider in providers:
+            LLM_BREAKER_OPEN.set(0, provider=provider)
+
+    def hedge_delay(self, provider: str) -> Optional[float]:
+        """How long to wait on `provider` before hedging; None disables hedging"""
+        if self.hedge_percentile <= 0:
+            return None
+        tracker = self.latency[provider]
+        if len(tracker) < self.hedge_min_samples:
+            return self.hedge_max_delay
+        # Capped so a slowly degrading provider cannot push its own hedge delay out
+        return min(max(tracker.percentile(self.hedge_percentile), self.hedge_min_delay), self.hedge_max_delay)
+
+    def available(self) -> List[str]:
+        """Providers that may take a call now, in preference order"""
+        return [provider for provider in self.providers if self.breakers[provider].allow()]
+
+    def record(self, provider: str, ok: bool, seconds: Optional[float] = None):
+        """Feed one call's outcome into the provider's breaker and latency window"""
+        breaker = self.breakers[provider]
+        if ok:
+            breaker.record_success()
+            LLM_BREAKER_OPEN.set(0, provider=provider)
+            if seconds is not None:
+                self.latency[provider].add(seconds)
+        elif breaker.record_failure():
+            LLM_ROUTER_EVENTS.inc(provider=provider, event="breaker_open")
+            LLM_BREAKER_OPEN.set(1, provider=provider)
+            print(f"Warning: circuit breaker opened for LLM provider {provider}")
+
+    async def _attempt(self, provider: str, attempt: Callable[[str], Awaitable[T]]) -> T:
+        self.breakers[provider].begin()
+        start = time.perf_counter()
+        try:
+            result = await attempt(provider)
+        except asyncio.CancelledError:
+            # Lost a hedge race or the request gave up; says nothing about the provider
+            self.breakers[provider].release_probe()
+            raise
+        except Exception:
+            self.record(provider, False)
+            raise
+        self.record(provider, True, time.perf_counter() - start)
+        return result
+
+    async def call(self, attempt: Callable[[str], Awaitable[T]]) -> T:
+        """
+        Run `attempt(provider)` under the routing policy and return the first
+        successful result. Raises the last provider error if all attempts fail,
+        DeadlineExceeded when the request budget runs out and
+        ProvidersUnavailable when every breaker is open.
+        """
+        candidates = self.available()
+        if not candidates:
+            LLM_ROUTER_EVENTS.inc(provider="all", event="unavailable")
+            raise ProvidersUnavailable("All LLM providers are unavailable")
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("LLM time budget exhausted")
+
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + remaining if remaining is not None else None
+        pending: Dict[asyncio.Task, str] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch(provider: str):
+            pending[asyncio.ensure_future(self._attempt(provider, attempt))] = provider
+
+        first = candidates.pop(0)
+        launch(first)
+        delay = self.hedge_delay(first)
+        hedge_at = loop.time() + delay if delay is not None and candidates else None
+        try:
+            while pending:
+                wake = min((t for t in (hedge_at, deadline_at) if t is not None), default=None)
+                done, _ = await asyncio.wait(
+                    pending, timeout=None if wake is None else max(wake - loop.time(), 0),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                # Any success wins, even if another attempt failed in the same wake-up
+                for task in sorted(done, key=lambda t: t.exception() is not None):
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        if provider != first:
+                            LLM_ROUTER_EVENTS.inc(provider=provider, event="hedge_won")
+                        return task.result()
+                    last_error = task.exception()
+                    if candidates and not pending:
+                        failover = candidates.pop(0)
+                        LLM_ROUTER_EVENTS.inc(provider=failover, event="failover")
+                        launch(failover)
+                        hedge_at = None
+                now = loop.time()
+                if deadline_at is not None and now >= deadline_at:
+                    LLM_ROUTER_EVENTS.inc(provider=first, event="deadline")
+                    raise DeadlineExceeded("LLM time budget exhausted")
+                if hedge_at is not None and now >= hedge_at and candidates:
+                    hedge = candidates.pop(0)
+                    LLM_ROUTER_EVENTS.inc(provider=hedge, event="hedge")
+                    launch(hedge)
+                    hedge_at = None
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error
+
+    def status(self) -> Dict[str, Dict]:
+        """Breaker state and hedge delay per provider"""
+        return {
+            provider: {
+                "breaker": self.breakers[provider].state,
+                "hedge_delay": self.hedge_delay(provider),
+                "p50_seconds": self.latency[provider].percentile(50),
+                "samples": len(self.latency[provider])
+            }
+            for provider in self.providers
+        }
+
+
+def create_router(providers: List[str]) -> ProviderRouter:
+    """Router configured from settings"""
+    return ProviderRouter(
+        providers,
+        hedge_percentile=settings.llm_hedge_percentile,
+        hedge_min_delay=settings.llm_hedge_min_delay,
+        hedge_max_delay=settings.llm_hedge_max_delay,
+        breaker_failures=settings.llm_breaker_failures,
+        breaker_window=settings.llm_breaker_window,
+        breaker_cooldown=settings.llm_breaker_cooldown
+    )
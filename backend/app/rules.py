@@ -0,0 +1,318 @@
+"""Deterministic triage rules that decide clear-cut turns without the LLM"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+from app.config import settings
+from app.extraction import AGE_GROUPS, extract
+from app.metrics import RULE_DECISIONS
+from app.models import TriageLevel, TriageResult
+from app.red_flags import check_red_flags
+
+
+# Words a clear-cut message may contain besides the facts extract() reads:
+# fever and temperature terms, tiredness, people, times and function words.
+# Any other word (a symptom, a condition, "also", "but") may change the
+# triage, so the turn is left to the LLM instead of being decided by rules.
+_KNOWN_WORDS = frozenset("""
+    fever fevers feverish temperature temperatures temp temps degree degrees f c fahrenheit celsius
+    mild slight slightly low grade high very hot warm burning running measured reading readings
+    thermometer checked took taken tired tiredness feel feeling felt
+    i i'm im i've ive me my we we're our he he's his him she she's her they they're their
+    it it's its this that someone person
+    son daughter husband wife partner mom mum mother dad father baby babies kid kids child children
+    am is was are were be been being has have had having got get getting
+    started starting began begun since for of about around approximately roughly almost nearly
+    at on in to from up over just now today tonight yesterday morning afternoon evening night
+    last ago past still currently right the a an and or with
+    old older year years yr yrs month months mo mos week weeks wk wks day days hour hours hr hrs
+    minute minutes min mins grown adult adults senior seniors elderly teen teens teenager teenagers
+    adolescent adolescents infant infants newborn newborns toddler toddlers
+    one two three four five six seven eight nine ten couple few several age aged
+""".split())
+
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+_AGE_RANK = {group: rank for rank, group in enumerate(AGE_GROUPS)}
+
+_DURATION_QUESTION = "How long have you had the fever?"
+_AGE_QUESTION = "Which age group is the person with the fever: infant, child, teenager, adult or senior?"
+_TEMPERATURE_QUESTION = "What is the current temperature, if you have been able to measure it?"
+
+
+class Facts(NamedTuple):
+    """What the user has reported across the conversation"""
+    temperature_f: Optional[float]
+    age_group: Optional[str]
+    duration_days: Optional[float]
+    high_fever: bool
+    other_findings: bool
+
+
+class RuleDecision(NamedTuple):
+    """Outcome of the rule that fired for a turn"""
+    rule: str
+    confidence: float
+    triage_result: TriageResult
+    reply: Optional[str]
+
+
+def build_red_flag_triage(red_flag: str) -> TriageResult:
+    """Build the emergency triage result for a detected red flag"""
+    # Trusted values; model_construct skips validation
+    return TriageResult.model_construct(
+        triage_level=TriageLevel.EMERGENCY,
+        escalate=True,
+        summary=f"Red flag symptom detected: {red_flag}",
+        recommended_next_steps=[
+            "Call emergency services immediately",
+            "Go to the nearest emergency room",
+            "Do not delay seeking medical attention"
+        ],
+        red_flag_detected=True,
+        red_flag_symptom=red_flag,
+        confidence=1.0
+    )
+
+
+@lru_cache(maxsize=1024)
+def _has_other_findings(text: str) -> bool:
+    """Whether a message holds anything beyond the facts the rules understand"""
+    if extract(text).ignored_numbers:
+        return True
+    words = _WORD.findall(text.lower().replace("\u2019", "'"))
+    return any(word not in _KNOWN_WORDS for word in words)
+
+
+def gather_facts(conversation_history: List[Dict], current_message: str) -> Facts:
+    """
+    Combine the facts from every user message. The highest temperature,
+    the youngest age group and the longest duration are kept.
+    """
+    temperature = None
+    age_rank = None
+    duration = None
+    high_fever = False
+    other_findings = False
+    texts = [msg.get("content", "") for msg in conversation_history if msg.get("role", "user") == "user"]
+    texts.append(current_message)
+    for text in texts:
+        facts = extract(text)
+        if facts.temperature is not None:
+            fahrenheit = facts.temperature.fahrenheit
+            temperature = fahrenheit if temperature is None else max(temperature, fahrenheit)
+        if facts.age_group is not None:
+            rank = _AGE_RANK[facts.age_group]
+            age_rank = rank if age_rank is None else min(age_rank, rank)
+        if facts.duration_days is not None:
+            duration = facts.duration_days if duration is None else max(duration, facts.duration_days)
+        high_fever = high_fever or facts.high_fever
+        other_findings = other_findings or _has_other_findings(text)
+    age_group = AGE_GROUPS[age_rank] if age_rank is not None else None
+    return Facts(temperature, age_group, duration, high_fever, other_findings)
+
+
+def _next_question(facts: Facts) -> Optional[str]:
+    if facts.duration_days is None:
+        return _DURATION_QUESTION
+    if facts.age_group is None:
+        return _AGE_QUESTION
+    return None
+
+
+def _decision(rule: str, confidence: float, level: TriageLevel, summary: str, steps: List[str],
+              reply: str, next_question: Optional[str]) -> RuleDecision:
+    confidence = round(confidence, 2)
+    return RuleDecision(rule, confidence, TriageResult.model_construct(
+        triage_level=level,
+        escalate=level in (TriageLevel.EMERGENCY, TriageLevel.URGENT),
+        summary=summary,
+        recommended_next_steps=steps,
+        next_question=next_question,
+        confidence=confidence
+    ), reply)
+
+
+def evaluate(conversation_history: List[Dict], current_message: str) -> Optional[RuleDecision]:
+    """
+    Apply the triage rules to a turn. Returns the first rule that fires with
+    its confidence, or None when no rule applies. Rules follow the CLI's
+    guidance thresholds: 103°F and above is high, 100.4°F and above is a fever,
+    infants and long-lasting fevers need a provider.
+    """
+    red_flag = check_red_flags(current_message)
+    if red_flag:
+        return RuleDecision("red_flag", 1.0, build_red_flag_triage(red_flag), None)
+
+    facts = gather_facts(conversation_history, current_message)
+    temperature = facts.temperature_f
+    next_question = _next_question(facts)
+    # Anything else reported (other symptoms, conditions) may make an urgent case an emergency
+    penalty = 0.1 if facts.other_findings else 0.0
+
+    if facts.age_group == "infant" and temperature is not None and temperature >= 100.4:
+        return _decision(
+            "infant_fever", (0.95 if temperature >= 103.0 else 0.9) - penalty, TriageLevel.URGENT,
+            f"Fever of {temperature:.1f}°F in an infant",
+            [
+                "Call your pediatrician or an urgent care service now",
+                "Keep the baby hydrated with regular feeds",
+                "Seek emergency care if the baby is hard to wake, breathing fast or not feeding"
+            ],
+            "For infants, a fever can be more concerning and needs prompt medical advice. "
+            "Please contact your pediatrician or an urgent care service now.",
+            None
+        )
+
+    if temperature is not None and temperature >= 103.0:
+        return _decision(
+            "high_fever", (0.95 if temperature >= 104.0 else 0.9) - penalty, TriageLevel.URGENT,
+            f"High fever of {temperature:.1f}°F",
+            [
+                "Take fever-reducing medication as directed (if not allergic)",
+                "Stay hydrated by drinking plenty of fluids",
+                "Consult a healthcare provider today"
+            ],
+            "Your temperature is quite high. Please take fever-reducing medication as directed "
+            "(if not allergic), stay hydrated, rest somewhere cool and contact a healthcare provider today.",
+            next_question
+        )
+
+    if facts.high_fever and temperature is None:
+        # Described as high but not measured; the LLM is better placed to follow up
+        return _decision(
+            "reported_high_fever", 0.7, TriageLevel.URGENT,
+            "High fever reported",
+            [
+                "Take fever-reducing medication if not allergic",
+                "Stay hydrated",
+                "Consult a healthcare provider soon"
+            ],
+            "A high fever should be checked. If you can, please measure your temperature.",
+            _TEMPERATURE_QUESTION
+        )
+
+    if facts.duration_days is not None and facts.duration_days >= 3:
+        week = facts.duration_days >= 7
+        return _decision(
+            "prolonged_fever", (0.9 if week else 0.85) - penalty, TriageLevel.FOLLOW_UP,
+            "Symptoms lasting a week or more" if week else "Fever lasting several days",
+            [
+                "Book an appointment with a healthcare provider",
+                "Keep monitoring your temperature",
+                "Stay hydrated and rest"
+            ],
+            "Since your symptoms have persisted for a week or more, it's important to consult with a "
+            "healthcare provider." if week else
+            "Since your fever has persisted for several days, it's advisable to consult with a "
+            "healthcare provider.",
+            None if facts.age_group else _AGE_QUESTION
+        )
+
+    if temperature is not None and 100.4 <= temperature < 102.0 and facts.age_group not in ("infant", "senior"):
+        # Mild fever: certain only once age and duration are known and nothing else is reported.
+        # Self-care skips the LLM, so any message that is not only recognized facts defers to it.
+        # Readings below a fever (low or implausible) are left to the LLM as well.
+        confidence = 0.95
+        if facts.age_group is None or facts.age_group == "child":
+            confidence -= 0.1
+        if facts.duration_days is None:
+            confidence -= 0.1
+        if facts.other_findings:
+            confidence -= 0.3
+        return _decision(
+            "mild_fever", confidence, TriageLevel.SELF_CARE,
+            f"Mild fever of {temperature:.1f}°F",
+            [
+                "Rest and stay hydrated",
+                "Take fever-reducing medication if needed (if not allergic)",
+                "Monitor your temperature",
+                "Consult a doctor if symptoms persist or worsen"
+            ],
+            "This sounds like a mild fever that can usually be managed at home. Rest, drink plenty of "
+            "fluids and take fever-reducing medication if needed (if not allergic).",
+            next_question
+        )
+    return None
+
+
+class RuleEngine:
+    """
+    Decides turns from the rules when the winning rule's confidence reaches
+    the threshold, and records every evaluation so the hit rate can be audited
+    at /api/rules/stats, in the Prometheus metrics and in an optional JSONL log.
+    """
+
+    def __init__(self, threshold: float = 0.9, audit_path: str = ""):
+        self.threshold = threshold
+        self.audit_path = audit_path
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.applied = 0
+        self.deferred = 0
+        self.unmatched = 0
+        self._applied_by_rule: Counter = Counter()
+        self._deferred_by_rule: Counter = Counter()
+
+    def decide(self, conversation_history: List[Dict], current_message: str,
+               session_id: Optional[str] = None) -> Optional[RuleDecision]:
+        """The rule decision for a turn, or None when the LLM should decide"""
+        if not settings.rules_enabled:
+            return None
+        decision = evaluate(conversation_history, current_message)
+        applied = decision is not None and decision.confidence >= self.threshold
+        self._record(decision, applied, session_id)
+        return decision if applied else None
+
+    def _record(self, decision: Optional[RuleDecision], applied: bool, session_id: Optional[str]):
+        rule = decision.rule if decision is not None else "none"
+        outcome = "applied" if applied else ("deferred" if decision is not None else "unmatched")
+        RULE_DECISIONS.inc(rule=rule, outcome=outcome)
+        with self._lock:
+            self.evaluated += 1
+            if applied:
+                self.applied += 1
+                self._applied_by_rule[rule] += 1
+            elif decision is not None:
+                self.deferred += 1
+                self._deferred_by_rule[rule] += 1
+            else:
+                self.unmatched += 1
+            if self.audit_path:
+                entry = {
+                    "time": round(time.time(), 3),
+                    "session_id": session_id,
+                    "rule": rule,
+                    "outcome": outcome,
+                    "confidence": decision.confidence if decision is not None else None,
+                    "triage_level": decision.triage_result.triage_level.value if decision is not None else None
+                }
+                try:
+                    with open(self.audit_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print(f"Warning: could not write rule audit log: {e}")
+
+    def stats(self) -> Dict:
+        """Decision counters"""
+        return {
+            "enabled": settings.rules_enabled,
+            "threshold": self.threshold,
+            "evaluated": self.evaluated,
+            "applied": self.applied,
+            "deferred": self.deferred,
+            "unmatched": self.unmatched,
+            "hit_rate": round(self.applied / self.evaluated, 4) if self.evaluated else 0.0,
+            "applied_by_rule": dict(self._applied_by_rule),
+            "deferred_by_rule": dict(self._deferred_by_rule)
+        }
+
+
+rule_engine = RuleEngine(
+    threshold=settings.rules_confidence_threshold,
+    audit_path=settings.rules_audit_log
+)
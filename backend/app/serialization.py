@@ -0,0 +1,49 @@
+"""Fast JSON encoding shared by API responses, SSE events and stored JSON"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used instead
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON; datetimes become ISO strings and str enums their values"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def dumps_str(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+def loads(data) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson. A pydantic model passed as the content
+    is serialized by pydantic-core directly, without validating it again, so
+    handlers that build their response from trusted values can return
+    `FastJSONResponse(Model.model_construct(...))` and skip FastAPI's
+    response_model validation and jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return pydantic_core.to_json(content)
+        return dumps(content)
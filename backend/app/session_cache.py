@@ -0,0 +1,237 @@
+"""In-process conversation session cache with write-behind flushing"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.metrics import stage_timer
+from app.database import (
+    AsyncSessionLocal, append_messages_async, get_conversation_async, get_messages_async
+)
+
+
+class CachedSession:
+    """Conversation state held in memory, plus writes not yet flushed"""
+
+    __slots__ = ("session_id", "messages", "pending", "triage_level", "summary",
+                 "red_flag_detected", "aggregates_dirty", "last_access")
+
+    def __init__(self, session_id: str, messages: List[Dict], triage_level: Optional[str] = None,
+                 summary: Optional[str] = None, red_flag_detected: Optional[str] = None):
+        self.session_id = session_id
+        self.messages = messages
+        self.pending: List[Dict] = []
+        self.triage_level = triage_level
+        self.summary = summary
+        self.red_flag_detected = red_flag_detected
+        self.aggregates_dirty = False
+        self.last_access = time.monotonic()
+
+    @property
+    def message_count(self) -> int:
+        return len(self.messages)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending) or self.aggregates_dirty
+
+
+class SessionCache:
+    """
+    Bounded LRU cache of conversation sessions with an idle TTL.
+    Hot sessions are read from memory. Appends are buffered and written to the
+    database in batches by `flush`, which also runs for any dirty session
+    that is evicted, so nothing is dropped. Used from the event loop only.
+    """
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 1800.0,
+                 session_factory: Callable[[], AsyncSession] = AsyncSessionLocal):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.session_factory = session_factory
+        self._sessions: "OrderedDict[str, CachedSession]" = OrderedDict()
+        self._flush_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+        self.flushed_messages = 0
+
+    def peek(self, session_id: str) -> Optional[CachedSession]:
+        """Get a session only if it is already in memory"""
+        cached = self._sessions.get(session_id)
+        if cached is not None:
+            self.hits += 1
+            self._touch(cached)
+        return cached
+
+    async def get(self, db: AsyncSession, session_id: str) -> Optional[CachedSession]:
+        """Get a session from memory, loading it from the database on a miss"""
+        cached = self.peek(session_id)
+        if cached is not None:
+            return cached
+
+        self.misses += 1
+        conversation = await get_conversation_async(db, session_id)
+        if conversation is None:
+            return None
+        # Timestamps stay datetimes; they are only formatted if a response includes them
+        messages = [
+            {"role": msg.role, "content": msg.content, "timestamp": msg.timestamp}
+            for msg in await get_messages_async(db, session_id)
+        ]
+        # Another request may have loaded the session while we awaited the database
+        cached = self._sessions.get(session_id)
+        if cached is not None:
+            return cached
+        cached = CachedSession(
+            session_id=session_id,
+            messages=messages,
+            triage_level=conversation.triage_level,
+            summary=conversation.summary,
+            red_flag_detected=conversation.red_flag_detected
+        )
+        await self._insert(cached)
+        return cached
+
+    async def append(self, db: AsyncSession, session_id: str, new_messages: List[Dict],
+                     triage_level: Optional[str] = None, summary: Optional[str] = None,
+                     red_flag: Optional[str] = None) -> CachedSession:
+        """Append messages and update aggregates in memory; the write happens on the next flush"""
+        cached = await self.get(db, session_id)
+        if cached is None:
+            cached = self._sessions.get(session_id)
+            if cached is None:
+                cached = CachedSession(session_id=session_id, messages=[])
+                await self._insert(cached)
+        cached.messages.extend(new_messages)
+        cached.pending.extend(new_messages)
+        cached.triage_level = triage_level
+        cached.summary = summary
+        cached.red_flag_detected = red_flag
+        cached.aggregates_dirty = True
+        return cached
+
+    async def flush(self) -> int:
+        """Write every dirty session in a single transaction. Returns the number of sessions written."""
+        return await self._flush_sessions([cached for cached in self._sessions.values() if cached.dirty])
+
+    async def flush_session(self, session_id: str) -> int:
+        """Write one session's buffered writes now, for callers that must confirm persistence"""
+        cached = self._sessions.get(session_id)
+        return await self._flush_sessions([cached] if cached is not None and cached.dirty else [])
+
+    async def evict_expired(self) -> int:
+        """Drop sessions idle for longer than the TTL, flushing any that are dirty"""
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = []
+        for cached in self._sessions.values():
+            if cached.last_access > cutoff:
+                break
+            expired.append(cached)
+        await self._drop(expired)
+        self.expirations += len(expired)
+        return len(expired)
+
+    async def clear(self):
+        """Flush and drop every cached session"""
+        await self.flush()
+        self._sessions.clear()
+
+    def stats(self) -> Dict:
+        """Cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "dirty": sum(1 for cached in self._sessions.values() if cached.dirty),
+            "flushes": self.flushes,
+            "flushed_messages": self.flushed_messages
+        }
+
+    def _touch(self, cached: CachedSession):
+        cached.last_access = time.monotonic()
+        self._sessions.move_to_end(cached.session_id)
+
+    async def _insert(self, cached: CachedSession):
+        self._sessions[cached.session_id] = cached
+        overflow = len(self._sessions) - self.max_sessions
+        if overflow > 0:
+            evicted = [entry for _, entry in zip(range(overflow), self._sessions.values())]
+            await self._drop(evicted)
+            self.evictions += len(evicted)
+
+    async def _drop(self, sessions: List[CachedSession]):
+        """Remove sessions from memory, flushing dirty ones first so no write is lost"""
+        await self._flush_sessions([cached for cached in sessions if cached.dirty])
+        # Holding the flush lock guarantees none of these has writes in flight
+        async with self._flush_lock:
+            for cached in sessions:
+                # Skip sessions written to again while the flush was awaiting
+                if not cached.dirty and self._sessions.get(cached.session_id) is cached:
+                    del self._sessions[cached.session_id]
+
+    async def _flush_sessions(self, sessions: List[CachedSession]) -> int:
+        if not sessions:
+            return 0
+        async with self._flush_lock:
+            # Take the buffered writes; appends made while we await go to a fresh buffer
+            batch = []
+            for cached in sessions:
+                if cached.dirty:
+                    batch.append((cached, cached.pending, cached.triage_level,
+                                  cached.summary, cached.red_flag_detected))
+                    cached.pending = []
+                    cached.aggregates_dirty = False
+            if not batch:
+                return 0
+
+            try:
+                async with self.session_factory() as db:
+                    for cached, pending, triage_level, summary, red_flag in batch:
+                        await append_messages_async(
+                            db, cached.session_id, pending,
+                            triage_level=triage_level,
+                            summary=summary,
+                            red_flag=red_flag,
+                            commit=False
+                        )
+                    with stage_timer("db_commit"):
+                        await db.commit()
+            except BaseException:
+                # Put the writes back so the next flush retries them, also when cancelled
+                for cached, pending, *_ in batch:
+                    cached.pending = pending + cached.pending
+                    cached.aggregates_dirty = True
+                raise
+
+            for _, pending, *_ in batch:
+                self.flushed_messages += len(pending)
+            self.flushes += 1
+            return len(batch)
+
+
+async def run_flusher(cache: "SessionCache", interval: float):
+    """Periodically expire idle sessions and flush dirty ones"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await cache.evict_expired()
+            await cache.flush()
+        except Exception as e:
+            print(f"Warning: session cache flush failed: {e}")
+
+
+session_cache = SessionCache(
+    max_sessions=settings.session_cache_size,
+    idle_ttl=settings.session_cache_ttl
+)
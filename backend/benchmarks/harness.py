@@ -0,0 +1,174 @@
+"""Timing, baseline storage and regression checks for the benchmark suite"""
+import gc
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+# A timer runs the benchmarked operation `loops` times and returns the seconds spent
+Timer = Callable[[int], float]
+
+
+class Benchmark(NamedTuple):
+    """
+    A registered benchmark. setup builds its fixtures and returns the timer,
+    or yields it and tears the fixtures down after the yield.
+    """
+    name: str
+    setup: Callable[[], Timer]
+    threshold: Optional[float]  # overrides the default regression threshold for noisy paths
+    slow: bool  # skipped by --quick
+
+
+class Comparison(NamedTuple):
+    """A benchmark result compared with its baseline"""
+    name: str
+    baseline_us: Optional[float]
+    current_us: Optional[float]
+    ratio: Optional[float]
+    status: str  # ok, regressed, improved, new or missing
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, threshold: Optional[float] = None, slow: bool = False):
+    """Register a setup function as a benchmark"""
+    def register(setup: Callable[[], Timer]) -> Callable[[], Timer]:
+        BENCHMARKS.append(Benchmark(name, setup, threshold, slow))
+        return setup
+    return register
+
+
+def loop_timer(func: Callable[[], object]) -> Timer:
+    """Timer that calls func back to back"""
+    def timer(loops: int) -> float:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return time.perf_counter() - start
+    return timer
+
+
+def measure(timer: Timer, repeat: int = 5, min_time: float = 0.1) -> Dict:
+    """
+    Calibrate a loop count so one run takes at least min_time seconds, then
+    time `repeat` runs. Per-operation times are reported in microseconds.
+    """
+    timer(1)  # warm up caches and lazy initialisation
+    gc.collect()
+    # Like timeit, keep garbage collection pauses out of the timed runs
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        loops = 1
+        while True:
+            elapsed = timer(loops)
+            if elapsed >= min_time or loops >= 10 ** 7:
+                break
+            loops = min(loops * max(2, int(min_time / max(elapsed, 1e-9) * 1.2)), 10 ** 7)
+
+        samples = [timer(loops) / loops * 1e6 for _ in range(repeat)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        "loops": loops,
+        "min_us": round(min(samples), 3),
+        "median_us": round(statistics.median(samples), 3),
+        "max_us": round(max(samples), 3)
+    }
+
+
+def run_benchmark(bench: Benchmark, repeat: int = 5, min_time: float = 0.1) -> Dict:
+    """Set up, measure and tear down one benchmark"""
+    if not inspect.isgeneratorfunction(bench.setup):
+        return measure(bench.setup(), repeat, min_time)
+    fixture = bench.setup()
+    timer = next(fixture)
+    try:
+        return measure(timer, repeat, min_time)
+    finally:
+        next(fixture, None)
+
+
+def environment() -> Dict:
+    """Where the numbers were taken; baselines only compare well on the same machine"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    """Read a baseline file, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, Dict], previous: Optional[Dict] = None):
+    """Write results as the new baseline, keeping entries for benchmarks that were not run"""
+    merged = dict(previous["results"]) if previous else {}
+    merged.update(results)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"environment": environment(), "results": dict(sorted(merged.items()))}, f, indent=2)
+        f.write("\n")
+
+
+def compare(baseline: Dict[str, Dict], results: Dict[str, Dict], threshold: float,
+            thresholds: Optional[Dict[str, float]] = None, min_delta_us: float = 0.0) -> List[Comparison]:
+    """
+    Compare fastest-run times with the baseline. A benchmark regresses when it
+    is slower than the baseline by more than its threshold (0.25 = 25%) and
+    by more than min_delta_us, so timer noise on sub-microsecond paths does
+    not count as a change.
+    """
+    thresholds = thresholds or {}
+    comparisons = []
+    for name in sorted(set(baseline) | set(results)):
+        base = baseline.get(name, {}).get("min_us")
+        current = results.get(name, {}).get("min_us")
+        if current is None:
+            comparisons.append(Comparison(name, base, None, None, "missing"))
+            continue
+        if base is None:
+            comparisons.append(Comparison(name, None, current, None, "new"))
+            continue
+        ratio = current / base if base else float("inf")
+        limit = thresholds.get(name, threshold)
+        if abs(current - base) <= min_delta_us:
+            status = "ok"
+        elif ratio > 1 + limit:
+            status = "regressed"
+        elif ratio < 1 / (1 + limit):
+            status = "improved"
+        else:
+            status = "ok"
+        comparisons.append(Comparison(name, base, current, round(ratio, 3), status))
+    return comparisons
+
+
+def format_comparisons(comparisons: List[Comparison]) -> str:
+    """Table of results against the baseline"""
+    width = max([len(c.name) for c in comparisons] + [9])
+    lines = [f"{'benchmark':<{width}}  {'baseline us':>12}  {'current us':>12}  {'ratio':>7}  status"]
+    for c in comparisons:
+        base = f"{c.baseline_us:.3f}" if c.baseline_us is not None else "-"
+        current = f"{c.current_us:.3f}" if c.current_us is not None else "-"
+        ratio = f"{c.ratio:.2f}x" if c.ratio is not None else "-"
+        lines.append(f"{c.name:<{width}}  {base:>12}  {current:>12}  {ratio:>7}  {c.status}")
+    return "\n".join(lines)
+
+
+def progress(message: str):
+    print(message, file=sys.stderr, flush=True)
@@ -0,0 +1,391 @@
+"""
+Run the benchmark suite and compare it with the stored baseline.
+
+Usage (from backend/):
+    python -m benchmarks.run                 # run and compare, exit 1 on regression
+    python -m benchmarks.run --save          # run and store as the new baseline
+    python -m benchmarks.run --quick -k red  # skip slow benchmarks, filter by name
+"""
+import os
+import sys
+import tempfile
+
+# Benchmarks must never touch the real database or call a paid LLM API,
+# so the environment is pinned before any app module reads its settings.
+_WORKDIR = tempfile.mkdtemp(prefix="healthguide-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_WORKDIR, 'bench.db')}"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["GEMINI_API_KEY"] = ""
+os.environ["LLM_CACHE_PATH"] = ""
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))  # repo root, for the healthguide CLI module
+
+import argparse
+import json
+import random
+import shutil
+import time
+import uuid
+
+import numpy as np
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.harness import (
+    BENCHMARKS, benchmark, compare, format_comparisons, load_baseline, loop_timer, progress,
+    run_benchmark, save_baseline
+)
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+SAMPLE_MESSAGES = [
+    "I have a mild fever since yesterday",
+    "My temperature is 101.5 F and I feel tired",
+    "My 3 year old child has had a fever for 2 days",
+    "I have a very high fever, 104 degrees",
+    "I have chest pain and a fever",
+    "The baby is drowsy and won't eat",
+    "I'm an adult with a headache and 38.5 C fever",
+    "Fever of 100 degrees, some body aches, otherwise okay",
+]
+
+
+# Sub-microsecond: a few hundred nanoseconds of timer and cache jitter is already a large ratio
+@benchmark("red_flags.check_red_flags[cached]", threshold=1.0)
+def bench_red_flags_cached():
+    from app.red_flags import check_red_flags
+    messages = SAMPLE_MESSAGES
+    return loop_timer(lambda: [check_red_flags(message) for message in messages])
+
+
+@benchmark("red_flags.check_red_flags[uncached]")
+def bench_red_flags_uncached():
+    from app.red_flags import check_red_flags
+    # Bypass the lru_cache to time the matcher itself
+    check = check_red_flags.__wrapped__
+    messages = [f"{message} (note {i})" for i, message in enumerate(SAMPLE_MESSAGES * 4)]
+    return loop_timer(lambda: [check(message) for message in messages])
+
+
+@benchmark("healthguide.extract_temperature")
+def bench_extract_temperature():
+    from healthguide import HealthGuide
+    guide = HealthGuide()
+    messages = SAMPLE_MESSAGES
+    return loop_timer(lambda: [guide.extract_temperature(message) for message in messages])
+
+
+@benchmark("healthguide.extract_age_group")
+def bench_extract_age_group():
+    from healthguide import HealthGuide
+    guide = HealthGuide()
+    messages = SAMPLE_MESSAGES
+    return loop_timer(lambda: [guide.extract_age_group(message) for message in messages])
+
+
+@benchmark("extraction.extract[uncached]")
+def bench_extract_uncached():
+    from app.extraction import extract
+    # Bypass the lru_cache to time the single scan itself
+    extract_one = extract.__wrapped__
+    messages = SAMPLE_MESSAGES
+    return loop_timer(lambda: [extract_one(message) for message in messages])
+
+
+@benchmark("extraction.extract_batch")
+def bench_extract_batch():
+    from app.extraction import extract_batch
+    messages = [f"{message} (note {i})" for i, message in enumerate(SAMPLE_MESSAGES * 4)]
+    return loop_timer(lambda: extract_batch(messages))
+
+
+TRIAGE_FIELDS = {
+    "triage_level": "SELF_CARE",
+    "escalate": False,
+    "summary": "Mild fever without red flag symptoms",
+    "recommended_next_steps": ["Rest and stay hydrated", "Monitor your temperature", "Consult a doctor if it persists"],
+    "next_question": "How long have you had the fever?",
+}
+
+
+@benchmark("serialization.triage_response[validated]")
+def bench_triage_response_validated():
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from app.llm_service import parse_triage_json
+    from app.models import ConversationResponse
+
+    # What /api/triage did before: build the response model, let FastAPI validate it
+    # against response_model, encode it and render it with the stdlib encoder
+    field = create_response_field(name="response", type_=ConversationResponse)
+    triage_result = parse_triage_json(TRIAGE_FIELDS)
+
+    def run():
+        response = ConversationResponse(
+            session_id="bench", message="Rest and drink fluids.", triage_result=triage_result,
+            conversation_complete=False
+        )
+        # Never awaits for async endpoints, so the coroutine finishes on its first step
+        coroutine = serialize_response(field=field, response_content=response)
+        try:
+            coroutine.send(None)
+        except StopIteration as done:
+            return JSONResponse(done.value)
+
+    return loop_timer(run)
+
+
+@benchmark("serialization.triage_response[fast]")
+def bench_triage_response_fast():
+    from app.llm_service import parse_triage_json
+    from app.models import ConversationResponse
+    from app.serialization import FastJSONResponse
+
+    triage_result = parse_triage_json(TRIAGE_FIELDS)
+
+    def run():
+        return FastJSONResponse(ConversationResponse.model_construct(
+            session_id="bench", message="Rest and drink fluids.", triage_result=triage_result,
+            conversation_complete=False
+        ))
+
+    return loop_timer(run)
+
+
+@benchmark("serialization.turn_rows[isoformat]")
+def bench_turn_rows_isoformat():
+    from datetime import datetime
+    from app.database import _message_row
+
+    # Timestamps formatted per message and parsed back for the insert, as before
+    def run():
+        messages = [
+            {"role": "user", "content": "I have a fever", "timestamp": datetime.now().isoformat()},
+            {"role": "assistant", "content": "How long?", "timestamp": datetime.now().isoformat()}
+        ]
+        return [_message_row("bench", seq, message) for seq, message in enumerate(messages)]
+
+    return loop_timer(run)
+
+
+@benchmark("serialization.turn_rows[datetime]")
+def bench_turn_rows_datetime():
+    from datetime import datetime
+    from app.database import _message_row
+
+    def run():
+        now = datetime.now()
+        messages = [
+            {"role": "user", "content": "I have a fever", "timestamp": now},
+            {"role": "assistant", "content": "How long?", "timestamp": now}
+        ]
+        return [_message_row("bench", seq, message) for seq, message in enumerate(messages)]
+
+    return loop_timer(run)
+
+
+def synthetic_providers(count: int, seed: int = 7):
+    """Providers spread uniformly over a 10x10 degree box around California"""
+    rng = np.random.default_rng(seed)
+    latitudes = rng.uniform(32.0, 42.0, count).round(6).tolist()
+    longitudes = rng.uniform(-124.0, -114.0, count).round(6).tolist()
+    types = rng.choice(["clinic", "pharmacy", "hospital"], count).tolist()
+    return [
+        {"id": str(i), "name": f"Provider {i}", "type": types[i], "address": f"{i} Main Street",
+         "phone": "(555) 000-0000", "latitude": latitudes[i], "longitude": longitudes[i]}
+        for i in range(count)
+    ]
+
+
+def providers_timer(count: int):
+    from app import providers
+    from app.models import ProviderRequest
+    from app.provider_index import ProviderIndex
+
+    index = ProviderIndex(synthetic_providers(count))
+    request = ProviderRequest(latitude=37.7749, longitude=-122.4194, radius=10)
+
+    def run():
+        # Install the synthetic index for the duration of the call only
+        previous, providers._provider_index = providers._provider_index, index
+        try:
+            return providers.get_providers(request)
+        finally:
+            providers._provider_index = previous
+
+    return loop_timer(run)
+
+
+@benchmark("providers.get_providers[n=10]")
+def bench_providers_10():
+    return providers_timer(10)
+
+
+@benchmark("providers.get_providers[n=10000]")
+def bench_providers_10k():
+    return providers_timer(10_000)
+
+
+@benchmark("providers.get_providers[n=1000000]", slow=True)
+def bench_providers_1m():
+    return providers_timer(1_000_000)
+
+
+def save_conversation_timer(history_length: int):
+    """Time one new turn saved against a stored conversation of history_length messages"""
+    from app.database import Base, ConversationMessage, ConversationSession, save_conversation
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    history = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)],
+         "timestamp": "2024-01-01T12:00:00"}
+        for i in range(history_length)
+    ]
+    save_conversation(db, "bench", [], history)
+    turn = [
+        {"role": "user", "content": "It is still 101 F", "timestamp": "2024-01-01T12:05:00"},
+        {"role": "assistant", "content": "Keep resting and drinking fluids.", "timestamp": "2024-01-01T12:05:01"},
+    ]
+
+    def timer(loops: int) -> float:
+        elapsed = 0.0
+        for _ in range(loops):
+            start = time.perf_counter()
+            save_conversation(db, "bench", history, turn, triage_level="SELF_CARE", summary="Fever")
+            elapsed += time.perf_counter() - start
+            # Untimed reset to the stored history so every iteration does the same work
+            db.execute(delete(ConversationMessage).where(
+                ConversationMessage.session_id == "bench", ConversationMessage.seq >= history_length
+            ))
+            db.execute(update(ConversationSession).where(
+                ConversationSession.session_id == "bench"
+            ).values(message_count=history_length))
+            db.commit()
+        return elapsed
+
+    return timer
+
+
+@benchmark("database.save_conversation[history=10]", threshold=0.5)
+def bench_save_10():
+    return save_conversation_timer(10)
+
+
+@benchmark("database.save_conversation[history=100]", threshold=0.5)
+def bench_save_100():
+    return save_conversation_timer(100)
+
+
+@benchmark("database.save_conversation[history=1000]", threshold=0.5)
+def bench_save_1000():
+    return save_conversation_timer(1000)
+
+
+@benchmark("api.triage[mock_llm]", threshold=0.5)
+def bench_api_triage():
+    from fastapi.testclient import TestClient
+    from app.llm_service import MockLLMService
+    from app import main
+
+    history = [
+        {"role": "user", "content": "I have a fever"},
+        {"role": "assistant", "content": "What's your temperature?"},
+    ]
+
+    def run():
+        response = client.post("/api/triage", json={
+            "session_id": str(uuid.uuid4()),
+            "message": random.choice(SAMPLE_MESSAGES[:4]),
+            "conversation_history": history
+        })
+        assert response.status_code == 200, response.text
+
+    get_llm_service = main.get_llm_service
+    main.get_llm_service = MockLLMService  # never reach a real provider
+    try:
+        with TestClient(main.app) as client:
+            yield loop_timer(run)
+    finally:
+        main.get_llm_service = get_llm_service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the triage hot-path benchmarks")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="skip slow benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.1, help="minimum seconds per timed run")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--min-delta-us", type=float, default=0.5,
+                        help="ignore changes smaller than this many microseconds")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="re-measure regressed benchmarks this many times before failing")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--json", default=None, help="also write the raw results to this file")
+    args = parser.parse_args(argv)
+
+    selected = [b for b in BENCHMARKS if args.filter in b.name and not (args.quick and b.slow)]
+    results = {}
+    random.seed(0)
+    for bench in selected:
+        progress(f"running {bench.name}")
+        results[bench.name] = run_benchmark(bench, repeat=args.repeat, min_time=args.min_time)
+
+    baseline = load_baseline(args.baseline)
+    status = 0
+    if args.save:
+        save_baseline(args.baseline, results, baseline)
+        print(f"Saved {len(results)} results to {args.baseline}")
+    elif baseline is None:
+        print(json.dumps(results, indent=2))
+        print(f"No baseline at {args.baseline}; run with --save to create one")
+    else:
+        status = check_regressions(args, selected, results, baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return status
+
+
+def check_regressions(args, selected, results, baseline) -> int:
+    """Compare with the baseline, re-measuring apparent regressions; returns the exit status"""
+    # Only compare what was run, so filtered and --quick runs do not report missing entries
+    base_results = {name: entry for name, entry in baseline["results"].items() if name in results}
+    thresholds = {b.name: b.threshold for b in selected if b.threshold is not None}
+    comparisons = compare(base_results, results, args.threshold, thresholds, args.min_delta_us)
+    for attempt in range(args.retries):
+        regressed = {c.name for c in comparisons if c.status == "regressed"}
+        if not regressed:
+            break
+        # A slow run is often a noisy neighbour; a real regression reproduces
+        for bench in selected:
+            if bench.name in regressed:
+                progress(f"re-running {bench.name} (retry {attempt + 1})")
+                rerun = run_benchmark(bench, repeat=args.repeat, min_time=args.min_time)
+                if rerun["min_us"] < results[bench.name]["min_us"]:
+                    results[bench.name] = rerun
+        comparisons = compare(base_results, results, args.threshold, thresholds, args.min_delta_us)
+    print(format_comparisons(comparisons))
+    regressed = [c.name for c in comparisons if c.status == "regressed"]
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed beyond the threshold: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        status = main()
+    finally:
+        shutil.rmtree(_WORKDIR, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1 @@
+"""Load-testing tools: a fake OpenAI-compatible LLM server and a load driver"""
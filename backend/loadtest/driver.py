@@ -0,0 +1,241 @@
+"""
+Drive scripted multi-turn sessions against /api/triage and report latency and throughput.
+
+Usage (from backend/):
+    python -m loadtest.driver --url http://127.0.0.1:8000 --concurrency 1,4,16,64 --sessions 200
+
+Each virtual user replays the user turns of a script such as
+data/samples/sample_conversation.json as a new session, sending the replies
+it gets back as conversation history. Several comma-separated concurrency
+levels run one after another; the level where throughput stops growing is
+the saturation point of the server.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(__file__), "..", "data", "samples", "sample_conversation.json")
+
+
+def load_scripts(path: str) -> List[List[str]]:
+    """User turns of each conversation in a script file (one conversation or a list of them)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    conversations = data if isinstance(data, list) else [data]
+    scripts = []
+    for conversation in conversations:
+        messages = conversation.get("conversation", conversation.get("messages", []))
+        turns = [msg["content"] for msg in messages if msg.get("role") == "user"]
+        if turns:
+            scripts.append(turns)
+    if not scripts:
+        raise ValueError(f"No user turns found in {path}")
+    return scripts
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100.0 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class LoadResult:
+    """Samples from one concurrency level"""
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.latencies: List[float] = []
+        self.first_token: List[float] = []
+        self.errors = 0
+        self.sessions = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> Dict:
+        latencies = sorted(self.latencies)
+        first_token = sorted(self.first_token)
+        requests = len(latencies) + self.errors
+        summary = {
+            "concurrency": self.concurrency,
+            "requests": requests,
+            "errors": self.errors,
+            "sessions": self.sessions,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "requests_per_second": round(len(latencies) / self.elapsed, 2) if self.elapsed else 0.0,
+            "sessions_per_second": round(self.sessions / self.elapsed, 2) if self.elapsed else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 1),
+                "p95": round(percentile(latencies, 95) * 1000, 1),
+                "p99": round(percentile(latencies, 99) * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1) if latencies else 0.0
+            }
+        }
+        if first_token:
+            summary["first_token_ms"] = {
+                "p50": round(percentile(first_token, 50) * 1000, 1),
+                "p95": round(percentile(first_token, 95) * 1000, 1),
+                "p99": round(percentile(first_token, 99) * 1000, 1)
+            }
+        return summary
+
+
+async def triage_turn(client: httpx.AsyncClient, payload: Dict, result: LoadResult) -> Optional[str]:
+    """One /api/triage request; returns the reply or None on failure"""
+    start = time.perf_counter()
+    try:
+        response = await client.post("/api/triage", json=payload)
+    except httpx.HTTPError:
+        result.errors += 1
+        return None
+    if response.status_code != 200:
+        result.errors += 1
+        return None
+    result.latencies.append(time.perf_counter() - start)
+    return response.json()["message"]
+
+
+async def stream_turn(client: httpx.AsyncClient, payload: Dict, result: LoadResult) -> Optional[str]:
+    """One /api/triage/stream request, timing the first token as well as the whole turn"""
+    start = time.perf_counter()
+    first_token = None
+    chunks = []
+    event = None
+    try:
+        async with client.stream("POST", "/api/triage/stream", json=payload) as response:
+            if response.status_code != 200:
+                result.errors += 1
+                return None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    if event in ("token", "red_flag") and first_token is None:
+                        first_token = time.perf_counter() - start
+                    if event == "token":
+                        chunks.append(json.loads(line[len("data: "):])["text"])
+                    elif event == "red_flag":
+                        chunks.append(json.loads(line[len("data: "):])["message"])
+                    elif event == "error":
+                        result.errors += 1
+                        return None
+    except httpx.HTTPError:
+        result.errors += 1
+        return None
+    result.latencies.append(time.perf_counter() - start)
+    if first_token is not None:
+        result.first_token.append(first_token)
+    return "".join(chunks)
+
+
+async def run_session(client: httpx.AsyncClient, turns: List[str], result: LoadResult,
+                      stream: bool, server_history: bool, think_seconds: float):
+    """Play one scripted conversation as a new session"""
+    session_id = f"load-{uuid.uuid4()}"
+    history: List[Dict] = []
+    for message in turns:
+        payload = {"session_id": session_id, "message": message}
+        if not server_history:
+            payload["conversation_history"] = history
+        reply = await (stream_turn if stream else triage_turn)(client, payload, result)
+        if reply is None:
+            return
+        history = history + [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+        if think_seconds:
+            await asyncio.sleep(think_seconds)
+    result.sessions += 1
+
+
+async def run_level(url: str, scripts: List[List[str]], concurrency: int, sessions: int,
+                    duration: Optional[float], stream: bool = False, server_history: bool = False,
+                    think_seconds: float = 0.0, timeout: float = 60.0,
+                    transport: Optional[httpx.AsyncBaseTransport] = None) -> LoadResult:
+    """
+    Run `concurrency` virtual users, each starting a new session as soon as
+    its previous one ends, until `sessions` sessions have started or
+    `duration` seconds have passed.
+    """
+    result = LoadResult(concurrency)
+    started = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout, transport=transport) as client:
+        start = time.perf_counter()
+        deadline = start + duration if duration else None
+
+        async def virtual_user():
+            nonlocal started
+            while started < sessions and (deadline is None or time.perf_counter() < deadline):
+                turns = scripts[started % len(scripts)]
+                started += 1
+                await run_session(client, turns, result, stream, server_history, think_seconds)
+
+        await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+def saturation_point(summaries: List[Dict], min_gain: float = 0.1) -> Optional[int]:
+    """First concurrency level whose throughput gain over the previous level is below min_gain"""
+    for previous, current in zip(summaries, summaries[1:]):
+        if current["requests_per_second"] < previous["requests_per_second"] * (1 + min_gain):
+            return previous["concurrency"]
+    return None
+
+
+def format_table(summaries: List[Dict]) -> str:
+    lines = [f"{'conc':>5} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+             f"{'p99 ms':>9} {'ttft p95':>9}"]
+    for s in summaries:
+        ttft = s.get("first_token_ms", {}).get("p95", "-")
+        lines.append(
+            f"{s['concurrency']:>5} {s['requests']:>9} {s['errors']:>7} {s['requests_per_second']:>8} "
+            f"{s['latency_ms']['p50']:>9} {s['latency_ms']['p95']:>9} {s['latency_ms']['p99']:>9} {ttft:>9}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test /api/triage with scripted sessions")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="backend base URL")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="conversation script JSON")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated virtual user counts")
+    parser.add_argument("--sessions", type=int, default=100, help="sessions per concurrency level")
+    parser.add_argument("--duration", type=float, default=None, help="stop starting sessions after N seconds")
+    parser.add_argument("--stream", action="store_true", help="use /api/triage/stream and time the first token")
+    parser.add_argument("--server-history", action="store_true", help="omit conversation_history from requests")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between turns of a session")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--json", default=None, help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    scripts = load_scripts(args.script)
+    summaries = []
+    for concurrency in [int(level) for level in args.concurrency.split(",") if level.strip()]:
+        result = asyncio.run(run_level(
+            args.url, scripts, concurrency, args.sessions, args.duration, stream=args.stream,
+            server_history=args.server_history, think_seconds=args.think_ms / 1000.0, timeout=args.timeout
+        ))
+        summaries.append(result.summary())
+        print(f"concurrency {concurrency}: {summaries[-1]['requests_per_second']} req/s, "
+              f"p95 {summaries[-1]['latency_ms']['p95']} ms, {summaries[-1]['errors']} errors", flush=True)
+
+    print()
+    print(format_table(summaries))
+    saturated = saturation_point(summaries)
+    if saturated is not None:
+        print(f"\nThroughput stops scaling beyond concurrency {saturated}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Local stand-in for the OpenAI chat-completions API with injected latency and errors.
+
+Usage (from backend/):
+    python -m loadtest.fake_llm --port 9000 --latency lognormal --latency-ms 800 --error-rate 0.01
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:9000/v1 and any
+non-empty OPENAI_API_KEY. JSON-mode requests get a valid triage verdict (with
+a reply field for the combined prompt), other requests get a canned reply,
+streamed token by token when stream=true.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+REPLY_TEXT = (
+    "Thank you for sharing that. A mild fever is usually the body fighting an infection. "
+    "Rest, drink plenty of fluids and keep an eye on your temperature."
+)
+
+TRIAGE_VERDICT = {
+    "triage_level": "SELF_CARE",
+    "escalate": False,
+    "summary": "Mild fever without red flag symptoms",
+    "recommended_next_steps": ["Rest", "Stay hydrated", "Monitor your temperature"],
+    "next_question": "How long have you had the fever?"
+}
+
+
+class FakeLLMConfig(NamedTuple):
+    """Latency and failure behaviour of the fake server"""
+    latency: str = "fixed"  # fixed, uniform or lognormal
+    latency_ms: float = 500.0  # fixed value, uniform mean or lognormal median
+    jitter: float = 0.5  # uniform: +/- fraction of latency_ms; lognormal: sigma
+    token_ms: float = 20.0  # delay between streamed tokens
+    error_rate: float = 0.0  # fraction of requests that fail
+    error_status: int = 500  # status code for injected failures (429 exercises client retries)
+    seed: Optional[int] = None
+
+
+class LatencyModel:
+    """Samples response latency in seconds from the configured distribution"""
+
+    def __init__(self, config: FakeLLMConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+
+    def sample(self) -> float:
+        config = self.config
+        if config.latency == "uniform":
+            spread = config.latency_ms * config.jitter
+            value = self.rng.uniform(config.latency_ms - spread, config.latency_ms + spread)
+        elif config.latency == "lognormal":
+            # latency_ms is the median; sigma controls the tail
+            value = config.latency_ms * self.rng.lognormvariate(0.0, config.jitter)
+        else:
+            value = config.latency_ms
+        return max(value, 0.0) / 1000.0
+
+    def should_fail(self) -> bool:
+        return self.rng.random() < self.config.error_rate
+
+
+def _completion_text(body: Dict) -> str:
+    """Reply text, or a triage verdict when the client asked for JSON"""
+    if (body.get("response_format") or {}).get("type") != "json_object":
+        return REPLY_TEXT
+    verdict = dict(TRIAGE_VERDICT)
+    prompt = " ".join(str(msg.get("content", "")) for msg in body.get("messages", []))
+    if '"reply"' in prompt:
+        verdict["reply"] = REPLY_TEXT
+    return json.dumps(verdict)
+
+
+def _tokens(text: str) -> List[str]:
+    words = text.split(" ")
+    return [word if index == 0 else " " + word for index, word in enumerate(words)]
+
+
+def create_app(config: FakeLLMConfig = FakeLLMConfig()) -> FastAPI:
+    """Build the fake server"""
+    app = FastAPI(title="Fake LLM")
+    model = LatencyModel(config)
+    stats = {"requests": 0, "errors": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    @app.get("/stats")
+    async def get_stats():
+        """Request counters; peak_in_flight shows how much concurrency the backend generated"""
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(model.sample())
+        except BaseException:
+            stats["in_flight"] -= 1
+            raise
+        if model.should_fail():
+            stats["in_flight"] -= 1
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=config.error_status,
+                content={"error": {"message": "Injected failure", "type": "server_error", "code": None}}
+            )
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model_name = body.get("model", "gpt-3.5-turbo")
+        text = _completion_text(body)
+
+        if not body.get("stream"):
+            stats["in_flight"] -= 1
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model_name,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(_tokens(text)), "total_tokens": 0}
+            }
+
+        async def stream():
+            try:
+                for token in _tokens(text):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model_name,
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(config.token_ms / 1000.0)
+                final = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model_name,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                }
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                stats["in_flight"] -= 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server with injected latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="fixed value, uniform mean or lognormal median")
+    parser.add_argument("--jitter", type=float, default=0.5, help="uniform spread fraction or lognormal sigma")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="delay between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="status code for injected failures")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    config = FakeLLMConfig(
+        latency=args.latency, latency_ms=args.latency_ms, jitter=args.jitter, token_ms=args.token_ms,
+        error_rate=args.error_rate, error_status=args.error_status, seed=args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
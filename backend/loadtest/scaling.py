@@ -0,0 +1,132 @@
+"""
+Measure how /api/triage throughput scales with the number of pre-forked workers.
+
+Usage (from backend/):
+    python -m loadtest.scaling --workers 1,2,4 --concurrency 64 --duration 20
+
+Starts the fake LLM server, then for each worker count starts the backend
+with WORKERS=<n> on a fresh SQLite database, drives it with the load driver
+and stops it. The fake LLM answers quickly by default so the backend's own
+CPU work, not LLM latency, limits throughput; that is the part extra workers
+add capacity for. Expect scaling up to about the number of CPU cores.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from loadtest.driver import DEFAULT_SCRIPT, load_scripts, run_level
+
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    """Poll `url` until it answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout} seconds")
+
+
+def stop(process: subprocess.Popen):
+    """Stop a server process and wait for it to exit"""
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def measure(workers: int, args, scripts: List[List[str]], llm_url: str, directory: str) -> Dict:
+    """Throughput of the backend with `workers` worker processes"""
+    env = dict(
+        os.environ,
+        WORKERS=str(workers),
+        PORT=str(args.port),
+        HOST="127.0.0.1",
+        DEBUG="false",
+        OPENAI_API_KEY="fake",
+        OPENAI_BASE_URL=f"{llm_url}/v1",
+        LLM_CACHE_ENABLED="false",
+        RULES_ENABLED="false",
+        METRICS_ENABLED="false",
+        DATABASE_URL=f"sqlite:///{os.path.join(directory, f'scaling-{workers}.db')}"
+    )
+    backend = subprocess.Popen(
+        [sys.executable, "run.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_up(url + "/")
+        # Warm every worker's connection pools before measuring
+        asyncio.run(run_level(url, scripts, args.concurrency, args.concurrency, None))
+        result = asyncio.run(run_level(url, scripts, args.concurrency, args.sessions, args.duration))
+    finally:
+        stop(backend)
+    summary = result.summary()
+    summary["workers"] = workers
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput of /api/triage by number of pre-forked workers")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=64, help="virtual users")
+    parser.add_argument("--sessions", type=int, default=100000, help="sessions per run (or use --duration)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per worker count")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--llm-port", type=int, default=9100)
+    parser.add_argument("--llm-latency-ms", type=float, default=5.0, help="fixed latency of the fake LLM")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="conversation script JSON")
+    parser.add_argument("--json", default=None, help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    scripts = load_scripts(args.script)
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    fake_llm = subprocess.Popen(
+        [sys.executable, "-m", "loadtest.fake_llm", "--port", str(args.llm_port), "--latency", "fixed",
+         "--latency-ms", str(args.llm_latency_ms), "--token-ms", "0"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    summaries = []
+    try:
+        wait_until_up(llm_url + "/stats")
+        with tempfile.TemporaryDirectory() as directory:
+            for workers in [int(level) for level in args.workers.split(",") if level.strip()]:
+                summaries.append(measure(workers, args, scripts, llm_url, directory))
+                print(f"{workers} workers: {summaries[-1]['requests_per_second']} req/s, "
+                      f"p95 {summaries[-1]['latency_ms']['p95']} ms, {summaries[-1]['errors']} errors", flush=True)
+    finally:
+        stop(fake_llm)
+
+    base = summaries[0]["requests_per_second"] if summaries else 0.0
+    print(f"\n{'workers':>7} {'req/s':>8} {'speedup':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+    for s in summaries:
+        speedup = s["requests_per_second"] / base if base else 0.0
+        print(f"{s['workers']:>7} {s['requests_per_second']:>8} {speedup:>7.2f}x "
+              f"{s['latency_ms']['p50']:>9} {s['latency_ms']['p95']:>9} {s['errors']:>7}")
+    print(f"\n{os.cpu_count()} CPU cores available")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Replay stored conversations through triage assessment and report reclassifications.
+
+Usage:
+    python replay.py [--workers 16] [--limit N] [--output changes.jsonl] [--json] [--llm-only]
+
+Each turn is decided like a live one: by the rule engine when it is
+confident, otherwise by the LLM. `--llm-only` sends every turn to the LLM.
+
+Conversations are streamed from the database with a server-side cursor and
+assessed by a fixed pool of workers behind a bounded queue, so memory use
+does not grow with the number of stored sessions.
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import sys
+import time
+from collections import Counter
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, TextIO
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.database import ConversationMessage, ConversationSession, async_engine, init_db
+from app.llm_service import get_llm_service, close_llm_service
+from app.rules import RuleEngine
+
+
+class ReplayItem(NamedTuple):
+    """One stored conversation, cut at its last user message"""
+    session_id: str
+    stored_level: Optional[str]
+    history: List[Dict]
+    current_message: str
+
+
+class LatencyHistogram:
+    """Log-scale latency buckets; memory stays fixed however many samples are added"""
+
+    def __init__(self, min_ms: float = 0.1, max_ms: float = 600000.0, growth: float = 1.1):
+        self.bounds: List[float] = []
+        bound = min_ms
+        while bound < max_ms:
+            self.bounds.append(bound)
+            bound *= growth
+        self.bounds.append(max_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile"""
+        if not self.count:
+            return 0.0
+        rank = max(math.ceil(p / 100.0 * self.count), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds[index], self.max_ms) if index < len(self.bounds) else self.max_ms
+        return self.max_ms
+
+
+class ReplayReport:
+    """Running tally of reclassifications; changed sessions are written out as they arrive"""
+
+    def __init__(self, output: Optional[TextIO] = None):
+        self.output = output
+        self.replayed = 0
+        self.changed = 0
+        self.errors = 0
+        self.skipped = 0
+        self.rule_decided = 0
+        self.transitions: Counter = Counter()
+        self.latency = LatencyHistogram()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def add(self, item: ReplayItem, triage_result, elapsed_ms: float):
+        new_level = triage_result.triage_level.value
+        self.replayed += 1
+        self.latency.add(elapsed_ms)
+        self.transitions[(item.stored_level or "NONE", new_level)] += 1
+        if new_level != item.stored_level:
+            self.changed += 1
+            if self.output is not None:
+                self.output.write(json.dumps({
+                    "session_id": item.session_id,
+                    "stored_level": item.stored_level,
+                    "replayed_level": new_level,
+                    "red_flag_symptom": triage_result.red_flag_symptom,
+                    "summary": triage_result.summary
+                }) + "\n")
+
+    def add_error(self, item: ReplayItem, error: Exception):
+        self.errors += 1
+        print(f"Warning: replay of session {item.session_id} failed: {error}", file=sys.stderr)
+
+    def summary(self) -> Dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "replayed": self.replayed,
+            "changed": self.changed,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "rule_decided": self.rule_decided,
+            "transitions": [
+                {"from": old, "to": new, "count": count}
+                for (old, new), count in sorted(self.transitions.items())
+            ],
+            "elapsed_seconds": round(elapsed, 3),
+            "sessions_per_second": round(self.replayed / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "mean": round(self.latency.total_ms / self.latency.count, 3) if self.latency.count else 0.0,
+                "p50": round(self.latency.percentile(50), 3),
+                "p95": round(self.latency.percentile(95), 3),
+                "p99": round(self.latency.percentile(99), 3),
+                "max": round(self.latency.max_ms, 3)
+            }
+        }
+
+    def format_text(self) -> str:
+        summary = self.summary()
+        lines = [
+            f"Replayed {summary['replayed']} sessions in {summary['elapsed_seconds']}s "
+            f"({summary['sessions_per_second']}/s); {summary['changed']} reclassified, "
+            f"{summary['errors']} errors, {summary['skipped']} skipped, "
+            f"{summary['rule_decided']} decided by rules",
+            "",
+            "Triage level changes:"
+        ]
+        changes = [t for t in summary["transitions"] if t["from"] != t["to"]]
+        for transition in changes:
+            lines.append(f"  {transition['from']:>10} -> {transition['to']:<10} {transition['count']}")
+        if not changes:
+            lines.append("  none")
+        latency = summary["latency_ms"]
+        lines += [
+            "",
+            f"Latency (ms): mean {latency['mean']}  p50 {latency['p50']}  p95 {latency['p95']}  "
+            f"p99 {latency['p99']}  max {latency['max']}"
+        ]
+        return "\n".join(lines)
+
+
+async def stream_sessions(engine: AsyncEngine, yield_per: int = 1000,
+                          limit: Optional[int] = None, report: Optional[ReplayReport] = None
+                          ) -> AsyncIterator[ReplayItem]:
+    """
+    Yield stored conversations one at a time. A single query ordered by
+    (session_id, seq) is read through a server-side cursor and grouped as it
+    streams, so only the current session's messages are held in memory.
+    """
+    query = (
+        select(
+            ConversationSession.session_id,
+            ConversationSession.triage_level,
+            ConversationMessage.role,
+            ConversationMessage.content
+        )
+        .join(ConversationMessage, ConversationMessage.session_id == ConversationSession.session_id)
+        .order_by(ConversationSession.session_id, ConversationMessage.seq)
+        .execution_options(yield_per=yield_per)
+    )
+    emitted = 0
+    async with engine.connect() as conn:
+        result = await conn.stream(query)
+        current_id, stored_level, messages = None, None, []
+        async for session_id, triage_level, role, content in result:
+            if session_id != current_id:
+                if current_id is not None:
+                    item = _replay_item(current_id, stored_level, messages, report)
+                    if item is not None:
+                        yield item
+                        emitted += 1
+                        if limit is not None and emitted >= limit:
+                            return
+                current_id, stored_level, messages = session_id, triage_level, []
+            messages.append({"role": role, "content": content})
+        if current_id is not None and (limit is None or emitted < limit):
+            item = _replay_item(current_id, stored_level, messages, report)
+            if item is not None:
+                yield item
+
+
+def _replay_item(session_id: str, stored_level: Optional[str], messages: List[Dict],
+                 report: Optional[ReplayReport]) -> Optional[ReplayItem]:
+    """Cut the conversation at its last user message, the turn the stored level was assessed on"""
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index]["role"] == "user":
+            return ReplayItem(session_id, stored_level, messages[:index + 1], messages[index]["content"])
+    if report is not None:
+        report.skipped += 1
+    return None
+
+
+async def replay_sessions(engine: AsyncEngine, llm_service, workers: int = 16, yield_per: int = 1000,
+                          limit: Optional[int] = None, output: Optional[TextIO] = None,
+                          use_rules: bool = True) -> ReplayReport:
+    """
+    Replay every stored conversation with a fixed worker pool, deciding each
+    turn with the rules and then the LLM as live turns are. With use_rules
+    False every turn goes to assess_triage.
+    """
+    report = ReplayReport(output)
+    # A private engine so replayed turns stay out of the live rule stats and audit log
+    rules = RuleEngine(threshold=settings.rules_confidence_threshold) if use_rules else None
+    # Bounded so the reader never gets more than a couple of items ahead of the workers
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            start = time.perf_counter()
+            try:
+                # The stored history ends with the current message; live turns pass it separately
+                decision = rules.decide(item.history[:-1], item.current_message, item.session_id) if rules else None
+                if decision is not None:
+                    report.rule_decided += 1
+                    triage_result = decision.triage_result
+                else:
+                    triage_result = await llm_service.assess_triage_async(item.history, item.current_message)
+            except Exception as e:
+                report.add_error(item, e)
+                continue
+            report.add(item, triage_result, (time.perf_counter() - start) * 1000)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(max(workers, 1))]
+    try:
+        async for item in stream_sessions(engine, yield_per, limit, report):
+            await queue.put(item)
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    report.finished = time.perf_counter()
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Re-triage stored conversations and report reclassifications")
+    parser.add_argument("--workers", type=int, default=16,
+                        help="concurrent assessments (also capped by LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--limit", type=int, default=None, help="replay at most this many sessions")
+    parser.add_argument("--yield-per", type=int, default=1000, help="rows fetched per cursor round trip")
+    parser.add_argument("--output", default=None, help="write reclassified sessions to this JSONL file")
+    parser.add_argument("--use-cache", action="store_true", help="allow LLM response cache hits")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--llm-only", action="store_true",
+                        help="skip the rule engine and send every turn to the LLM")
+    args = parser.parse_args(argv)
+
+    if not args.use_cache:
+        # Cached verdicts would hide model drift and skew the latency numbers
+        settings.llm_cache_enabled = False
+    init_db()
+
+    async def run() -> ReplayReport:
+        try:
+            return await replay_sessions(
+                async_engine, get_llm_service(), workers=args.workers,
+                yield_per=args.yield_per, limit=args.limit, output=output,
+                use_rules=not args.llm_only
+            )
+        finally:
+            await close_llm_service()
+            await async_engine.dispose()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        report = asyncio.run(run())
+    finally:
+        if output is not None:
+            output.close()
+    print(json.dumps(report.summary(), indent=2) if args.json else report.format_text())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,14 @@ import uvicorn
 from app.config import settings
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.debug
-    )
+    if settings.workers > 1:
+        from app.prefork import serve
+        serve(settings.host, settings.port, settings.workers)
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.host,
+            port=settings.port,
+            reload=settings.debug
+        )
 
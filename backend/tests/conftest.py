@@ -0,0 +1,70 @@
+"""Shared test fixtures: in-memory databases and an app client backed by one"""
+import asyncio
+from typing import List, NamedTuple, Tuple
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import main
+from app.config import settings
+from app.database import Base, get_async_db, get_messages_async
+from app.llm_service import MockLLMService
+
+
+class MemoryDatabase(NamedTuple):
+    """A fresh in-memory async database with every table created"""
+    engine: AsyncEngine
+    session_factory: async_sessionmaker
+
+    def stored_messages(self, session_id: str) -> List[Tuple[str, str]]:
+        """(role, content) of every stored message of a session"""
+        async def load():
+            async with self.session_factory() as db:
+                return [(msg.role, msg.content) for msg in await get_messages_async(db, session_id)]
+
+        return asyncio.run(load())
+
+
+@pytest.fixture
+def db():
+    """In-memory sync database session"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def memory_db():
+    """In-memory async database; StaticPool keeps every session on the one connection that holds it"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    yield MemoryDatabase(engine, async_sessionmaker(engine, autoflush=False, expire_on_commit=False))
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def client(memory_db, monkeypatch):
+    """
+    TestClient for the app on memory_db with the mock LLM and the session
+    cache off. Startup events do not run, so nothing touches the configured
+    database.
+    """
+    async def get_test_db():
+        async with memory_db.session_factory() as session:
+            yield session
+
+    monkeypatch.setattr(settings, "session_cache_enabled", False)
+    monkeypatch.setattr(main, "AsyncSessionLocal", memory_db.session_factory)
+    monkeypatch.setattr(main, "get_llm_service", MockLLMService)
+    monkeypatch.setitem(main.app.dependency_overrides, get_async_db, get_test_db)
+    return TestClient(main.app)
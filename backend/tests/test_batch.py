@@ -0,0 +1,69 @@
+"""Tests for batch triage"""
+import asyncio
+import time
+import pytest
+from app import main
+from app.batch import RateLimiter, run_bounded
+from app.llm_service import MockLLMService
+from app.models import BatchTriageRequest, ConversationRequest, TriageLevel
+
+
+def test_run_bounded_keeps_order_and_caps_concurrency():
+    """Test that results keep input order and at most `concurrency` workers run at once"""
+    running = 0
+    peak = 0
+
+    async def worker(index, item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001 * (10 - index % 10))
+        running -= 1
+        return item * 2
+
+    results = asyncio.run(run_bounded(list(range(40)), worker, concurrency=5))
+    assert results == [item * 2 for item in range(40)]
+    assert peak == 5
+
+
+def test_rate_limiter_spaces_calls():
+    """Test that calls are spaced at the configured rate"""
+    limiter = RateLimiter(rate=200.0)
+
+    async def acquire_all():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+        return time.monotonic() - start
+
+    assert asyncio.run(acquire_all()) >= 4 / 200.0
+
+
+def test_batch_endpoint_without_persistence(monkeypatch):
+    """Test that batch results are ordered, red flags are screened and nothing is stored"""
+    monkeypatch.setattr(main, "get_llm_service", lambda: MockLLMService())
+
+    async def fail_persist(*args, **kwargs):
+        raise AssertionError("batch with skip_persistence must not store anything")
+
+    monkeypatch.setattr(main, "persist_messages", fail_persist)
+    request = BatchTriageRequest(
+        items=[
+            ConversationRequest(session_id="a", message="I have a mild fever", conversation_history=[]),
+            ConversationRequest(session_id="b", message="I have chest pain", conversation_history=[]),
+            ConversationRequest(session_id="c", message="I have a very high fever", conversation_history=[]),
+        ],
+        skip_persistence=True
+    )
+
+    response = asyncio.run(main.triage_batch(request))
+    assert [result.session_id for result in response.results] == ["a", "b", "c"]
+    assert [result.triage_result.triage_level for result in response.results] == [
+        TriageLevel.SELF_CARE, TriageLevel.EMERGENCY, TriageLevel.URGENT
+    ]
+    assert response.red_flags == 1
+    assert response.errors == 0
+    assert all(result.elapsed_ms >= 0 for result in response.results)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
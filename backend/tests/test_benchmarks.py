@@ -0,0 +1,41 @@
+"""Tests for the benchmark harness"""
+import pytest
+from benchmarks.harness import Benchmark, compare, loop_timer, run_benchmark
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Test that only slowdowns beyond the threshold count as regressions"""
+    baseline = {"fast": {"min_us": 10.0}, "slow": {"min_us": 10.0}, "gone": {"min_us": 1.0}}
+    results = {"fast": {"min_us": 7.0}, "slow": {"min_us": 13.0}, "added": {"min_us": 2.0}}
+    statuses = {c.name: c.status for c in compare(baseline, results, threshold=0.25)}
+    assert statuses == {"fast": "improved", "slow": "regressed", "gone": "missing", "added": "new"}
+
+    statuses = {c.name: c.status for c in compare(baseline, results, 0.25, thresholds={"slow": 0.5})}
+    assert statuses["slow"] == "ok"
+
+
+def test_compare_ignores_changes_below_min_delta():
+    """Test that sub-microsecond jitter is neither a regression nor an improvement"""
+    baseline = {"tiny": {"min_us": 0.7}, "small": {"min_us": 0.7}, "large": {"min_us": 10.0}}
+    results = {"tiny": {"min_us": 1.1}, "small": {"min_us": 1.4}, "large": {"min_us": 6.0}}
+    statuses = {c.name: c.status for c in compare(baseline, results, 0.25, min_delta_us=0.5)}
+    assert statuses == {"tiny": "ok", "small": "regressed", "large": "improved"}
+
+
+def test_run_benchmark_tears_down_generator_fixtures():
+    """Test that generator setups run their teardown after measuring"""
+    events = []
+
+    def setup():
+        events.append("setup")
+        yield loop_timer(lambda: None)
+        events.append("teardown")
+
+    result = run_benchmark(Benchmark("noop", setup, None, False), repeat=2, min_time=0.001)
+    assert events == ["setup", "teardown"]
+    assert result["loops"] >= 1
+    assert 0 <= result["min_us"] <= result["median_us"] <= result["max_us"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
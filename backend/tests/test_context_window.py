@@ -0,0 +1,58 @@
+"""Tests for the token-budgeted context window"""
+import pytest
+from app.context_window import ContextBuilder
+
+
+def make_history(turns):
+    """Alternating user/assistant messages"""
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"User message {i} " + "detail " * 20})
+        history.append({"role": "assistant", "content": f"Assistant reply {i} " + "advice " * 20})
+    return history
+
+
+def test_short_history_is_sent_verbatim():
+    """Test that nothing is summarized while under budget"""
+    history = make_history(2)
+    window = ContextBuilder(token_budget=10000).build(history)
+    assert window.summary is None
+    assert window.messages == history
+
+
+def test_long_history_fits_budget_with_summary():
+    """Test that older turns are summarized to respect the budget"""
+    builder = ContextBuilder(token_budget=600, recent_messages=4, summary_tokens=150, block_size=4)
+    history = make_history(20)
+    window = builder.build(history)
+    assert window.token_estimate <= 600
+    assert window.summary.startswith("Summary of earlier conversation")
+    assert window.messages[-1] == history[-1]
+    assert window.summarized + len(window.messages) == len(history)
+
+
+def test_summary_prefix_is_stable_across_turns():
+    """Test that the summary only changes when the block boundary moves"""
+    builder = ContextBuilder(token_budget=600, recent_messages=4, block_size=4)
+    history = make_history(10)
+    first = builder.build(history[:14])
+    second = builder.build(history[:15])
+    assert first.summary is not None
+    assert first.summary == second.summary
+    assert first.summarized == second.summarized == 8
+
+
+def test_openai_messages_do_not_repeat_current_message():
+    """Test that the current message is sent once when history already holds it"""
+    from app.llm_service import LLMService
+    from app.models import Message
+
+    history = [{"role": "user", "content": "I have a headache"}]
+    formatted = LLMService._build_openai_messages(
+        object.__new__(LLMService), [Message(role="user", content="I have a headache")], history
+    )
+    assert [msg["content"] for msg in formatted[1:]] == ["I have a headache"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
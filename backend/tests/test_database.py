@@ -0,0 +1,138 @@
+"""Tests for conversation storage"""
+import asyncio
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from app import database
+from app.database import (
+    Base, ConversationSession, append_messages, append_messages_async, save_conversation,
+    get_conversation, get_messages
+)
+
+
+def test_append_messages_updates_aggregates(db):
+    """Test that each turn appends rows and updates the session aggregates"""
+    append_messages(db, "s1", [{"role": "user", "content": "I have a fever"}], triage_level="SELF_CARE")
+    append_messages(db, "s1", [{"role": "assistant", "content": "What's your temperature?"}],
+                    triage_level="FOLLOW_UP", summary="Fever reported")
+
+    conversation = get_conversation(db, "s1")
+    assert conversation.message_count == 2
+    assert conversation.triage_level == "FOLLOW_UP"
+    assert [m.seq for m in get_messages(db, "s1")] == [0, 1]
+    assert get_messages(db, "s1", limit=1)[0].content == "What's your temperature?"
+
+
+def test_save_conversation_appends_each_turn(db):
+    """Test that client history is stored for a new session and each later turn appends only itself"""
+    history = [{"role": "user", "content": "I have a fever"}, {"role": "assistant", "content": "How long?"}]
+    save_conversation(db, "s1", history, [{"role": "user", "content": "2 days"},
+                                          {"role": "assistant", "content": "Any other symptoms?"}])
+    history = history + [{"role": "user", "content": "2 days"}, {"role": "assistant", "content": "Any other symptoms?"}]
+    save_conversation(db, "s1", history, [{"role": "user", "content": "No"}, {"role": "assistant", "content": "Rest"}])
+
+    assert [m.content for m in get_messages(db, "s1")] == [
+        "I have a fever", "How long?", "2 days", "Any other symptoms?", "No", "Rest"
+    ]
+    assert get_conversation(db, "s1").message_count == 6
+
+
+def test_save_conversation_keeps_turn_with_shorter_client_history(db):
+    """Test that a client sending less history than is stored still gets its turn stored"""
+    history = [{"role": "user", "content": "I have a fever"}, {"role": "assistant", "content": "How long?"}]
+    save_conversation(db, "s1", history, [{"role": "user", "content": "hi"},
+                                          {"role": "assistant", "content": "Hello"}])
+    save_conversation(db, "s1", history[:1], [{"role": "user", "content": "hi again"},
+                                              {"role": "assistant", "content": "Hello again"}])
+
+    assert [m.content for m in get_messages(db, "s1")][-2:] == ["hi again", "Hello again"]
+    assert get_conversation(db, "s1").message_count == 6
+
+
+def test_append_retries_seq_conflict(tmp_path):
+    """Test that a writer whose seq numbers were taken concurrently re-reads and retries"""
+    # A file database rather than the shared in-memory fixtures: the writers need their own connections
+    engine = create_engine(f"sqlite:///{tmp_path / 'conflict.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    first, second = Session(), Session()
+    append_messages(first, "s1", [{"role": "user", "content": "I have a fever"}])
+
+    # second reads the session (kept alive in its identity map), then first appends before second writes
+    stale = second.get(ConversationSession, "s1")
+    assert stale.message_count == 1
+    append_messages(first, "s1", [{"role": "assistant", "content": "How long?"}])
+    append_messages(second, "s1", [{"role": "user", "content": "2 days"}])
+
+    first.expire_all()
+    assert [(m.seq, m.content) for m in get_messages(first, "s1")] == [
+        (0, "I have a fever"), (1, "How long?"), (2, "2 days")
+    ]
+    assert get_conversation(first, "s1").message_count == 3
+    first.close()
+    second.close()
+    engine.dispose()
+
+
+def test_append_async_retries_concurrent_new_session(tmp_path):
+    """Test that concurrent async turns of one new session are all stored"""
+    async def scenario():
+        # Own connections per writer, as in test_append_retries_seq_conflict
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'conflict.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def turn(i):
+            async with session_factory() as db:
+                await append_messages_async(db, "s1", [{"role": "user", "content": f"turn {i}"}])
+
+        await asyncio.gather(*(turn(i) for i in range(4)))
+        async with session_factory() as db:
+            count = (await db.get(ConversationSession, "s1")).message_count
+            seqs = (await db.execute(text("SELECT seq FROM conversation_messages ORDER BY seq"))).scalars().all()
+        await engine.dispose()
+        return count, seqs
+
+    assert asyncio.run(scenario()) == (4, [0, 1, 2, 3])
+
+
+def test_migrate_legacy_schema(tmp_path, monkeypatch):
+    """Test that a database with JSON messages on the conversations row is moved to message rows"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE conversations (session_id VARCHAR PRIMARY KEY, messages JSON, triage_level VARCHAR, "
+            "summary TEXT, created_at DATETIME, updated_at DATETIME, red_flag_detected VARCHAR)"
+        ))
+        conn.execute(
+            text("INSERT INTO conversations (session_id, messages, triage_level) VALUES (:id, :messages, :level)"),
+            [
+                {"id": "old", "level": "SELF_CARE", "messages": '[{"role": "user", "content": "I have a fever", '
+                 '"timestamp": "2024-01-01T12:00:00"}, {"role": "assistant", "content": "How long?"}]'},
+                {"id": "empty", "level": None, "messages": None}
+            ]
+        )
+    monkeypatch.setattr(database, "engine", engine)
+
+    database.init_db()
+    database.init_db()  # a second run finds nothing left to migrate
+
+    columns = {column["name"] for column in inspect(engine).get_columns("conversations")}
+    assert "messages" not in columns and "message_count" in columns
+    db = sessionmaker(bind=engine)()
+    assert get_conversation(db, "old").message_count == 2
+    assert get_conversation(db, "old").triage_level == "SELF_CARE"
+    assert [m.to_dict() for m in get_messages(db, "old")] == [
+        {"role": "user", "content": "I have a fever", "timestamp": "2024-01-01T12:00:00"},
+        {"role": "assistant", "content": "How long?", "timestamp": None}
+    ]
+    assert get_conversation(db, "empty").message_count == 0
+    append_messages(db, "old", [{"role": "user", "content": "2 days"}])
+    assert [m.seq for m in get_messages(db, "old")] == [0, 1, 2]
+    db.close()
+    engine.dispose()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,110 @@
+"""Tests for temperature, age and duration extraction"""
+import pytest
+from app.extraction import extract, extract_batch, Temperature
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("My temperature is 101.5 F", Temperature(101.5, "F", True)),
+    ("38.5 C since this morning", Temperature(38.5, "C", True)),
+    ("fever of 39.2°C", Temperature(39.2, "C", True)),
+    ("104 degrees", Temperature(104.0, "F", True)),
+    ("38 degrees", Temperature(38.0, "C", True)),
+    ("101", Temperature(101.0, "F", False)),
+    ("38.5", Temperature(38.5, "C", False)),
+])
+def test_temperature(text, expected):
+    """Test temperatures with stated, marked and inferred units"""
+    assert extract(text).temperature == expected
+
+
+def test_temperature_ignores_other_numbers():
+    """Test that durations, ages and implausible numbers are not temperatures"""
+    assert extract("fever for 3 days").temperature is None
+    assert extract("my 40 year old husband").temperature is None
+    assert extract("I have 2 kids").temperature is None
+    # A marked temperature wins over an earlier bare number
+    assert extract("day 37 of 40, now 101 F").temperature == Temperature(101.0, "F", True)
+    assert extract("38.5 C").temperature.fahrenheit == pytest.approx(101.3)
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("I'm 30 years old. It was 99 yesterday, now it's 104.5", Temperature(104.5, "F", False)),
+    ("It was 104 F last night, now 99 F", Temperature(104.0, "F", True)),
+    ("38.5 this morning and 39.4 now", Temperature(39.4, "C", False)),
+])
+def test_temperature_keeps_highest_reading(text, expected):
+    """Test that the highest of several readings is kept, not the first"""
+    assert extract(text).temperature == expected
+
+
+@pytest.mark.parametrize("text,age_group", [
+    ("I'm 40 and have had a fever for 2 days", "adult"),
+    ("I am 39, fever since yesterday", "adult"),
+    ("she's 41", "adult"),
+    ("my age is 38", "adult"),
+    ("age: 42", "adult"),
+    ("I'm 38.5", None),
+])
+def test_stated_age_is_not_a_temperature(text, age_group):
+    """Test that a number given as someone's age is never read as a temperature"""
+    facts = extract(text)
+    assert facts.temperature is None
+    assert facts.age_group == age_group
+
+
+def test_stated_age_leaves_durations_alone():
+    """Test that "I am 2 days into" is a duration and "I'm 6 months old" an age"""
+    assert extract("I am 2 days into a fever") == (None, None, 2.0, False, False)
+    assert extract("I'm 6 months old").age_group == "infant"
+    assert extract("I'm 40 years old, 101 F").temperature == Temperature(101.0, "F", True)
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("my baby has a fever", "infant"),
+    ("a 6-month-old with fever", "infant"),
+    ("my 3 year old child", "child"),
+    ("my son is 15 years old", "teenager"),
+    ("I'm an adult", "adult"),
+    ("aged 70", "senior"),
+    ("an elderly neighbour", "senior"),
+    ("I have a cold and kidney pain", None),
+    ("the baby and the kids are sick", "infant"),
+])
+def test_age_group(text, expected):
+    """Test age words, numeric ages and that the youngest group wins"""
+    assert extract(text).age_group == expected
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("fever for 2 days", 2.0),
+    ("since yesterday", 1.0),
+    ("for 12 hours", 0.5),
+    ("about two weeks", 14.0),
+    ("a couple of days", 2.0),
+    ("a week, worse over the last 3 days", 7.0),
+    ("I have a fever", None),
+])
+def test_duration(text, expected):
+    """Test durations in days, keeping the longest one mentioned"""
+    assert extract(text).duration_days == expected
+
+
+def test_ignored_numbers():
+    """Test that numbers not used as a fact are flagged"""
+    assert not extract("I'm 40, fever of 101 F for 2 days").ignored_numbers
+    assert not extract("99 yesterday, now 104.5").ignored_numbers
+    assert extract("It was 99 F this morning, now it's 104").ignored_numbers
+    assert extract("I have 2 kids").ignored_numbers
+    assert extract("I'm 38.5").ignored_numbers
+
+
+def test_high_fever_and_batch():
+    """Test the high fever cue and that batch results match single extraction"""
+    texts = ["I have a very high fever", "mild fever, 99 F", "temp 102°F for three days, my son is 15 years old"]
+    assert extract(texts[0]).high_fever
+    assert not extract(texts[1]).high_fever
+    assert extract_batch(texts) == [extract(text) for text in texts]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
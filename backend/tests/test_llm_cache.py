@@ -0,0 +1,106 @@
+"""Tests for the LLM response cache"""
+import asyncio
+import json
+import pytest
+from app import llm_service as llm_service_module
+from app.config import settings
+from app.llm_cache import LLMCache, make_key, normalize_text
+from app.llm_service import APOLOGY_MESSAGE, LLMService
+from app.models import Message
+
+
+def test_normalized_conversations_share_a_key():
+    """Test that case, spacing and trailing punctuation do not change the key"""
+    first = make_key("triage", "openai", ["v1"], [{"role": "user", "content": "I have a fever."}])
+    second = make_key("triage", "openai", ["v1"], [{"role": "user", "content": "  i have a   FEVER"}])
+    assert first == second
+    assert normalize_text("101 Degrees!") == "101 degrees"
+
+
+def test_prompt_version_changes_the_key():
+    """Test that editing a prompt invalidates cached responses"""
+    conversation = [{"role": "user", "content": "I have a fever"}]
+    assert make_key("triage", "openai", ["v1"], conversation) != make_key("triage", "openai", ["v2"], conversation)
+
+
+def test_lru_ttl_and_disk_tier(tmp_path):
+    """Test eviction, expiry and the on-disk tier"""
+    cache = LLMCache(max_entries=1, ttl=60, disk_path=str(tmp_path / "llm_cache.db"))
+    cache.set("a", "reply a")
+    cache.set("b", "reply b")
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("a") == "reply a"
+    assert cache.stats()["disk_hits"] == 1
+
+    expired = LLMCache(ttl=-1)
+    expired.set("a", "reply a")
+    assert expired.get("a") is None
+    assert expired.stats()["misses"] == 1
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Service with Gemini first and OpenAI as failover, an empty cache and scripted completions"""
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "openai_api_key", "test")
+    monkeypatch.setattr(settings, "gemini_api_key", "test")
+    monkeypatch.setattr(settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(llm_service_module, "llm_cache", LLMCache())
+    service = LLMService()
+    service.calls = []
+    service.answers = {}
+
+    def completion(provider):
+        async def complete(kind, *args, **kwargs):
+            service.calls.append((provider, kind))
+            answer = service.answers[provider, kind]
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+        return complete
+
+    service._gemini_completion_async = completion("gemini")
+    service._openai_completion_async = completion("openai")
+    yield service
+    asyncio.run(service.aclose())
+
+
+def test_failed_fallback_reply_is_not_cached(service):
+    """Test that the apology for a failed reply call is returned but never cached"""
+    triage_only = json.dumps({"triage_level": "SELF_CARE", "summary": "Mild fever", "recommendations": []})
+    service.answers = {
+        ("gemini", "combined"): triage_only,
+        ("gemini", "reply"): RuntimeError("gemini down"),
+        ("openai", "reply"): RuntimeError("openai down"),
+    }
+    messages = [Message(role="user", content="I have a mild fever")]
+
+    _, reply = asyncio.run(service.assess_and_respond_async(messages, [], "I have a mild fever"))
+    assert reply == APOLOGY_MESSAGE.format(error="openai down")
+    assert llm_service_module.llm_cache.stats()["size"] == 0
+
+    service.answers[("gemini", "reply")] = "Rest and drink fluids."
+    service.calls.clear()
+    _, reply = asyncio.run(service.assess_and_respond_async(messages, [], "I have a mild fever"))
+    assert reply == "Rest and drink fluids."
+    assert ("gemini", "combined") in service.calls
+
+
+def test_cache_is_keyed_on_the_answering_provider(service):
+    """Test that a reply served by the failover provider is cached under that provider"""
+    service.answers = {("gemini", "reply"): RuntimeError("gemini down"), ("openai", "reply"): "Stay hydrated."}
+    messages = [Message(role="user", content="I feel warm")]
+
+    assert asyncio.run(service.generate_response_async(messages, [])) == "Stay hydrated."
+    keys = service._cache_keys("reply", [], "I feel warm")
+    assert llm_service_module.llm_cache.get(keys["openai"]) == "Stay hydrated."
+    assert llm_service_module.llm_cache.get(keys["gemini"]) is None
+
+    # Served from the cache without calling either provider again
+    service.calls.clear()
+    assert asyncio.run(service.generate_response_async(messages, [])) == "Stay hydrated."
+    assert service.calls == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,92 @@
+"""Tests for the fake LLM server and load driver"""
+import asyncio
+import json
+import pytest
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from openai import OpenAI
+from app.llm_service import parse_triage_json
+from loadtest.driver import load_scripts, percentile, run_level, saturation_point, DEFAULT_SCRIPT
+from loadtest.fake_llm import FakeLLMConfig, LatencyModel, create_app
+
+
+def fake_client(**config) -> OpenAI:
+    """OpenAI client talking to an in-process fake server"""
+    http_client = TestClient(create_app(FakeLLMConfig(latency_ms=0, token_ms=0, **config)))
+    return OpenAI(api_key="test", base_url="http://testserver/v1", http_client=http_client, max_retries=0)
+
+
+def test_fake_server_speaks_chat_completions():
+    """Test that replies, JSON verdicts and streams parse with the OpenAI client"""
+    client = fake_client()
+    messages = [{"role": "user", "content": "I have a fever"}]
+
+    reply = client.chat.completions.create(model="gpt-3.5-turbo", messages=messages)
+    assert reply.choices[0].message.content
+
+    verdict = client.chat.completions.create(
+        model="gpt-3.5-turbo", messages=messages, response_format={"type": "json_object"}
+    )
+    assert parse_triage_json(json.loads(verdict.choices[0].message.content)).triage_level.value == "SELF_CARE"
+
+    chunks = [
+        chunk.choices[0].delta.content
+        for chunk in client.chat.completions.create(model="gpt-3.5-turbo", messages=messages, stream=True)
+        if chunk.choices and chunk.choices[0].delta.content
+    ]
+    assert len(chunks) > 1
+    assert "".join(chunks) == reply.choices[0].message.content
+
+
+def test_fake_server_injects_errors():
+    """Test that the configured error rate fails requests with the configured status"""
+    client = fake_client(error_rate=1.0, error_status=429)
+    with pytest.raises(Exception) as error:
+        client.chat.completions.create(model="gpt-3.5-turbo", messages=[{"role": "user", "content": "hi"}])
+    assert getattr(error.value, "status_code", None) == 429
+
+
+def test_latency_distributions():
+    """Test that sampled latencies follow the configured distribution"""
+    uniform = LatencyModel(FakeLLMConfig(latency="uniform", latency_ms=100, jitter=0.5, seed=1))
+    samples = [uniform.sample() for _ in range(1000)]
+    assert 0.05 <= min(samples) and max(samples) <= 0.15
+
+    lognormal = LatencyModel(FakeLLMConfig(latency="lognormal", latency_ms=100, jitter=0.5, seed=1))
+    samples = sorted(lognormal.sample() for _ in range(1001))
+    assert 0.09 <= samples[500] <= 0.11
+
+
+def test_driver_runs_scripted_sessions():
+    """Test that the driver plays every user turn of each session and records latencies"""
+    app = FastAPI()
+    received = []
+
+    @app.post("/api/triage")
+    async def triage(payload: dict):
+        received.append(payload)
+        return {"session_id": payload["session_id"], "message": "ok"}
+
+    turns = load_scripts(DEFAULT_SCRIPT)[0]
+    result = asyncio.run(run_level(
+        "http://testserver", [turns], concurrency=3, sessions=6, duration=None,
+        transport=httpx.ASGITransport(app=app)
+    ))
+    assert result.sessions == 6
+    assert len(result.latencies) == 6 * len(turns)
+    # Later turns carry the history built from earlier replies
+    assert max(len(payload["conversation_history"]) for payload in received) == 2 * (len(turns) - 1)
+
+
+def test_percentile_and_saturation():
+    """Test nearest-rank percentiles and the saturation point"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    summaries = [{"concurrency": c, "requests_per_second": rps} for c, rps in [(1, 10), (4, 38), (16, 40), (64, 39)]]
+    assert saturation_point(summaries) == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,83 @@
+"""Tests for metrics collection and export"""
+import asyncio
+import pytest
+from app.metrics import Counter, Gauge, Histogram, Registry, STAGE_SECONDS, LLM_CALLS, LLM_ERRORS, LLM_TOKENS
+
+
+def test_prometheus_text_format():
+    """Test counter, gauge and histogram rendering"""
+    registry = Registry()
+    calls = Counter("test_calls_total", "Calls", ["kind"], registry=registry)
+    in_flight = Gauge("test_in_flight", "In flight", registry=registry)
+    latency = Histogram("test_seconds", "Latency", ["stage"], buckets=(0.1, 1.0), registry=registry)
+
+    calls.inc(kind="triage")
+    calls.inc(2, kind="triage")
+    with in_flight.track():
+        assert in_flight.get() == 1
+    latency.observe(0.05, stage="scan")
+    latency.observe(0.5, stage="scan")
+    latency.observe(5.0, stage="scan")
+
+    text = registry.render()
+    assert "# TYPE test_calls_total counter" in text
+    assert 'test_calls_total{kind="triage"} 3' in text
+    assert "test_in_flight 0" in text
+    assert 'test_seconds_bucket{stage="scan",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="scan",le="1"} 2' in text
+    assert 'test_seconds_bucket{stage="scan",le="+Inf"} 3' in text
+    assert 'test_seconds_count{stage="scan"} 3' in text
+    assert 'test_seconds_sum{stage="scan"} 5.55' in text
+
+
+def test_label_mismatch_is_rejected():
+    """Test that missing labels raise instead of silently creating a new series"""
+    counter = Counter("test_labels_total", "Labels", ["provider"], registry=Registry())
+    with pytest.raises(ValueError):
+        counter.inc()
+
+
+def test_llm_calls_are_instrumented():
+    """Test that provider calls record timings, tokens and error types"""
+    from app.llm_service import LLMService
+
+    class Usage:
+        prompt_tokens = 120
+        completion_tokens = 30
+
+    class Response:
+        usage = Usage()
+        choices = [type("Choice", (), {"message": type("Msg", (), {"content": "{}"})()})()]
+
+    class Completions:
+        def __init__(self):
+            self.fail = False
+
+        async def create(self, **kwargs):
+            if self.fail:
+                raise TimeoutError("provider timed out")
+            return Response()
+
+    service = object.__new__(LLMService)
+    service.provider = "openai"
+    service._semaphore = asyncio.Semaphore(1)
+    completions = Completions()
+    service.async_client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+
+    calls = LLM_CALLS.get(provider="openai", kind="triage")
+    timings = STAGE_SECONDS.get_count(stage="triage_llm")
+    prompt_tokens = LLM_TOKENS.get(provider="openai", kind="triage", type="prompt")
+    asyncio.run(service._openai_completion_async("triage", messages=[]))
+    assert LLM_CALLS.get(provider="openai", kind="triage") == calls + 1
+    assert STAGE_SECONDS.get_count(stage="triage_llm") == timings + 1
+    assert LLM_TOKENS.get(provider="openai", kind="triage", type="prompt") == prompt_tokens + 120
+
+    completions.fail = True
+    errors = LLM_ERRORS.get(provider="openai", kind="triage", error="TimeoutError")
+    with pytest.raises(TimeoutError):
+        asyncio.run(service._openai_completion_async("triage", messages=[]))
+    assert LLM_ERRORS.get(provider="openai", kind="triage", error="TimeoutError") == errors + 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
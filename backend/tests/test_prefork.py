@@ -0,0 +1,82 @@
+"""Tests for the pre-fork multi-worker mode"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import httpx
+import pytest
+from app import llm_service
+from app.config import settings
+from app.prefork import _prepare_shared_state
+from app.rate_limit import rate_limiter
+
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_fork_discards_llm_service(monkeypatch):
+    """Test that a forked worker builds its own LLM service instead of inheriting the parent's"""
+    monkeypatch.setattr(llm_service, "_llm_service", object())
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if llm_service._llm_service is None else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert llm_service._llm_service is not None
+
+
+def test_multi_worker_settings(monkeypatch):
+    """Test that per-process state is shared or disabled once there are several workers"""
+    monkeypatch.setattr(settings, "session_cache_enabled", True)
+    monkeypatch.setattr(rate_limiter, "limits", {"openai": (60, 0)})
+    monkeypatch.setattr(rate_limiter, "path", "")
+
+    assert _prepare_shared_state(1) == ""
+    assert settings.session_cache_enabled
+
+    path = _prepare_shared_state(4)
+    assert path and rate_limiter.path == path
+    assert not settings.session_cache_enabled
+
+
+def test_serves_with_several_workers(tmp_path):
+    """Test that run.py forks workers that answer on one port and shut down on SIGTERM"""
+    port = free_port()
+    env = dict(
+        os.environ, WORKERS="2", PORT=str(port), HOST="127.0.0.1", DEBUG="false",
+        OPENAI_API_KEY="", GEMINI_API_KEY="", DATABASE_URL=f"sqlite:///{tmp_path / 'prefork.db'}"
+    )
+    server = subprocess.Popen([sys.executable, "run.py"], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0)
+                break
+            except httpx.HTTPError:
+                assert time.monotonic() < deadline and server.poll() is None
+                time.sleep(0.2)
+        workers = subprocess.run(["ps", "-o", "pid=", "--ppid", str(server.pid)],
+                                 capture_output=True, text=True).stdout.split()
+        assert len(workers) == 2
+
+        for i in range(4):
+            response = httpx.post(f"http://127.0.0.1:{port}/api/triage",
+                                  json={"session_id": f"prefork-{i}", "message": "I have a fever of 101"})
+            assert response.status_code == 200
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=30) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,84 @@
+"""Tests for request profiling"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import main
+from app.config import settings
+from app.profiling import ProfileStore, ProfilingMiddleware
+
+
+def make_client(store, monkeypatch, token="secret", sample_rate=0.0):
+    """App with one endpoint behind the profiling middleware"""
+    monkeypatch.setattr(settings, "profile_token", token)
+    monkeypatch.setattr(settings, "profile_sample_rate", sample_rate)
+    monkeypatch.setattr(settings, "profile_engine", "cprofile")
+    app = FastAPI()
+
+    @app.get("/work/{item}")
+    async def work(item: str):
+        return {"total": sum(range(10000)), "item": item}
+
+    app.add_middleware(ProfilingMiddleware, store=store)
+    return TestClient(app)
+
+
+def test_profiles_only_requests_with_the_token(tmp_path, monkeypatch):
+    """Test that the header selects requests and a wrong token is ignored"""
+    store = ProfileStore(str(tmp_path))
+    client = make_client(store, monkeypatch)
+
+    assert "x-profile-id" not in client.get("/work/a").headers
+    assert "x-profile-id" not in client.get("/work/a", headers={"X-Profile": "wrong"}).headers
+    response = client.get("/work/a", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+
+    profiles = store.list()
+    assert len(profiles) == 1
+    assert profiles[0]["name"].startswith(response.headers["x-profile-id"])
+    # Named after the route template, not the concrete path
+    assert "-GET-work_item-" in profiles[0]["name"]
+    assert profiles[0]["name"].endswith(".prof")
+
+
+def test_sampling_and_rotation(tmp_path, monkeypatch):
+    """Test that sampled profiles rotate down to max_files"""
+    store = ProfileStore(str(tmp_path), max_files=3)
+    client = make_client(store, monkeypatch, token="", sample_rate=1.0)
+    for _ in range(6):
+        client.get("/work/b")
+    assert len(store.list()) == 3
+
+
+def test_profile_names_are_validated(tmp_path):
+    """Test that only stored profile names resolve to paths"""
+    store = ProfileStore(str(tmp_path))
+    (tmp_path / "a.prof").write_bytes(b"")
+    assert store.path_for("a.prof") == str(tmp_path / "a.prof")
+    assert store.path_for("../a.prof") is None
+    assert store.path_for("missing.prof") is None
+
+
+@pytest.mark.parametrize("token,sample_rate,header,status", [
+    ("", 0.0, None, 404),
+    ("", 0.5, None, 403),
+    ("", 0.5, "", 403),
+    ("secret", 0.0, None, 403),
+    ("secret", 0.0, "wrong", 403),
+    ("secret", 0.5, "secret", 200),
+])
+def test_profile_endpoints_require_the_token(tmp_path, monkeypatch, token, sample_rate, header, status):
+    """Test that profiles are never listed or downloaded without the configured token"""
+    store = ProfileStore(str(tmp_path))
+    (tmp_path / "a.prof").write_bytes(b"")
+    monkeypatch.setattr(settings, "profile_token", token)
+    monkeypatch.setattr(settings, "profile_sample_rate", sample_rate)
+    monkeypatch.setattr(main, "profile_store", store)
+    client = TestClient(main.app)
+    headers = {"X-Profile": header} if header is not None else {}
+
+    assert client.get("/api/profiles", headers=headers).status_code == status
+    assert client.get("/api/profiles/a.prof", headers=headers).status_code == status
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
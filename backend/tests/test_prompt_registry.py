@@ -0,0 +1,40 @@
+"""Tests for the prompt registry"""
+import os
+import pytest
+from app.prompt_registry import PromptRegistry, estimate_tokens
+
+
+def test_loads_template_with_metadata(tmp_path):
+    """Test that templates are loaded once with precomputed metadata"""
+    (tmp_path / "system.txt").write_text("You are HealthGuide.", encoding="utf-8")
+    registry = PromptRegistry(prompts_dir=str(tmp_path), check_interval=0)
+    template = registry.register("system", "system.txt", fallback="fallback")
+    assert template.text == "You are HealthGuide."
+    assert template.length == len("You are HealthGuide.")
+    assert template.token_estimate == estimate_tokens("You are HealthGuide.")
+    assert not template.is_fallback
+
+
+def test_reloads_only_when_mtime_changes(tmp_path):
+    """Test hot reload on file modification"""
+    path = tmp_path / "triage.txt"
+    path.write_text("Respond in JSON with triage_level", encoding="utf-8")
+    registry = PromptRegistry(prompts_dir=str(tmp_path), check_interval=0)
+    original = registry.register("triage", "triage.txt", required=["JSON"])
+    assert registry.get("triage") is original
+
+    path.write_text("Respond in JSON, v2", encoding="utf-8")
+    os.utime(path, (original.mtime + 10, original.mtime + 10))
+    assert registry.text("triage") == "Respond in JSON, v2"
+
+
+def test_invalid_template_falls_back(tmp_path):
+    """Test that missing or invalid templates use the fallback text"""
+    (tmp_path / "triage.txt").write_text("no structure here", encoding="utf-8")
+    registry = PromptRegistry(prompts_dir=str(tmp_path), check_interval=0)
+    assert registry.register("triage", "triage.txt", "fallback JSON", required=["JSON"]).is_fallback
+    assert registry.register("missing", "missing.txt", "fallback").text == "fallback"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
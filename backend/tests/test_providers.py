@@ -0,0 +1,66 @@
+"""Tests for provider search"""
+import pytest
+from app.models import ProviderRequest
+from app.providers import calculate_distance, get_providers, get_nearest_providers
+from app.provider_index import ProviderIndex
+
+
+def make_provider(provider_id, provider_type, latitude, longitude):
+    """Minimal provider record"""
+    return {
+        "id": provider_id, "name": f"Provider {provider_id}", "type": provider_type,
+        "address": "Address", "phone": "(555) 000-0000",
+        "latitude": latitude, "longitude": longitude
+    }
+
+
+def test_radius_query_matches_scalar_haversine():
+    """Test that indexed radius search agrees with the scalar distance"""
+    providers = [make_provider(str(i), "clinic", 37.7 + i * 0.01, -122.4 - i * 0.01) for i in range(50)]
+    index = ProviderIndex(providers)
+    results = index.within_radius(37.7749, -122.4194, 10)
+
+    expected = sorted(
+        (round(calculate_distance(37.7749, -122.4194, p["latitude"], p["longitude"]), 2), int(p["id"]))
+        for p in providers
+    )
+    expected = [provider_id for distance, provider_id in expected if distance <= 10]
+    assert [int(index.ids[row]) for row, _ in results] == expected
+
+
+def test_type_filter_and_nearest():
+    """Test provider type filtering and k-nearest search"""
+    providers = [
+        make_provider("1", "hospital", 37.77, -122.41),
+        make_provider("2", "pharmacy", 37.78, -122.41),
+        make_provider("3", "pharmacy", 40.71, -74.00),
+    ]
+    index = ProviderIndex(providers)
+    assert [index.ids[row] for row, _ in index.within_radius(37.77, -122.41, 50, "pharmacy")] == ["2"]
+    assert [index.ids[row] for row, _ in index.nearest(37.77, -122.41, 2, "pharmacy")] == ["2", "3"]
+    assert index.within_radius(37.77, -122.41, 50, "dentist") == []
+
+
+def test_get_providers_from_mock_data():
+    """Test the provider service end to end"""
+    providers = get_providers(ProviderRequest(latitude=37.7749, longitude=-122.4194, radius=5))
+    assert providers
+    assert [p.distance for p in providers] == sorted(p.distance for p in providers)
+    assert len(get_providers(ProviderRequest(latitude=37.7749, longitude=-122.4194, radius=5, limit=2))) == 2
+    assert len(get_nearest_providers(37.7749, -122.4194, 3)) == 3
+
+
+def test_providers_endpoint_nearest(client):
+    """Test that nearest returns providers beyond the radius, closest first"""
+    far_away = {"latitude": 40.7128, "longitude": -74.0060, "radius": 5}
+    assert client.post("/api/providers", json=far_away).json() == []
+
+    providers = client.post("/api/providers", json={**far_away, "nearest": 2}).json()
+    assert len(providers) == 2
+    assert providers[0]["distance"] <= providers[1]["distance"]
+    assert providers[0]["distance"] > 5
+    assert client.post("/api/providers", json={**far_away, "nearest": 0}).status_code == 422
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,154 @@
+"""Tests for the shared LLM rate limiter and 429 retries"""
+import asyncio
+import time
+import httpx
+import pytest
+from app import llm_service as llm_service_module
+from app.config import settings
+from app.llm_service import LLMService
+from app.rate_limit import SharedTokenBucket, backoff_delay, throttle_delay
+from app.router import DeadlineExceeded, request_budget
+
+
+class RateLimited(Exception):
+    """Provider error shaped like the SDKs' 429 errors"""
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.status_code = 429
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = httpx.Response(429, headers=headers)
+
+
+def test_reserve_waits_once_requests_run_out():
+    """Test that calls beyond the RPM budget are given a wait"""
+    bucket = SharedTokenBucket({"openai": (60, 0)})
+    waits = [bucket.reserve("openai", 100) for _ in range(61)]
+    assert waits[:60] == [0.0] * 60
+    assert 0.9 < waits[60] <= 1.0
+    assert bucket.reserve("gemini", 100) == 0.0
+
+
+def test_token_budget_and_max_wait():
+    """Test the TPM budget and that a wait beyond max_wait reserves nothing"""
+    bucket = SharedTokenBucket({"openai": (0, 6000)})
+    assert bucket.reserve("openai", 6000) == 0.0
+    assert bucket.reserve("openai", 3000, max_wait=1.0) is None
+    wait = bucket.reserve("openai", 100)
+    assert 0.9 < wait <= 1.0
+
+
+def test_settle_refunds_unused_tokens():
+    """Test that over-estimated reservations are given back"""
+    bucket = SharedTokenBucket({"openai": (0, 1000)})
+    assert bucket.reserve("openai", 1000) == 0.0
+    bucket.settle("openai", 1000, 200)
+    assert bucket.reserve("openai", 700) == 0.0
+
+
+def test_block_holds_calls():
+    """Test that a Retry-After block delays the next call"""
+    bucket = SharedTokenBucket({"openai": (600, 0)})
+    bucket.block("openai", 2.0)
+    assert 1.9 < bucket.reserve("openai", 1) <= 2.0
+
+
+def test_file_state_is_shared(tmp_path):
+    """Test that two limiters on the same file draw from one budget"""
+    path = str(tmp_path / "limits")
+    first = SharedTokenBucket({"openai": (2, 0)}, path=path)
+    second = SharedTokenBucket({"openai": (2, 0)}, path=path)
+    assert first.reserve("openai", 1) == 0.0
+    assert second.reserve("openai", 1) == 0.0
+    assert first.reserve("openai", 1) > 0
+
+
+def test_acquire_respects_request_budget():
+    """Test that a wait longer than the request budget fails fast"""
+    bucket = SharedTokenBucket({"openai": (1, 0)})
+
+    async def run():
+        await bucket.acquire("openai", 1)
+        with request_budget(0.5):
+            await bucket.acquire("openai", 1)
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert time.perf_counter() - start < 0.2
+
+
+def test_throttle_delay_and_backoff():
+    """Test 429 detection, Retry-After parsing and jittered backoff bounds"""
+    assert throttle_delay(RateLimited(3)) == 3.0
+    assert throttle_delay(RateLimited()) == 0.0
+    assert throttle_delay(ValueError("boom")) is None
+    for attempt in range(6):
+        delay = backoff_delay(attempt)
+        assert 0 <= delay <= min(settings.llm_retry_max_delay, settings.llm_retry_base_delay * 2 ** attempt)
+    assert backoff_delay(0, 5.0) == 5.0
+
+
+def test_retries_throttled_calls(monkeypatch):
+    """Test that 429s are retried until the call succeeds, and given up past the retry limit"""
+    monkeypatch.setattr(settings, "llm_retry_base_delay", 0.01)
+    monkeypatch.setattr(settings, "llm_max_retries", 3)
+    service = object.__new__(LLMService)
+    attempts = []
+
+    def flaky(failures):
+        async def call():
+            attempts.append(1)
+            if len(attempts) <= failures:
+                raise RateLimited()
+            return "ok"
+        return call
+
+    assert asyncio.run(service._call_with_retries("openai", "reply", 100, flaky(2))) == "ok"
+    assert len(attempts) == 3
+
+    attempts.clear()
+    with pytest.raises(RateLimited):
+        asyncio.run(service._call_with_retries("openai", "reply", 100, flaky(10)))
+    assert len(attempts) == 4
+
+
+def test_failed_and_cancelled_calls_release_their_reservation(monkeypatch):
+    """Test that a reservation is returned whatever ends the call, and settled with real usage on success"""
+    bucket = SharedTokenBucket({"openai": (0, 1000)})
+    monkeypatch.setattr(llm_service_module, "rate_limiter", bucket)
+    service = object.__new__(LLMService)
+
+    async def failing():
+        raise ValueError("bad request")
+
+    async def hanging():
+        await asyncio.sleep(10)
+
+    async def succeeding():
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await service._call_with_retries("openai", "reply", 1000, failing)
+        assert bucket.reserve("openai", 1000) == 0.0
+        bucket.settle("openai", 1000, 0)
+
+        # A hedge that loses is cancelled mid-call
+        task = asyncio.create_task(service._call_with_retries("openai", "reply", 1000, hanging))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert bucket.reserve("openai", 1000) == 0.0
+        bucket.settle("openai", 1000, 0)
+
+        assert await service._call_with_retries("openai", "reply", 1000, succeeding, lambda response: 400) == "ok"
+        assert bucket.reserve("openai", 600) == 0.0
+        assert bucket.reserve("openai", 1, max_wait=0) is None
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
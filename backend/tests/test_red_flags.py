@@ -1,6 +1,9 @@
 """Tests for red flag detection"""
 import pytest
-from app.red_flags import check_red_flags, get_red_flag_response
+from app.red_flags import (
+    check_red_flags, get_red_flag_response, find_red_flags, check_red_flags_batch,
+    RedFlagMatcher, RED_FLAG_SYMPTOMS
+)
 
 
 def test_chest_pain_red_flag():
@@ -41,6 +44,51 @@ def test_red_flag_response():
     assert "chest pain" in response
 
 
+def test_find_all_red_flags_with_offsets():
+    """Test that every matched category is reported with offsets"""
+    message = "Chest pain and now I had a seizure"
+    matches = find_red_flags(message)
+    symptoms = {match.symptom for match in matches}
+    assert symptoms == {"chest pain or pressure", "seizure"}
+    for match in matches:
+        assert message.lower()[match.start:match.end] == match.keyword
+
+
+def test_find_all_offsets_point_into_the_original_text():
+    """Test offsets after a character whose lowercase form is longer ("İ" lowercases to two code points)"""
+    message = "İstanbul trip, now CHEST PAIN and a seizure"
+    matches = find_red_flags(message)
+    assert [match.keyword for match in matches] == ["chest pain", "seizure"]
+    for match in matches:
+        assert message[match.start:match.end].lower() == match.keyword
+    assert find_red_flags("İİ seizure")[0][2:] == (3, 10)
+
+
+def test_red_flag_batch():
+    """Test batch red flag screening"""
+    results = check_red_flags_batch(["I have chest pain", "mild fever", "I had a seizure"])
+    assert results == ["chest pain or pressure", None, "seizure"]
+
+
+def test_matcher_matches_naive_scan():
+    """Test that the automaton agrees with per-keyword substring checks"""
+    matcher = RedFlagMatcher(RED_FLAG_SYMPTOMS)
+    messages = [
+        "my kid is drowsy and has a stiff neck",
+        "blue lips, no urine for 8 hours",
+        "he keeps seizing",
+        "rash that doesn't fade when pressed",
+        "nothing unusual, just a cough",
+    ]
+    for message in messages:
+        expected = None
+        for symptom, keywords in RED_FLAG_SYMPTOMS.items():
+            if any(keyword in message.lower() for keyword in keywords):
+                expected = symptom
+                break
+        assert matcher.first(message) == expected
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
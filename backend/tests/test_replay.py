@@ -0,0 +1,80 @@
+"""Tests for the offline replay tool"""
+import asyncio
+import io
+import json
+import pytest
+from app.database import append_messages_async
+from app.llm_service import MockLLMService
+from replay import LatencyHistogram, replay_sessions
+
+
+def run_replay(memory_db, sessions, llm_service=None, **options):
+    """Store sessions in the in-memory database and replay them"""
+    async def runner():
+        async with memory_db.session_factory() as db:
+            for session_id, level, messages in sessions:
+                await append_messages_async(db, session_id, messages, triage_level=level)
+        return await replay_sessions(memory_db.engine, llm_service or MockLLMService(), **options)
+
+    return asyncio.run(runner())
+
+
+def test_replay_reports_reclassified_sessions(memory_db):
+    """Test that sessions whose level changes are counted and written out"""
+    sessions = [
+        ("s1", "SELF_CARE", [{"role": "user", "content": "I have a mild fever"},
+                             {"role": "assistant", "content": "How long has it lasted?"}]),
+        ("s2", "SELF_CARE", [{"role": "user", "content": "I have a very high fever"}]),
+        ("s3", "URGENT", [{"role": "user", "content": "Now I have chest pain"}]),
+        ("s4", None, [{"role": "assistant", "content": "Hello"}]),
+    ]
+    output = io.StringIO()
+    report = run_replay(memory_db, sessions, workers=2, yield_per=2, output=output)
+
+    assert report.replayed == 3
+    assert report.skipped == 1
+    assert report.changed == 2
+    changes = {row["session_id"]: row["replayed_level"] for row in map(json.loads, output.getvalue().splitlines())}
+    assert changes == {"s2": "URGENT", "s3": "EMERGENCY"}
+    assert report.summary()["latency_ms"]["p99"] >= 0
+
+
+def test_replay_limit(memory_db):
+    """Test that --limit stops streaming after that many sessions"""
+    sessions = [(f"s{i}", "SELF_CARE", [{"role": "user", "content": "I have a mild fever"}]) for i in range(10)]
+    assert run_replay(memory_db, sessions, workers=3, limit=4).replayed == 4
+
+
+class FailingLLM:
+    """Service whose every assessment fails, to show which turns reached the LLM"""
+
+    async def assess_triage_async(self, *args, **kwargs):
+        raise RuntimeError("LLM unavailable")
+
+
+def test_replay_decides_like_live_turns(memory_db):
+    """Test that confident rule decisions skip the LLM unless --llm-only is set"""
+    sessions = [
+        ("s1", "URGENT", [{"role": "user", "content": "I'm an adult with a 100.8 F fever since yesterday"}]),
+        ("s2", "SELF_CARE", [{"role": "user", "content": "I have a fever and feel tired"}]),
+    ]
+    report = run_replay(memory_db, sessions, llm_service=FailingLLM())
+    assert (report.replayed, report.errors, report.rule_decided) == (1, 1, 1)
+    assert report.summary()["transitions"] == [{"from": "URGENT", "to": "SELF_CARE", "count": 1}]
+
+    report = run_replay(memory_db, [], llm_service=FailingLLM(), use_rules=False)
+    assert (report.replayed, report.errors, report.rule_decided) == (0, 2, 0)
+
+
+def test_latency_histogram_percentiles():
+    """Test that bucketed percentiles stay within one bucket of the exact value"""
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.add(float(value))
+    assert 500 <= histogram.percentile(50) <= 550
+    assert 990 <= histogram.percentile(99) <= 1000
+    assert histogram.percentile(100) == 1000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
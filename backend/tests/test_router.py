@@ -0,0 +1,156 @@
+"""Tests for provider routing, hedging, circuit breakers and request budgets"""
+import asyncio
+import time
+import pytest
+from app.config import settings
+from app.router import (
+    CircuitBreaker, DeadlineExceeded, ProviderRouter, ProvidersUnavailable, remaining_budget, request_budget
+)
+
+
+def fake_attempt(behaviour, calls=None):
+    """Attempt function where behaviour maps provider to (delay seconds, error or None)"""
+    async def attempt(provider):
+        if calls is not None:
+            calls.append(provider)
+        delay, error = behaviour[provider]
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return provider
+    return attempt
+
+
+def test_hedges_slow_primary():
+    """Test that a slow primary is hedged and the faster answer wins"""
+    router = ProviderRouter(["openai", "gemini"], hedge_max_delay=0.05)
+    calls = []
+    attempt = fake_attempt({"openai": (1.0, None), "gemini": (0.01, None)}, calls)
+
+    start = time.perf_counter()
+    assert asyncio.run(router.call(attempt)) == "gemini"
+    assert time.perf_counter() - start < 0.5
+    assert calls == ["openai", "gemini"]
+
+
+def test_fast_primary_is_not_hedged():
+    """Test that no second request is sent when the primary answers in time"""
+    router = ProviderRouter(["openai", "gemini"], hedge_max_delay=0.2)
+    calls = []
+    assert asyncio.run(router.call(fake_attempt({"openai": (0.01, None), "gemini": (0.01, None)}, calls))) == "openai"
+    assert calls == ["openai"]
+
+
+def test_hedge_delay_follows_latency_percentile():
+    """Test that the hedge delay is the recorded percentile, clamped"""
+    router = ProviderRouter(["openai"], hedge_percentile=90, hedge_min_delay=0.1, hedge_max_delay=2.0,
+                            hedge_min_samples=10)
+    assert router.hedge_delay("openai") == 2.0
+    for i in range(100):
+        router.record("openai", True, 0.5 + i / 100)
+    assert router.hedge_delay("openai") == pytest.approx(1.4)
+    assert ProviderRouter(["openai"], hedge_percentile=0).hedge_delay("openai") is None
+
+
+def test_failover_on_error():
+    """Test that an error fails over to the next provider immediately"""
+    router = ProviderRouter(["openai", "gemini"], hedge_max_delay=10.0)
+    attempt = fake_attempt({"openai": (0.0, RuntimeError("503")), "gemini": (0.01, None)})
+    start = time.perf_counter()
+    assert asyncio.run(router.call(attempt)) == "gemini"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_all_providers_failing_raises_last_error():
+    """Test that the last provider error is raised when every attempt fails"""
+    router = ProviderRouter(["openai", "gemini"])
+    attempt = fake_attempt({"openai": (0.0, RuntimeError("a")), "gemini": (0.0, ValueError("b"))})
+    with pytest.raises(ValueError):
+        asyncio.run(router.call(attempt))
+
+
+def test_circuit_breaker_opens_and_probes(monkeypatch):
+    """Test that an error burst opens the breaker and one probe is allowed after the cooldown"""
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failures=3, window=10.0, cooldown=30.0)
+
+    assert not breaker.record_failure()
+    now[0] += 20.0  # the first error falls out of the window
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 31.0
+    assert breaker.state == "half_open" and breaker.allow()
+    breaker.begin()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 31.0
+    breaker.begin()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_open_breaker_skips_provider():
+    """Test that calls go straight to the healthy provider while a breaker is open"""
+    router = ProviderRouter(["openai", "gemini"], breaker_failures=2, hedge_max_delay=10.0)
+    calls = []
+    attempt = fake_attempt({"openai": (0.0, RuntimeError("down")), "gemini": (0.0, None)}, calls)
+
+    async def run():
+        return [await router.call(attempt) for _ in range(4)]
+
+    assert asyncio.run(run()) == ["gemini"] * 4
+    assert calls == ["openai", "gemini", "openai", "gemini", "gemini", "gemini"]
+    assert router.status()["openai"]["breaker"] == "open"
+
+    router.breakers["gemini"].record_failure()
+    router.breakers["gemini"].record_failure()
+    with pytest.raises(ProvidersUnavailable):
+        asyncio.run(router.call(attempt))
+
+
+def test_request_budget_bounds_calls():
+    """Test that calls stop at the request deadline, however slow every provider is"""
+    router = ProviderRouter(["openai", "gemini"], hedge_max_delay=0.02)
+    attempt = fake_attempt({"openai": (5.0, None), "gemini": (5.0, None)})
+
+    async def run():
+        with request_budget(0.1):
+            assert 0 < remaining_budget() <= 0.1
+            # A looser inner budget does not extend the outer one
+            with request_budget(10.0):
+                assert remaining_budget() <= 0.1
+                await router.call(attempt)
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert time.perf_counter() - start < 1.0
+    assert remaining_budget() is None
+    # Cancelled attempts do not count against the providers
+    assert router.status()["openai"]["breaker"] == "closed"
+
+
+def test_service_routes_to_both_providers(monkeypatch):
+    """Test that the service holds both clients when both keys are set"""
+    from app.llm_service import LLMService
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "openai_api_key", "test")
+    monkeypatch.setattr(settings, "gemini_api_key", "test")
+    service = LLMService()
+    assert service.providers == ["gemini", "openai"]
+    assert service.router.providers == ["gemini", "openai"]
+    asyncio.run(service.aclose())
+
+    monkeypatch.setattr(settings, "llm_failover", False)
+    service = LLMService()
+    assert service.providers == ["gemini"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
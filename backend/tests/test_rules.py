@@ -0,0 +1,126 @@
+"""Tests for the rule engine fast path"""
+import asyncio
+import json
+import pytest
+from app.config import settings
+from app.llm_service import run_triage_turn
+from app.models import TriageLevel
+from app.rules import RuleEngine, evaluate, gather_facts
+
+
+class NoLLM:
+    """Service that fails the test if the LLM is reached"""
+
+    async def assess_triage_async(self, *args, **kwargs):
+        raise AssertionError("rule decision should have skipped the LLM")
+
+    async def generate_response_async(self, *args, **kwargs):
+        raise AssertionError("rule decision should have skipped the LLM")
+
+
+@pytest.mark.parametrize("history,message,rule,level,confident", [
+    ([], "I have chest pain", "red_flag", TriageLevel.EMERGENCY, True),
+    ([{"role": "user", "content": "My baby has a fever"}], "It's 103.5 F", "infant_fever", TriageLevel.URGENT, True),
+    ([], "Fever of 104 degrees since yesterday, I'm an adult", "high_fever", TriageLevel.URGENT, True),
+    ([], "Fever of 103 and a rash", "high_fever", TriageLevel.URGENT, False),
+    ([], "I have a very high fever", "reported_high_fever", TriageLevel.URGENT, False),
+    ([], "Fever for two weeks now", "prolonged_fever", TriageLevel.FOLLOW_UP, True),
+    ([], "I'm an adult with a 100.8 F fever since yesterday", "mild_fever", TriageLevel.SELF_CARE, True),
+    ([], "100.8 F fever since yesterday", "mild_fever", TriageLevel.SELF_CARE, False),
+    ([], "I'm an adult with a 100.8 F fever since yesterday and I keep vomiting", "mild_fever",
+     TriageLevel.SELF_CARE, False),
+    # Self-care is only decided when the message holds nothing but recognized facts
+    ([], "I'm 30 years old, 2 days of fever at 101", "mild_fever", TriageLevel.SELF_CARE, True),
+    ([], "I'm 30 years old, 2 days of fever at 101, I also have a headache", "mild_fever",
+     TriageLevel.SELF_CARE, False),
+    ([], "I'm 30 years old, 2 days of fever at 101, my heart is racing", "mild_fever", TriageLevel.SELF_CARE, False),
+    ([], "I'm 30 years old, 2 days of fever at 101, I can barely stand", "mild_fever", TriageLevel.SELF_CARE, False),
+    ([{"role": "user", "content": "I'm an adult, fever for 2 days, I feel dizzy"}], "It is 100.5 F",
+     "mild_fever", TriageLevel.SELF_CARE, False),
+    # The highest temperature reported counts
+    ([], "I'm 30 years old. It was 99 yesterday, now it's 104.5", "high_fever", TriageLevel.URGENT, True),
+    ([{"role": "user", "content": "I'm an adult, it was 103.5 F yesterday"}], "Now it's 99 F",
+     "high_fever", TriageLevel.URGENT, True),
+])
+def test_rules(history, message, rule, level, confident):
+    """Test which rule fires and whether it clears the default threshold"""
+    decision = evaluate(history, message)
+    assert decision.rule == rule
+    assert decision.triage_result.triage_level == level
+    assert decision.triage_result.confidence == decision.confidence
+    assert (decision.confidence >= 0.9) is confident
+
+
+def test_no_rule_without_facts():
+    """Test that vague turns are left to the LLM"""
+    assert evaluate([], "I have a fever and feel tired") is None
+    # An age is not a temperature
+    assert evaluate([], "I'm 40 and have had a fever for 2 days") is None
+    # A unitless 104 is not read, and the 99 F that is falls below a fever
+    assert evaluate([], "I'm an adult, 2 days of fever, it was 99 F this morning and now it's 104") is None
+
+
+@pytest.mark.parametrize("message", [
+    "adult 93 f 2 days",
+    "I am an adult with a temperature of 94 F for 2 days",
+    "I'm an adult, 95 F for 2 days",
+    "I'm an adult, 96.8 F for 2 days",
+    "I'm an adult, 97 F for 2 days",
+    "adult 34 c for 2 days",
+    "adult 35 c for 2 days",
+    "I'm an adult, 36.5 C for 2 days",
+])
+def test_low_readings_are_not_self_care(message):
+    """Test that readings below a fever, or too low to be plausible, are left to the LLM"""
+    assert gather_facts([], message).temperature_f < 100.4
+    assert evaluate([], message) is None
+
+
+def test_facts_combine_across_turns():
+    """Test that facts from earlier user turns are used"""
+    history = [
+        {"role": "user", "content": "My 8 year old has a fever"},
+        {"role": "assistant", "content": "How long has it lasted? (e.g. 3 days)"},
+        {"role": "user", "content": "Since yesterday, it was 38 C"},
+    ]
+    facts = gather_facts(history, "It is 38.5 C")
+    assert facts.age_group == "child"
+    assert facts.duration_days == 1.0
+    assert facts.temperature_f == pytest.approx(101.3)
+
+
+def test_engine_threshold_stats_and_audit_log(tmp_path, monkeypatch):
+    """Test that only confident decisions are applied and every evaluation is logged"""
+    monkeypatch.setattr(settings, "rules_enabled", True)
+    log = tmp_path / "rules.jsonl"
+    engine = RuleEngine(threshold=0.9, audit_path=str(log))
+
+    assert engine.decide([], "Fever for two weeks now", "s1") is not None
+    assert engine.decide([], "I have a very high fever", "s2") is None
+    assert engine.decide([], "I feel unwell", "s3") is None
+
+    stats = engine.stats()
+    assert (stats["evaluated"], stats["applied"], stats["deferred"], stats["unmatched"]) == (3, 1, 1, 1)
+    assert stats["applied_by_rule"] == {"prolonged_fever": 1}
+    entries = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [(entry["session_id"], entry["outcome"]) for entry in entries] == [
+        ("s1", "applied"), ("s2", "deferred"), ("s3", "unmatched")
+    ]
+
+    monkeypatch.setattr(settings, "rules_enabled", False)
+    assert engine.decide([], "Fever for two weeks now") is None
+
+
+def test_triage_turn_skips_llm(monkeypatch):
+    """Test that a confident rule decision answers the turn without LLM calls"""
+    monkeypatch.setattr(settings, "rules_enabled", True)
+    message = "I'm an adult with a 100.8 F fever since yesterday"
+    history = [{"role": "user", "content": message}]
+    result, reply = asyncio.run(run_triage_turn(NoLLM(), [], history, message))
+    assert result.triage_level == TriageLevel.SELF_CARE
+    assert result.next_question is None
+    assert reply
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
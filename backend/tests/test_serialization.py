@@ -0,0 +1,67 @@
+"""Tests for the JSON serialization layer"""
+import json
+from datetime import datetime
+import pytest
+from app import serialization
+from app.models import ConversationResponse, TriageLevel
+from app.rules import build_red_flag_triage
+from app.serialization import FastJSONResponse, dumps, dumps_str, loads
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Run a test with orjson and with the standard library fallback"""
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_dumps_handles_api_values(encoder):
+    """Test datetimes, str enums, non-str keys and non-ASCII text with both encoders"""
+    value = {
+        "timestamp": datetime(2024, 3, 1, 12, 30, 5, 123456),
+        "level": TriageLevel.URGENT,
+        1: "non-str key",
+        "text": "fièvre 39°C"
+    }
+    data = dumps(value)
+    assert isinstance(data, bytes)
+    assert loads(data) == {
+        "timestamp": "2024-03-01T12:30:05.123456",
+        "level": "URGENT",
+        "1": "non-str key",
+        "text": "fièvre 39°C"
+    }
+    assert dumps_str([1, None]) == "[1,null]"
+
+
+def test_constructed_response_matches_validated_model():
+    """Test that a model_construct'ed response renders like the validated model"""
+    fields = dict(
+        session_id="s1",
+        message="Call emergency services now.",
+        triage_result=build_red_flag_triage("chest pain"),
+        conversation_complete=True
+    )
+    rendered = FastJSONResponse(ConversationResponse.model_construct(**fields)).body
+    validated = ConversationResponse(**fields)
+    assert json.loads(rendered) == json.loads(validated.model_dump_json())
+    assert json.loads(rendered)["triage_result"]["triage_level"] == "EMERGENCY"
+
+
+def test_triage_endpoint_shape(client):
+    """Test that /api/triage still answers with the ConversationResponse schema"""
+    response = client.post("/api/triage", json={"session_id": "serialization-1", "message": "I have a fever of 101"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert ConversationResponse.model_validate(body).session_id == "serialization-1"
+    assert set(body) == set(ConversationResponse.model_fields)
+    # The turn was stored with datetime timestamps and reads back
+    assert client.get("/api/summary/serialization-1").json()["session_id"] == "serialization-1"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,91 @@
+"""Tests for the session cache"""
+import asyncio
+from contextlib import asynccontextmanager
+import pytest
+from app import main
+from app.config import settings
+from app.database import get_conversation_async, get_messages_async
+from app.session_cache import SessionCache, run_flusher
+
+
+def run_with_cache(memory_db, scenario, **cache_options):
+    """Run an async scenario against a cache backed by the in-memory database"""
+    async def runner():
+        cache = SessionCache(session_factory=memory_db.session_factory, **cache_options)
+        async with memory_db.session_factory() as db:
+            await scenario(cache, db)
+
+    asyncio.run(runner())
+
+
+def test_write_behind_flush(memory_db):
+    """Test that appends stay in memory until flushed"""
+    async def scenario(cache, db):
+        await cache.append(db, "s1", [{"role": "user", "content": "I have a fever"}], triage_level="SELF_CARE")
+        assert await get_conversation_async(db, "s1") is None
+        assert (await cache.get(db, "s1")).message_count == 1
+
+        assert await cache.flush() == 1
+        db.expire_all()
+        assert (await get_conversation_async(db, "s1")).message_count == 1
+        assert cache.stats()["dirty"] == 0
+
+    run_with_cache(memory_db, scenario)
+
+
+def test_lru_eviction_flushes_dirty_sessions(memory_db):
+    """Test that evicting a dirty session writes it first"""
+    async def scenario(cache, db):
+        await cache.append(db, "s1", [{"role": "user", "content": "first"}])
+        await cache.append(db, "s2", [{"role": "user", "content": "second"}])
+
+        assert cache.stats()["evictions"] == 1
+        assert [m.content for m in await get_messages_async(db, "s1")] == ["first"]
+        assert (await cache.get(db, "s1")).messages[0]["content"] == "first"
+
+    run_with_cache(memory_db, scenario, max_sessions=1)
+
+
+def test_idle_ttl_expiry(memory_db):
+    """Test that idle sessions expire"""
+    async def scenario(cache, db):
+        await cache.append(db, "s1", [{"role": "user", "content": "hello"}])
+        assert await cache.evict_expired() == 1
+        assert cache.stats()["size"] == 0
+        assert (await get_conversation_async(db, "s1")).message_count == 1
+
+    run_with_cache(memory_db, scenario, idle_ttl=0)
+
+
+def test_shutdown_keeps_batch_of_cancelled_flush(memory_db, monkeypatch):
+    """Test that shutdown cancelling the flusher mid-flush still writes that flush's batch"""
+    stalled = asyncio.Event()
+
+    @asynccontextmanager
+    async def stalling_session():
+        # The first session never opens, so the flusher is cancelled while holding its batch
+        if not stalled.is_set():
+            stalled.set()
+            await asyncio.Event().wait()
+        async with memory_db.session_factory() as db:
+            yield db
+
+    async def scenario(cache, db):
+        await cache.append(db, "s1", [{"role": "user", "content": "hello"}])
+        cache.session_factory = stalling_session
+        monkeypatch.setattr(main, "session_cache", cache)
+        monkeypatch.setattr(main.app.state, "session_flusher", asyncio.create_task(run_flusher(cache, 0)),
+                            raising=False)
+        await stalled.wait()
+
+        await main.shutdown_event()
+        assert main.app.state.session_flusher.cancelled()
+        assert cache.stats()["dirty"] == 0
+
+    monkeypatch.setattr(settings, "session_cache_enabled", True)
+    run_with_cache(memory_db, scenario)
+    assert memory_db.stored_messages("s1") == [("user", "hello")]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
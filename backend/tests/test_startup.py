@@ -0,0 +1,75 @@
+"""Startup import-time report and guards against slow imports at boot"""
+import os
+import subprocess
+import sys
+from typing import Dict
+import pytest
+from app.config import settings
+from app.llm_service import LLMService
+
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# Generous ceiling for importing the app; the SDK guards below catch the usual regressions
+IMPORT_BUDGET_SECONDS = 3.0
+PROVIDER_SDKS = ("openai", "google.generativeai", "grpc")
+
+
+def import_times(code: str, **env) -> Dict[str, int]:
+    """Cumulative import time in microseconds per module, from python -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True,
+        env=dict(os.environ, **env)
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+def report(times: Dict[str, int], top: int = 10) -> str:
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:top]
+    return "\n".join(f"{us / 1000:9.1f} ms  {module}" for module, us in slowest)
+
+
+def test_mock_boot_skips_provider_sdks():
+    """Test that the app and a mock-mode request path import no provider SDK"""
+    times = import_times(
+        "import app.main; from app.llm_service import get_llm_service; get_llm_service()",
+        OPENAI_API_KEY="", GEMINI_API_KEY=""
+    )
+    loaded = [module for module in times
+              if any(module == sdk or module.startswith(sdk + ".") for sdk in PROVIDER_SDKS)]
+    assert not loaded, f"provider SDKs imported at boot: {loaded}\n{report(times)}"
+    print("\n" + report(times))
+    assert times["app.main"] < IMPORT_BUDGET_SECONDS * 1e6, report(times)
+
+
+def test_only_configured_provider_is_loaded():
+    """Test that an OpenAI-only configuration never imports the Gemini SDK"""
+    times = import_times(
+        "from app.llm_service import LLMService; LLMService()",
+        LLM_PROVIDER="openai", OPENAI_API_KEY="test", GEMINI_API_KEY=""
+    )
+    assert "openai" in times
+    assert "google.generativeai" not in times
+
+
+def test_provider_registry_errors(monkeypatch):
+    """Test unsupported providers and missing keys are reported"""
+    monkeypatch.setattr(settings, "llm_provider", "unknown")
+    with pytest.raises(ValueError, match="Unsupported LLM provider"):
+        LLMService()
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "gemini_api_key", "")
+    with pytest.raises(ValueError, match="Gemini API key not found"):
+        LLMService()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
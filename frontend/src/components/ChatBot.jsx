@@ -63,17 +63,10 @@ function ChatBot({ language }) {
     setLoading(true)
 
     try {
-      // Prepare conversation history
-      const conversationHistory = messages.map(msg => ({
-        role: msg.role,
-        content: msg.content
-      }))
-
-      // Send to backend
+      // Send only the new message; the backend rebuilds history for the session
       const response = await axios.post(`${API_BASE_URL}/api/triage`, {
         session_id: sessionId,
-        message: message,
-        conversation_history: conversationHistory
+        message: message
       })
 
       // Add assistant response
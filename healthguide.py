@@ -3,9 +3,15 @@ HealthGuide - Fever Helpline AI Assistant
 A compassionate and cautious triage tool for fever-related concerns.
 """
 
-import re
+import os
+import sys
 from typing import List, Dict, Optional
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from app.extraction import extract
+from app.red_flags import RedFlagMatcher
+
 # Red flag symptoms that require immediate emergency care
 RED_FLAG_SYMPTOMS = {
     "severe difficulty breathing": [
@@ -46,6 +52,9 @@ RED_FLAG_SYMPTOMS = {
     ]
 }
 
+# Shared matcher engine with the backend, built once from the CLI keyword lists
+RED_FLAG_MATCHER = RedFlagMatcher(RED_FLAG_SYMPTOMS)
+
 DISCLAIMER = (
     "I am an AI assistant, not a medical professional. My advice is for informational "
     "purposes only and is not a substitute for professional medical diagnosis or treatment. "
@@ -66,14 +75,7 @@ class HealthGuide:
         Returns the red flag symptom if found, None otherwise.
         This check is performed FIRST before any other processing.
         """
-        user_input_lower = user_input.lower()
-        
-        # Check each red flag symptom category
-        for symptom, keywords in RED_FLAG_SYMPTOMS.items():
-            for keyword in keywords:
-                if keyword.lower() in user_input_lower:
-                    return symptom
-        return None
+        return RED_FLAG_MATCHER.first(user_input)
     
     def greet_user(self) -> str:
         """Initial greeting with disclaimer"""
@@ -187,20 +189,18 @@ class HealthGuide:
                 )
         
         # Duration-based guidance
-        if duration:
-            duration_lower = duration.lower()
-            if "day" in duration_lower and any(char.isdigit() for char in duration):
-                days = [int(s) for s in duration.split() if s.isdigit()]
-                if days and days[0] >= 3:
-                    guidance += (
-                        "⚠️ Since your fever has persisted for several days, "
-                        "it's advisable to consult with a healthcare provider.\n\n"
-                    )
-            elif "week" in duration_lower:
+        days = extract(duration).duration_days if duration else None
+        if days is not None:
+            if days >= 7:
                 guidance += (
                     "⚠️ Since your symptoms have persisted for a week or more, "
                     "it's important to consult with a healthcare provider.\n\n"
                 )
+            elif days >= 3:
+                guidance += (
+                    "⚠️ Since your fever has persisted for several days, "
+                    "it's advisable to consult with a healthcare provider.\n\n"
+                )
         
         guidance += (
             "**Next Steps:**\n"
@@ -216,41 +216,13 @@ class HealthGuide:
         return guidance
     
     def extract_temperature(self, user_input: str) -> Optional[float]:
-        """Extract temperature from user input"""
-        # Try various temperature patterns
-        patterns = [
-            r'(\d+\.?\d*)\s*(?:degrees?|°)\s*(?:F|fahrenheit)',
-            r'(\d+\.?\d*)\s*(?:degrees?|°)\s*(?:C|celsius)',
-            r'(\d+\.?\d*)\s*(?:F|fahrenheit)',
-            r'(\d+\.?\d*)\s*(?:C|celsius)',
-            r'(\d+\.?\d*)\s*(?:degrees?|°)',
-            r'(\d+\.?\d*)',  # Just a number, assume Fahrenheit
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, user_input, re.IGNORECASE)
-            if match:
-                temp_value = float(match.group(1))
-                # If Celsius, convert to Fahrenheit
-                if 'c' in pattern.lower() or 'celsius' in user_input.lower():
-                    temp_value = (temp_value * 9/5) + 32
-                return temp_value
-        return None
+        """Extract temperature from user input, in Fahrenheit"""
+        temperature = extract(user_input).temperature
+        return temperature.fahrenheit if temperature is not None else None
     
     def extract_age_group(self, user_input: str) -> Optional[str]:
         """Extract age group from user input"""
-        user_input_lower = user_input.lower()
-        if any(word in user_input_lower for word in ['infant', 'baby', 'newborn']):
-            return 'infant'
-        elif any(word in user_input_lower for word in ['child', 'kid', 'children']):
-            return 'child'
-        elif any(word in user_input_lower for word in ['teen', 'teenager', 'adolescent']):
-            return 'teenager'
-        elif any(word in user_input_lower for word in ['adult', 'grown']):
-            return 'adult'
-        elif any(word in user_input_lower for word in ['senior', 'elderly', 'old']):
-            return 'senior'
-        return None
+        return extract(user_input).age_group
     
     def process_user_input(self, user_input: str, conversation_stage: str = "initial") -> tuple:
         """
@@ -268,16 +240,15 @@ class HealthGuide:
             return "", True, None
         
         # Extract information from user input
-        temp = self.extract_temperature(user_input)
-        if temp is not None:
-            self.user_responses['temperature'] = temp
+        facts = extract(user_input)
+        if facts.temperature is not None:
+            self.user_responses['temperature'] = facts.temperature.fahrenheit
         
-        age = self.extract_age_group(user_input)
-        if age is not None:
-            self.user_responses['age_group'] = age
+        if facts.age_group is not None:
+            self.user_responses['age_group'] = facts.age_group
         
         # Store duration if mentioned
-        if any(word in user_input.lower() for word in ['hour', 'day', 'week', 'minute']):
+        if facts.duration_days is not None:
             self.user_responses['duration'] = user_input
         
         # Determine next question based on conversation stage
@@ -303,16 +274,11 @@ class HealthGuide:
         
         elif conversation_stage == "age":
             if 'age_group' not in self.user_responses:
-                # Try to extract from input
-                age = self.extract_age_group(user_input)
-                if age:
-                    self.user_responses['age_group'] = age
-                else:
-                    return (
-                        "\nI didn't catch your age group. Please select one: "
-                        "Infant, Child, Teenager, Adult, or Senior",
-                        False, "age"
-                    )
+                return (
+                    "\nI didn't catch your age group. Please select one: "
+                    "Infant, Child, Teenager, Adult, or Senior",
+                    False, "age"
+                )
             return self.ask_additional_symptoms(), False, "symptoms"
         
         elif conversation_stage == "symptoms":